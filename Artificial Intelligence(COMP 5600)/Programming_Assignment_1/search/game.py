@@ -280,6 +280,101 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class FoodGrid:
+    """
+    An immutable Grid of booleans packed into a single int, used for the food in
+    search states. Cell (x, y) is bit x * height + y, the cell order of
+    Grid.asList and Grid.packBits. Hashing and equality work on the int, and
+    count() is a popcount, where a Grid loops over every cell in Python.
+
+    It reads like a Grid (grid[x][y], asList, count, width, height, copy), so
+    heuristics written against Grids keep working; toGrid() returns a mutable
+    Grid. Instead of copying and assigning, use eaten(x, y) for the FoodGrid
+    without food at (x, y).
+    """
+    __slots__ = ('bits', 'width', 'height')
+
+    def __init__(self, bits, width, height):
+        self.bits = bits
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def fromGrid(cls, grid):
+        if isinstance(grid, FoodGrid):
+            return grid
+        bits = 0
+        for x in range(grid.width):
+            for y in range(grid.height):
+                if grid[x][y]:
+                    bits |= 1 << (x * grid.height + y)
+        return cls(bits, grid.width, grid.height)
+
+    def toGrid(self):
+        grid = Grid(self.width, self.height)
+        for x, y in self.asList():
+            grid[x][y] = True
+        return grid
+
+    def eaten(self, x, y):
+        bit = 1 << (x * self.height + y)
+        if not self.bits & bit:
+            return self
+        return FoodGrid(self.bits & ~bit, self.width, self.height)
+
+    def __getitem__(self, x):
+        return _FoodGridColumn(self.bits >> (x * self.height), self.height)
+
+    def __eq__(self, other):
+        if not isinstance(other, FoodGrid): return False
+        return self.bits == other.bits and self.width == other.width and self.height == other.height
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __str__(self):
+        return str(self.toGrid())
+
+    def copy(self):
+        return self
+
+    def deepCopy(self):
+        return self
+
+    def shallowCopy(self):
+        return self
+
+    def count(self, item=True):
+        trues = bin(self.bits).count('1')
+        return trues if item else self.width * self.height - trues
+
+    def asList(self, key=True):
+        if not key:
+            return self.toGrid().asList(False)
+        cells = []
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            index = lowest.bit_length() - 1
+            cells.append((index // self.height, index % self.height))
+            bits ^= lowest
+        return cells
+
+    def packBits(self):
+        return self.toGrid().packBits()
+
+class _FoodGridColumn:
+    "Column x of a FoodGrid, so that grid[x][y] reads like a Grid"
+    __slots__ = ('bits', 'height')
+
+    def __init__(self, bits, height):
+        self.bits = bits
+        self.height = height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height: raise IndexError(y)
+        return bool(self.bits >> y & 1)
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
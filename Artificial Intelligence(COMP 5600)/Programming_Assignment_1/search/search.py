@@ -18,6 +18,7 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+from array import array
 from game import Directions
 from typing import List
 
@@ -75,6 +76,67 @@ def tinyMazeSearch(problem: SearchProblem) -> List[Directions]:
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
+class SearchNodes:
+    """
+    Back-pointers of the nodes of a search tree: node i was reached from node
+    parents[i] by actions[i], and node 0 holds the start state. Searches keep
+    one node per successor they record instead of a copy of its whole path,
+    and rebuild the list of actions once, at the goal.
+    """
+    root = 0
+
+    def __init__(self):
+        self.parents = array('i', [-1])
+        self.actions = [None]
+
+    def add(self, parent, action, state):
+        "Records the node reached from node parent by action, and returns it"
+        self.parents.append(parent)
+        self.actions.append(action)
+        return len(self.actions) - 1
+
+    def path(self, node):
+        "Returns the actions from the start state to node"
+        path = []
+        while node != self.root:
+            path.append(self.actions[node])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+class GridSearchNodes(SearchNodes):
+    """
+    SearchNodes for problems whose states are (x, y) grid positions, like
+    PositionSearchProblem: each cell's node is its index x * height + y, in
+    arrays preallocated for the whole grid. Adding a node for a cell replaces
+    its previous node, so a cell's node must not change once it is expanded.
+    """
+    def __init__(self, start, width, height):
+        self.height = height
+        self.parents = array('i', [-1]) * (width * height)
+        self.actions = [None] * (width * height)
+        self.root = self.cell(start)
+
+    def cell(self, state):
+        return state[0] * self.height + state[1]
+
+    def add(self, parent, action, state):
+        node = self.cell(state)
+        self.parents[node] = parent
+        self.actions[node] = action
+        return node
+
+def searchNodes(problem, start, dense=False):
+    """
+    Returns the SearchNodes for a search of problem from start. With dense, grid
+    problems (which have walls and (x, y) integer states) get GridSearchNodes.
+    """
+    walls = getattr(problem, 'walls', None)
+    if dense and walls is not None and isinstance(start, tuple) and len(start) == 2 \
+            and all(isinstance(coordinate, int) for coordinate in start):
+        return GridSearchNodes(start, walls.width, walls.height)
+    return SearchNodes()
+
 def depthFirstSearch(problem: SearchProblem) -> List[Directions]:
     """
     Search the deepest nodes in the search tree first.
@@ -94,35 +156,33 @@ def depthFirstSearch(problem: SearchProblem) -> List[Directions]:
     # Set to keep track of explored states
     explored = set()
     # Stack for frontier for iterative approach
+    # Each entry is a state, the node it was reached from and the action that reached it
     dfs_stack = util.Stack()
-    # Stack that keeps track of a path for each state added to the frontier
-    paths = util.Stack()
+    # Back-pointers of the expanded nodes; a state may be expanded more than once, so each
+    # expansion gets its own node and the path is rebuilt at the goal
+    nodes = SearchNodes()
 
     # Add start state to the dfs stack
-    dfs_stack.push(problem.getStartState())
-
-    # Push empty path(actions) for the start state
-    paths.push([])
+    dfs_stack.push((problem.getStartState(), None, None))
 
     # Loop until either the goal state has been found or the frontier is empty
     while not dfs_stack.isEmpty():
 
-        # Pop the current state off of the frontier(stack) and its corresponding path of actions
-        current_state = dfs_stack.pop()
-        path = paths.pop()
+        # Pop the current state off of the frontier(stack) and record the node it was reached by
+        current_state, parent, action = dfs_stack.pop()
+        node = nodes.root if parent is None else nodes.add(parent, action, current_state)
 
         # If this state is the goal state return the path of actions
         if problem.isGoalState(current_state):
-            return path
+            return nodes.path(node)
 
         # Add the current state to the explored set
         explored.add(current_state)
 
-        # Add successor states and their corresponding paths to the stack if they have not already been explored
+        # Add successor states to the stack if they have not already been explored
         for successor_state, action, cost in problem.getSuccessors(current_state):
             if successor_state not in explored:
-                dfs_stack.push(successor_state)
-                paths.push(path + [action])
+                dfs_stack.push((successor_state, node, action))
 
 
 def breadthFirstSearch(problem: SearchProblem) -> List[Directions]:
@@ -131,27 +191,24 @@ def breadthFirstSearch(problem: SearchProblem) -> List[Directions]:
 
     # Set to keep track of explored states
     explored = set()
-    # Queue for frontier for states
+    # Queue for frontier for states and the nodes that reached them
     queue = util.Queue()
-    # Queue for the corresponding paths of the states added onto the frontier
-    paths = util.Queue()
+    # Back-pointers of the states added onto the frontier; each state is added at most once
+    nodes = searchNodes(problem, problem.getStartState(), dense=True)
 
     # Add the start state to the explored set
     explored.add(problem.getStartState())
     # Push the start state to the queue
-    queue.push(problem.getStartState())
-    # Push an empty path of actions for the start state
-    paths.push([])
+    queue.push((problem.getStartState(), nodes.root))
 
     # Loop until either the goal state has been found or the frontier is empty
     while not queue.isEmpty():
-        # Pop the current state and its corresponding path of actions
-        current_state = queue.pop()
-        path = paths.pop()
+        # Pop the current state and its node
+        current_state, node = queue.pop()
 
         # If the current state is the start state return its corresponding path of actions
         if problem.isGoalState(current_state):
-            return path
+            return nodes.path(node)
 
         # If a successor state has not been explored push it onto the queue
         for successor_state, action, cost in problem.getSuccessors(current_state):
@@ -159,8 +216,7 @@ def breadthFirstSearch(problem: SearchProblem) -> List[Directions]:
                 # Add successor states to the explored set, so we can avoid the risk of
                 # the same state being pushed onto the frontier multiple of times
                 explored.add(successor_state)
-                queue.push(successor_state)
-                paths.push(path + [action])
+                queue.push((successor_state, nodes.add(node, action, successor_state)))
 
 def uniformCostSearch(problem: SearchProblem) -> List[Directions]:
     """Search the node of least total cost first."""
@@ -171,9 +227,12 @@ def uniformCostSearch(problem: SearchProblem) -> List[Directions]:
     # Priority queue for frontier
     priority_queue = util.PriorityQueue()
 
-    # Keeps track of the path of actions to each state
-    # Key is State, Value is Path of Actions
-    path_to_state = {problem.getStartState(): []}
+    # Back-pointers of the best known path to each state; a state's node is final once
+    # it is explored, so grid problems can keep one node per cell
+    nodes = searchNodes(problem, problem.getStartState(), dense=True)
+    # Keeps track of the node of the best known path to each state
+    # Key is State, Value is Node
+    node_of_state = {problem.getStartState(): nodes.root}
     # Keeps track of the cost to each state
     # Key is State, Value is Cost
     cost_to_state = {problem.getStartState(): 0}
@@ -188,7 +247,7 @@ def uniformCostSearch(problem: SearchProblem) -> List[Directions]:
 
         # If the current state is the goal state return the path of actions with the LEAST cost
         if problem.isGoalState(current_state):
-            return path_to_state[current_state]
+            return nodes.path(node_of_state[current_state])
 
         # Add the current state to the explored set
         explored.add(current_state)
@@ -202,9 +261,9 @@ def uniformCostSearch(problem: SearchProblem) -> List[Directions]:
 
                 # Checks to see if this is the minimum cost path to this successor state
                 if successor_state not in cost_to_state or cost_to_succesor_state < cost_to_state[successor_state]:
-                    # If it is, the cost dictionary and path dictionary updates for that successor state
+                    # If it is, the cost dictionary and node dictionary updates for that successor state
                     # Furthermore, we will then update the successor states priority key in the priority queue
-                    path_to_state[successor_state] = path_to_state[current_state] + [action]
+                    node_of_state[successor_state] = nodes.add(node_of_state[current_state], action, successor_state)
                     cost_to_state[successor_state] = cost_to_state[current_state] + cost
                     priority_queue.update(successor_state, cost_to_state[successor_state])
 
@@ -224,8 +283,11 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directi
     explored = set()
     # Priority queue for frontier
     priority_queue = util.PriorityQueue()
-    # Keeps track of the path of actions to each state
-    path_to_state = {problem.getStartState(): []}
+    # Back-pointers of every path found; states may be expanded again on a cheaper path,
+    # so each path gets its own node rather than one node per state
+    nodes = SearchNodes()
+    # Keeps track of the node of the best known path to each state
+    node_of_state = {problem.getStartState(): nodes.root}
     # Keeps track of the cost to each state
     cost_to_state = {problem.getStartState(): 0}
 
@@ -239,7 +301,7 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directi
 
         # If the current state is the goal state return the path of actions with the LEAST cost
         if problem.isGoalState(current_state):
-            return path_to_state[current_state]
+            return nodes.path(node_of_state[current_state])
 
         # Add a tuple of current state and its path to get there to the explored st
         # States may need to be explored multiple times to find the optimal path to the goal state
@@ -253,9 +315,9 @@ def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic) -> List[Directi
                 cost_to_successor_state = cost_to_state[current_state] + cost
 
                 # If the new cost of the successor state is the less than a previously seen cost of the successor state,
-                # the cost dictionary and path dictionary updates for that successor state path as a better path has been found
+                # the cost dictionary and node dictionary updates for that successor state path as a better path has been found
                 if successor_state not in cost_to_state or cost_to_successor_state < cost_to_state[successor_state]:
-                    path_to_state[successor_state] = path_to_state[current_state] + [action]
+                    node_of_state[successor_state] = nodes.add(node_of_state[current_state], action, successor_state)
                     cost_to_state[successor_state] = cost_to_state[current_state] + cost
                     # Update priority queue to reflect this new-found path plus the heuristic
                     priority_queue.update(successor_state, cost_to_successor_state + heuristic(successor_state, problem))
@@ -35,11 +35,14 @@ Good luck and happy searching!
 """
 
 from typing import List, Tuple, Any
+from array import array
 from game import Directions
 from game import Agent
 from game import Actions
+from game import FoodGrid
 import util
 import time
+import weakref
 import search
 import pacman
 
@@ -428,10 +431,11 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a FoodGrid (see game.py) of either True or False, specifying remaining food;
+                      it reads like a Grid, and hashes and compares in O(1)
     """
     def __init__(self, startingGameState: pacman.GameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), FoodGrid.fromGrid(startingGameState.getFood()))
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self._expanded = 0 # DO NOT CHANGE
@@ -452,8 +456,7 @@ class FoodSearchProblem:
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood = state[1].eaten(nextx, nexty)
                 successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
@@ -505,10 +508,16 @@ def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
 
     heuristic_cost = 0
 
+    # The maze distances of the layout are shared by every call; each food location
+    # is searched from once, the first time it is asked about
+    if 'mazeDistances' not in problem.heuristicInfo:
+        problem.heuristicInfo['mazeDistances'] = mazeDistances(problem.walls)
+    distances = problem.heuristicInfo['mazeDistances']
+
     # Finds the cost to reach the farthest location of food
-    # Finds the cost using BFS which makes it more pessimistic than just using Manhattan Distance
+    # Finds the cost using maze distances which makes it more pessimistic than just using Manhattan Distance
     for food_position in foodGrid.asList():
-        heuristic_cost = max(heuristic_cost, mazeDistance(position, food_position, problem.startingGameState))
+        heuristic_cost = max(heuristic_cost, distances.getDistance(food_position, position))
 
     return heuristic_cost
 
@@ -545,6 +554,8 @@ class ClosestDotSearchAgent(SearchAgent):
 
         # The AnyFoodSearchProblem class has a cost function that always returns 1 for any action
         # This means that there is no point in doing Uniform Cost Search and instead a better option is just doing BFS
+        # BFS is kept rather than the MazeDistances oracle: among equally close dots, the one
+        # BFS reaches first (and the path to it) decides the agent's moves and so its score
         return search.bfs(problem)
 
 
@@ -589,9 +600,9 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
 def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pacman.GameState) -> int:
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built. The gameState can be any game state -- Pacman's
-    position in that state is ignored.
+    Returns the maze distance between any two points, looked up in the
+    MazeDistances of the layout. The gameState can be any game state --
+    Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
@@ -602,5 +613,115 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return mazeDistances(walls).getDistance(point1, point2)
+
+
+class MazeDistances:
+    """
+    All-pairs maze distances between the open cells of a layout, computed
+    lazily: the first question about a cell runs one breadth-first search
+    from it, and the distances found are kept as a row of unsigned shorts.
+    Distances are symmetric, so a row answers questions both from and to its
+    cell, and no cell is ever searched from twice.
+
+    Use mazeDistances(walls) to share one instance between every problem and
+    game state of a layout.
+    """
+    UNREACHABLE = 0xFFFF
+
+    def __init__(self, walls):
+        self.height = walls.height
+        # Index of the open cell at (x, y), stored at x * height + y, or -1 for walls
+        self.index = array('i', [-1]) * (walls.width * walls.height)
+        self.positions = []
+        for x in range(walls.width):
+            for y in range(walls.height):
+                if not walls[x][y]:
+                    self.index[x * self.height + y] = len(self.positions)
+                    self.positions.append((x, y))
+        assert len(self.positions) < self.UNREACHABLE, 'Too many open cells for unsigned short distances'
+
+        # Open neighbors of each open cell, in the order PositionSearchProblem expands them
+        self.neighbors = []
+        for x, y in self.positions:
+            neighbors = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(action)
+                nextx, nexty = int(x + dx), int(y + dy)
+                if not walls[nextx][nexty]:
+                    neighbors.append(self.index[nextx * self.height + nexty])
+            self.neighbors.append(tuple(neighbors))
+        self.rows = [None] * len(self.positions)
+
+    def getCell(self, position):
+        "Returns the index of the open cell at position."
+        x, y = position
+        cell = self.index[x * self.height + y]
+        assert cell >= 0, 'position is a wall: ' + str(position)
+        return cell
+
+    def getRow(self, cell):
+        "Returns the distances from cell to every open cell, searching from it the first time."
+        row = self.rows[cell]
+        if row is None:
+            row = array('H', [self.UNREACHABLE]) * len(self.positions)
+            row[cell] = 0
+            frontier, distance = [cell], 0
+            while frontier:
+                distance += 1
+                nextFrontier = []
+                for current in frontier:
+                    for neighbor in self.neighbors[current]:
+                        if row[neighbor] == self.UNREACHABLE:
+                            row[neighbor] = distance
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+            self.rows[cell] = row
+        return row
+
+    def getDistance(self, position1, position2):
+        """
+        Returns the maze distance between two positions, or infinity if
+        neither can reach the other. Reuses the row of position2 if it has
+        one and position1 does not; otherwise searches from position1.
+        """
+        cell1, cell2 = self.getCell(position1), self.getCell(position2)
+        if self.rows[cell1] is None and self.rows[cell2] is not None:
+            cell1, cell2 = cell2, cell1
+        distance = self.getRow(cell1)[cell2]
+        return float('inf') if distance == self.UNREACHABLE else distance
+
+# MazeDistances of the layouts used most recently, keyed on the bits of their walls,
+# least recently used first. Only the few newest are kept, so that running many
+# layouts in one process does not keep every table alive.
+MAZE_DISTANCES_CACHE_SIZE = 4
+_mazeDistancesByWalls = {}
+
+# MazeDistances of each walls Grid still alive, keyed on its id, with a weak reference
+# to check the id has not been reused. Every game state of a layout returns the same
+# walls Grid, so lookups are O(1); packing the bits (or hashing the Grid) is O(w*h).
+_mazeDistancesByGrid = {}
+
+def mazeDistances(walls):
+    """
+    Returns the MazeDistances of a walls Grid, shared by every layout with the
+    same walls.
+    """
+    gridId = id(walls)
+    entry = _mazeDistancesByGrid.get(gridId)
+    if entry is not None and entry[0]() is walls:
+        return entry[1]
+
+    key = tuple(walls.packBits())
+    distances = _mazeDistancesByWalls.pop(key, None)
+    if distances is None:
+        distances = MazeDistances(walls)
+        while len(_mazeDistancesByWalls) >= MAZE_DISTANCES_CACHE_SIZE:
+            del _mazeDistancesByWalls[next(iter(_mazeDistancesByWalls))]
+    _mazeDistancesByWalls[key] = distances
+
+    def forget(ref):
+        if _mazeDistancesByGrid.get(gridId, (None,))[0] is ref:
+            del _mazeDistancesByGrid[gridId]
+    _mazeDistancesByGrid[gridId] = (weakref.ref(walls, forget), distances)
+    return distances
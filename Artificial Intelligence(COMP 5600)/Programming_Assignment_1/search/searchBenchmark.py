@@ -0,0 +1,150 @@
+# searchBenchmark.py
+# ------------------
+# Node-expansion throughput of uniformCostSearch and aStarSearch with
+# util.PriorityQueue, against the previous queue whose update scanned the
+# whole heap. Both queues must return the same path and expand the same
+# number of nodes; only the time differs. Maze frontiers stay small, so the
+# queues are also timed directly on a frontier of tens of thousands of items.
+#
+# Usage: python searchBenchmark.py [--repeats N]
+
+import heapq
+import optparse
+import random
+import time
+import layout
+import pacman
+import search
+import searchAgents
+import util
+
+
+class LinearScanPriorityQueue(util.PriorityQueue):
+    """
+      The previous util.PriorityQueue: update finds an item by scanning the
+      heap, and rebuilds the heap after decreasing its priority.
+    """
+    def  __init__(self):
+        self.heap = []
+        self.count = 0
+
+    def push(self, item, priority):
+        entry = (priority, self.count, item)
+        heapq.heappush(self.heap, entry)
+        self.count += 1
+
+    def pop(self):
+        (_, _, item) = heapq.heappop(self.heap)
+        return item
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        for index, (p, c, i) in enumerate(self.heap):
+            if i == item:
+                if p <= priority:
+                    break
+                del self.heap[index]
+                self.heap.append((priority, c, item))
+                heapq.heapify(self.heap)
+                break
+        else:
+            self.push(item, priority)
+
+
+def positionProblem(layoutName, costFn=lambda x: 1):
+    def makeProblem():
+        gameState = pacman.GameState()
+        gameState.initialize(layout.getLayout(layoutName), 0)
+        return searchAgents.PositionSearchProblem(gameState, costFn, warn=False, visualize=False)
+    return makeProblem
+
+def foodProblem(layoutName):
+    def makeProblem():
+        gameState = pacman.GameState()
+        gameState.initialize(layout.getLayout(layoutName), 0)
+        return searchAgents.FoodSearchProblem(gameState)
+    return makeProblem
+
+def cornersProblem(layoutName):
+    def makeProblem():
+        gameState = pacman.GameState()
+        gameState.initialize(layout.getLayout(layoutName), 0)
+        return searchAgents.CornersProblem(gameState)
+    return makeProblem
+
+# (name, search function, problem factory)
+BENCHMARKS = [
+    ('ucs bigMaze', search.uniformCostSearch, positionProblem('bigMaze')),
+    ('astar bigMaze manhattan', lambda problem: search.aStarSearch(problem, searchAgents.manhattanHeuristic),
+     positionProblem('bigMaze')),
+    ('ucs mediumMaze stayEast', search.uniformCostSearch, positionProblem('mediumMaze', lambda pos: .5 ** pos[0])),
+    ('ucs mediumMaze stayWest', search.uniformCostSearch, positionProblem('mediumMaze', lambda pos: 2 ** pos[0])),
+    ('ucs bigCorners corners', search.uniformCostSearch, cornersProblem('bigCorners')),
+    ('ucs trickySearch food', search.uniformCostSearch, foodProblem('trickySearch')),
+]
+
+def runSearch(searchFunction, makeProblem, queueClass, repeats):
+    """
+    Returns the actions, the number of expanded nodes and the best time of
+    repeats searches with queueClass as util.PriorityQueue.
+    """
+    original = util.PriorityQueue
+    util.PriorityQueue = queueClass
+    try:
+        best = None
+        for _ in range(repeats):
+            problem = makeProblem()
+            start = time.perf_counter()
+            actions = searchFunction(problem)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        return actions, problem._expanded, best
+    finally:
+        util.PriorityQueue = original
+
+def queueWorkload(queueClass, size, seed=0):
+    """
+    Pushes size items through update, decreases the priority of size random
+    items, then pops everything. Returns the popped order and the time taken.
+    """
+    rng = random.Random(seed)
+    priorities = [rng.randrange(10 * size) for _ in range(size)]
+    decreases = [(rng.randrange(size), rng.randrange(10 * size)) for _ in range(size)]
+    start = time.perf_counter()
+    queue = queueClass()
+    for item, priority in enumerate(priorities):
+        queue.update(item, priority)
+    for item, priority in decreases:
+        queue.update(item, priority)
+    order = []
+    while not queue.isEmpty():
+        order.append(queue.pop())
+    return order, time.perf_counter() - start
+
+def main():
+    parser = optparse.OptionParser('python searchBenchmark.py [--repeats N]')
+    parser.add_option('-r', '--repeats', dest='repeats', type='int', default=3,
+                      help='searches timed per benchmark and queue (best time is kept)')
+    options, _ = parser.parse_args()
+
+    print('%25s %9s %12s %12s %12s %12s %8s' % ('benchmark', 'expanded', 'scan (s)', 'scan nodes/s',
+                                                 'indexed (s)', 'idx nodes/s', 'speedup'))
+    for name, searchFunction, makeProblem in BENCHMARKS:
+        scanActions, scanExpanded, scanTime = runSearch(searchFunction, makeProblem, LinearScanPriorityQueue, options.repeats)
+        actions, expanded, seconds = runSearch(searchFunction, makeProblem, util.PriorityQueue, options.repeats)
+        assert actions == scanActions and expanded == scanExpanded, '%s: the queues disagree' % name
+        print('%25s %9d %12.4f %12.0f %12.4f %12.0f %7.1fx' % (name, expanded, scanTime, scanExpanded / scanTime,
+                                                              seconds, expanded / seconds, scanTime / seconds))
+
+    print()
+    print('%25s %12s %12s %8s' % ('queue workload', 'scan (s)', 'indexed (s)', 'speedup'))
+    for size in (1000, 5000, 10000):
+        scanOrder, scanTime = queueWorkload(LinearScanPriorityQueue, size)
+        order, seconds = queueWorkload(util.PriorityQueue, size)
+        assert order == scanOrder, 'the queues disagree on %d items' % size
+        print('%25s %12.4f %12.4f %7.1fx' % ('%d items' % size, scanTime, seconds, scanTime / seconds))
+
+if __name__ == '__main__':
+    main()
@@ -173,37 +173,79 @@ class PriorityQueue:
       has a priority associated with it and the client is usually interested
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
+
+      Entries are [priority, count, item, queued] lists in a binary heap, and
+      self.entries maps each item to its latest entry, so update finds an item
+      in O(1) instead of scanning the heap. A decreased priority is pushed as
+      a new entry with the old count, and the old entry is unqueued and
+      skipped when it reaches the top. Ties are still broken by insertion
+      order, so items come out in the same order as with a scan. An item's
+      entry is dropped from self.entries when it is popped, so the map only
+      holds queued items. Hashable items are hashed about once per push, update
+      and pop; unhashable items (e.g. tuples holding a list of actions) are
+      queued without an entry in self.entries, and update finds them by
+      scanning the heap.
     """
     def  __init__(self):
         self.heap = []
+        self.entries = {}
         self.count = 0
+        self.size = 0
 
     def push(self, item, priority):
-        entry = (priority, self.count, item)
+        entry = [priority, self.count, item, True]
+        try:
+            current = self.entries.setdefault(item, entry)
+        except TypeError:
+            self._add(entry)
+            return
+        # An item pushed twice is updated through its first entry to come out
+        if current is not entry and entry[:2] < current[:2]:
+            self.entries[item] = entry
+        self._add(entry)
+
+    def _add(self, entry):
         heapq.heappush(self.heap, entry)
         self.count += 1
+        self.size += 1
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        entry = heapq.heappop(self.heap)
+        while not entry[3]:
+            entry = heapq.heappop(self.heap)
+        entry[3] = False
+        self.size -= 1
+        item = entry[2]
+        try:
+            if self.entries.get(item) is entry:
+                del self.entries[item]
+        except TypeError:
+            pass
         return item
 
     def isEmpty(self):
-        return len(self.heap) == 0
+        return self.size == 0
 
     def update(self, item, priority):
-        # If item already in priority queue with higher priority, update its priority and rebuild the heap.
+        # If item already in priority queue with higher priority, update its priority.
         # If item already in priority queue with equal or lower priority, do nothing.
         # If item not in priority queue, do the same thing as self.push.
-        for index, (p, c, i) in enumerate(self.heap):
-            if i == item:
-                if p <= priority:
-                    break
-                del self.heap[index]
-                self.heap.append((priority, c, item))
-                heapq.heapify(self.heap)
-                break
-        else:
-            self.push(item, priority)
+        entry = [priority, self.count, item, True]
+        try:
+            current = self.entries.setdefault(item, entry)
+            tracked = True
+        except TypeError:
+            # Unhashable items have no entry in self.entries; scan for them
+            current = next((queued for queued in self.heap if queued[3] and queued[2] == item), entry)
+            tracked = False
+        if current is entry:
+            self._add(entry)
+        elif priority < current[0]:
+            current[3] = False
+            entry[1] = current[1]
+            if tracked:
+                self.entries[item] = entry
+            heapq.heappush(self.heap, entry)
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
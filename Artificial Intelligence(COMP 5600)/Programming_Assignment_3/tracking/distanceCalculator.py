@@ -28,9 +28,17 @@ and performing asynchronous computation via threads. These
 examples may help you in designing your own objects, but you
 shouldn't need to modify the Distancer code in order to use its
 distances.
+
+The distances of a layout are saved on disk (see DISTANCE_CACHE_DIRECTORY)
+the first time they are computed, so later games on the same layout load
+them at once instead of computing them again. Set the PACMAN_DISTANCE_CACHE
+environment variable to another directory to move them, or to an empty
+string to turn the cache off.
 """
 
 import threading, sys, time, random
+import hashlib, os
+from array import array
 
 class Distancer:
   def __init__(self, layout, background=True, default=10000):
@@ -46,14 +54,16 @@ class Distancer:
     self.default = default
 
     # Start computing distances in the background; when the dc finishes,
-    # it will fill in self._distances for us.
+    # it will fill in self._distances for us. Distances that were already
+    # computed, in this process or an earlier one, are filled in right away
+    # unless another layout's distances are being computed.
     dc = DistanceCalculator()
     dc.setAttr(layout, self)
     dc.setDaemon(True)
-    if background:
-      dc.start()
-    else:
+    if not background:
       dc.run()
+    elif not dc.runIfReady():
+      dc.start()
 
   def getDistance(self, pos1, pos2):
     """
@@ -75,11 +85,10 @@ class Distancer:
     return bestDistance
 
   def getDistanceOnGrid(self, pos1, pos2):
-    key = (pos1, pos2)
-    if key in self._distances:
-      return self._distances[key]
-    else:
-      raise Exception("Positions not in grid: " + str(key))
+    distance = self._distances.getDistance(pos1, pos2)
+    if distance is None:
+      raise Exception("Positions not in grid: " + str((pos1, pos2)))
+    return distance
 
   def isReadyForMazeDistance(self):
     return self._distances != None
@@ -112,6 +121,18 @@ distanceMap = {}
 distanceMapSemaphore = threading.Semaphore(1)
 distanceThread = None
 
+# Directory of the distance files of every layout seen so far, one per layout,
+# named after a hash of its walls. It belongs to the current user; None turns
+# the cache off.
+def getDefaultDistanceCacheDirectory():
+  directory = os.environ.get('PACMAN_DISTANCE_CACHE')
+  if directory is not None:
+    return directory or None
+  cacheHome = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(cacheHome, 'pacman-distances')
+
+DISTANCE_CACHE_DIRECTORY = getDefaultDistanceCacheDirectory()
+
 def waitOnDistanceCalculator(t):
   global distanceThread
   if distanceThread != None:
@@ -131,7 +152,7 @@ class DistanceCalculator(threading.Thread):
       if distanceThread != None: raise Exception('Multiple distance threads')
       distanceThread = self
 
-      distances = computeDistances(self.layout)
+      distances = loadDistances(self.layout)
       print('[Distancer]: Switching to maze distances',file=sys.stdout)
 
       distanceMap[self.layout.walls] = distances
@@ -142,50 +163,190 @@ class DistanceCalculator(threading.Thread):
     distanceMapSemaphore.release()
     self.distancer._distances = distances
 
+  def runIfReady(self):
+    """
+    Fills in the distances at once if they are in distanceMap or in the
+    distance cache, without waiting while another layout's distances are
+    computed. Returns whether it did; if not, call start() to compute them.
+    """
+    global distanceMap
+    if not distanceMapSemaphore.acquire(False):
+      return False
+    try:
+      if self.layout.walls in distanceMap:
+        distances = distanceMap[self.layout.walls]
+      else:
+        distances = loadCachedDistances(self.layout)
+        if distances is None:
+          return False
+        print('[Distancer]: Switching to maze distances',file=sys.stdout)
+        distanceMap[self.layout.walls] = distances
+    finally:
+      distanceMapSemaphore.release()
+    self.distancer._distances = distances
+    return True
+
+class DistanceTable:
+  """
+  Maze distances between every pair of open cells of a layout. Open cells
+  are numbered in walls.asList(False) order, index maps a position (x, y),
+  stored at x * height + y, to its cell number (-1 for walls), and the
+  distance from cell i to cell j is distances[i * size + j], an unsigned
+  short (UNREACHABLE if there is no path).
+
+  Saved tables start with a one-line header: FILE_FORMAT, the format version,
+  the byte order, the walls digest, the number of cells and the SHA-256 of
+  the distances that follow. A file whose header does not match is ignored.
+  """
+  UNREACHABLE = 0xFFFF
+  FILE_FORMAT = b'pacman-distances'
+  FILE_VERSION = 2
+
+  def __init__(self, walls):
+    self.width, self.height = walls.width, walls.height
+    self.positions = walls.asList(False)
+    self.size = len(self.positions)
+    if self.size >= self.UNREACHABLE:
+      raise Exception('Too many open cells for unsigned short distances: ' + str(self.size))
+    self.digest = hashlib.sha1(('%d %d\n%s' % (walls.width, walls.height, walls)).encode()).hexdigest()
+    self.index = array('i', [-1]) * (self.width * self.height)
+    for cell, (x, y) in enumerate(self.positions):
+      self.index[x * self.height + y] = cell
+    self.distances = None
+
+  def getCell(self, pos):
+    """
+    Returns the number of the open cell at pos, or -1 if pos is not an open cell.
+    """
+    x, y = int(pos[0]), int(pos[1])
+    if x != pos[0] or y != pos[1] or not (0 <= x < self.width and 0 <= y < self.height):
+      return -1
+    return self.index[x * self.height + y]
+
+  def getDistance(self, pos1, pos2):
+    """
+    Returns the maze distance between two positions, or None if either is
+    not an open cell. Cells that cannot reach each other are 1000000000 apart.
+    """
+    cell1, cell2 = self.getCell(pos1), self.getCell(pos2)
+    if cell1 < 0 or cell2 < 0:
+      return None
+    distance = self.distances[cell1 * self.size + cell2]
+    return 1000000000 if distance == self.UNREACHABLE else distance
+
+  def compute(self):
+    """
+    Fills in the distances with a breadth-first search from every open cell.
+    """
+    size, height, index = self.size, self.height, self.index
+    neighbors = []
+    for x, y in self.positions:
+      adjacent = []
+      for nextx, nexty in ((x, y+1), (x, y-1), (x+1, y), (x-1, y)):
+        if 0 <= nextx < self.width and 0 <= nexty < height and index[nextx * height + nexty] >= 0:
+          adjacent.append(index[nextx * height + nexty])
+      neighbors.append(adjacent)
+
+    self.distances = array('H', [self.UNREACHABLE]) * (size * size)
+    for source in range(size):
+      row = array('H', [self.UNREACHABLE]) * size
+      row[source] = 0
+      frontier, distance = [source], 0
+      while frontier:
+        distance += 1
+        nextFrontier = []
+        for node in frontier:
+          for other in neighbors[node]:
+            if row[other] == self.UNREACHABLE:
+              row[other] = distance
+              nextFrontier.append(other)
+        frontier = nextFrontier
+      self.distances[source * size:(source + 1) * size] = row
+
+  def getHeader(self, checksum):
+    return b' '.join([self.FILE_FORMAT, str(self.FILE_VERSION).encode(), sys.byteorder.encode(),
+                      self.digest.encode(), str(self.size).encode(), checksum.encode()]) + b'\n'
+
+  def load(self, path):
+    """
+    Reads the distances from the file at path. Returns False, leaving the
+    distances unset, if the file is missing, is not a table of this layout
+    in this format, or does not match its checksum.
+    """
+    distances = array('H')
+    try:
+      with open(path, 'rb') as f:
+        header = f.readline(256)
+        distances.fromfile(f, self.size * self.size)
+        if f.read(1):
+          return False
+    except (OSError, EOFError):
+      return False
+    if header != self.getHeader(hashlib.sha256(distances).hexdigest()):
+      return False
+    self.distances = distances
+    return True
+
+  def save(self, path):
+    """
+    Writes the distances to the file at path, through a temporary file so
+    that no reader ever sees half a table. Failing to write is not an error:
+    the distances will just be computed again next time.
+    """
+    temporaryPath = '%s.%d.tmp' % (path, os.getpid())
+    try:
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(temporaryPath, 'wb') as f:
+        f.write(self.getHeader(hashlib.sha256(self.distances).hexdigest()))
+        self.distances.tofile(f)
+      os.replace(temporaryPath, path)
+    except OSError:
+      if os.path.exists(temporaryPath):
+        os.remove(temporaryPath)
+
+def getDistanceCachePath(distances):
+  """
+  Returns the path of the distance file of a DistanceTable, named after the
+  file format version, a hash of its walls and the byte order the distances
+  are written in, or None if the cache is off.
+  """
+  if DISTANCE_CACHE_DIRECTORY is None:
+    return None
+  name = 'distances-v%d-%s-%s.bin' % (DistanceTable.FILE_VERSION, distances.digest, sys.byteorder)
+  return os.path.join(DISTANCE_CACHE_DIRECTORY, name)
+
+def loadCachedDistances(layout):
+  """
+  Returns the DistanceTable of layout read from its distance file, or None
+  if there is no valid one.
+  """
+  distances = DistanceTable(layout.walls)
+  path = getDistanceCachePath(distances)
+  if path is None or not distances.load(path):
+    return None
+  return distances
+
+def loadDistances(layout):
+  """
+  Returns the DistanceTable of layout, read from its distance file if there
+  is one, or else computed and saved for later games.
+  """
+  distances = loadCachedDistances(layout)
+  if distances is None:
+    distances = computeDistances(layout)
+    path = getDistanceCachePath(distances)
+    if path is not None:
+      distances.save(path)
+  return distances
+
 def computeDistances(layout):
-    distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = 1000000000
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
-    return distances
+  distances = DistanceTable(layout.walls)
+  distances.compute()
+  return distances
 
 
 def getDistanceOnGrid(distances, pos1, pos2):
-    key = (pos1, pos2)
-    if key in distances:
-      return distances[key]
+  distance = distances.getDistance(pos1, pos2)
+  if distance is None:
     return 100000
-
+  return distance
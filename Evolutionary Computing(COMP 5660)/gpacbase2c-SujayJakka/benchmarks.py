@@ -0,0 +1,227 @@
+
+# benchmarks.py
+#
+# Benchmarks of the hot paths of a GPac run: games, tree variation and selection.
+# Controllers are drawn with a fixed seed at the sizes of a config's EAs (by default
+# the 2c config: 50 + 10 Pac-Man and 30 + 5 ghost controllers), and every repetition
+# re-seeds the random generators, so each run of the suite times exactly the same work.
+#
+# Each benchmark reports its best time per call over --repeats timed batches, the peak
+# memory allocated by one call (tracemalloc) and, for games, games played per second.
+# Results are compared with a baseline JSON file, and any benchmark more than --tolerance
+# slower or hungrier than its baseline is reported as a regression (exit status 1).
+# Baselines depend on the machine, so record one (--save) on the machine you run on.
+#
+# Examples:
+#   python benchmarks.py --save
+#   python benchmarks.py
+#   python benchmarks.py --only play_GPac play_GPac_batched --profile
+
+import argparse
+import cProfile
+import json
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from pathlib import Path
+from snake_eyes import read_config
+from fitness import *
+from tree_genotype import TreeGenotype
+from prefix_genotype import PrefixTreeGenotype
+from selection import *
+
+DEFAULT_CONFIG = 'configs/2c/green_config.txt'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+SEED = 0
+MIN_BATCH_SECONDS = 0.05
+# Slowdowns of less than this many seconds per call are timing noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 1e-4
+
+
+class Individual():
+    def __init__(self, fitness):
+        self.fitness = fitness
+
+
+# Each benchmark takes the config and the shared inputs, and returns the function to
+# time and the number of games one call plays (None if it plays none)
+
+def game_benchmark(**play_kwargs):
+    def benchmark(config, inputs):
+        pac, ghost = inputs['pac'][0], inputs['ghost'][0]
+        return lambda: play_GPac(pac, ghost, **config['game'], **play_kwargs), 1
+    return benchmark
+
+
+def vectorized_game_benchmark(config, inputs):
+    # One game per Pac-Man child, against random ghosts, as a generation's evaluations
+    pacs = inputs['pac'][:config['pac_ea']['num_children']]
+    return lambda: play_GPac_vectorized(pacs, seed=SEED, **config['game']), len(pacs)
+
+
+def variation_benchmark(genotype, player):
+    def benchmark(config, inputs):
+        population = inputs[f'{player}_{genotype.__name__}']
+        recombination_kwargs = config[f'{player}_recombination_kwargs']
+        mutation_kwargs = config[f'{player}_mutation_kwargs']
+        def variation():
+            for i in range(config[f'{player}_ea']['num_children']):
+                child = population[2 * i].recombine(population[2 * i + 1], **recombination_kwargs)
+                child.mutate(**mutation_kwargs)
+        return variation, None
+    return benchmark
+
+
+def selection_benchmark(player, survival):
+    def benchmark(config, inputs):
+        ea = config[f'{player}_ea']
+        individuals = inputs[f'{player}_individuals']
+        if survival:
+            kwargs = config[f'{player}_survival_selection_kwargs']
+            return lambda: ea['survival_selection'](individuals, ea['mu'], **kwargs), None
+        kwargs = config[f'{player}_parent_selection_kwargs']
+        return lambda: ea['parent_selection'](individuals[:ea['mu']], 2 * ea['num_children'], **kwargs), None
+    return benchmark
+
+
+BENCHMARKS = {
+    'play_GPac': game_benchmark(),
+    'play_GPac_batched': game_benchmark(batched=True),
+    'play_GPac_maze': game_benchmark(batched=True, maze=True),
+    'play_GPac_vectorized': vectorized_game_benchmark,
+    'TreeGenotype.recombine/mutate (pac)': variation_benchmark(TreeGenotype, 'pac'),
+    'TreeGenotype.recombine/mutate (ghost)': variation_benchmark(TreeGenotype, 'ghost'),
+    'PrefixTreeGenotype.recombine/mutate (pac)': variation_benchmark(PrefixTreeGenotype, 'pac'),
+    'parent_selection (pac)': selection_benchmark('pac', False),
+    'survival_selection (pac)': selection_benchmark('pac', True),
+    'parent_selection (ghost)': selection_benchmark('ghost', False),
+    'survival_selection (ghost)': selection_benchmark('ghost', True)
+}
+
+
+# Inputs shared by the benchmarks: mu + num_children controllers of each player, as
+# TreeGenotypes and PrefixTreeGenotypes, and individuals with random fitnesses for the
+# selection operators
+def make_inputs(config):
+    inputs = dict()
+    for player in ('pac', 'ghost'):
+        ea, problem = config[f'{player}_ea'], config[f'{player}_problem']
+        size = ea['mu'] + 2 * ea['num_children']
+        for genotype in (TreeGenotype, PrefixTreeGenotype):
+            random.seed(SEED)
+            inputs[f'{player}_{genotype.__name__}'] = genotype.initialization(size, **problem)
+        inputs[player] = inputs[f'{player}_TreeGenotype']
+        random.seed(SEED)
+        inputs[f'{player}_individuals'] = [Individual(random.gauss(0, 1)) for _ in range(ea['mu'] + ea['num_children'])]
+    return inputs
+
+
+# Best time per call over repeats batches of calls of function, and the peak memory
+# one call allocates. Batches hold enough calls to last at least MIN_BATCH_SECONDS,
+# so that fast functions are not timed at the resolution of the clock.
+def measure(function, repeats):
+    start = time.perf_counter()
+    function()
+    number = max(1, int(MIN_BATCH_SECONDS / max(time.perf_counter() - start, 1e-9)))
+    times = []
+    for _ in range(repeats):
+        random.seed(SEED)
+        np.random.seed(SEED)
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+
+    random.seed(SEED)
+    np.random.seed(SEED)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmarks(config, names, repeats, profile=False):
+    inputs = make_inputs(config)
+    results = dict()
+    for name in names:
+        function, games = BENCHMARKS[name](config, inputs)
+        # One untimed call warms caches (e.g., compiled controllers) shared with a real run
+        random.seed(SEED)
+        function()
+        seconds, peak = measure(function, repeats)
+        results[name] = {'seconds': seconds, 'peak_bytes': peak,
+                         'evaluations_per_second': None if games is None else games / seconds}
+        if profile:
+            profiler = cProfile.Profile()
+            random.seed(SEED)
+            profiler.runcall(function)
+            print(f'Profile of {name}:')
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    return results
+
+
+# Names of the benchmarks in results whose time or peak memory exceeds the baseline's by
+# more than tolerance (a fraction). Benchmarks missing from the baseline are skipped.
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        seconds = baseline[name]['seconds']
+        if result['seconds'] > max(seconds * (1 + tolerance), seconds + MIN_REGRESSION_SECONDS) \
+                or result['peak_bytes'] > baseline[name]['peak_bytes'] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f'{"benchmark":>42} {"time (ms)":>10} {"baseline":>10} {"peak (MB)":>10} {"games/s":>10}')
+    for name, result in results.items():
+        reference = f'{1000 * baseline[name]["seconds"]:>10.3f}' if name in baseline else f'{"-":>10}'
+        rate = result['evaluations_per_second']
+        rate = f'{rate:>10.2f}' if rate is not None else f'{"-":>10}'
+        print(f'{name:>42} {1000 * result["seconds"]:>10.3f} {reference} {result["peak_bytes"] / 2**20:>10.2f} {rate}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the GPac hot paths')
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='config whose EA sizes are benchmarked')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file to compare with')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--repeats', type=int, default=5, help='timed batches of calls per benchmark')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--profile', action='store_true', help='print a cProfile of each benchmark')
+    args = parser.parse_args()
+
+    config = read_config(args.config, globals(), locals())
+    results = run_benchmarks(config, args.only or list(BENCHMARKS), args.repeats, args.profile)
+
+    baseline_path = Path(args.baseline)
+    baseline = dict()
+    if baseline_path.exists():
+        stored = json.loads(baseline_path.read_text())
+        if stored['config'] == args.config:
+            baseline = stored['results']
+        else:
+            print(f'Ignoring {baseline_path}, which was recorded with {stored["config"]}')
+    print_results(results, baseline)
+    if args.save:
+        # Benchmarks not run this time keep their previous baseline
+        baseline.update(results)
+        baseline_path.write_text(json.dumps({'config': args.config, 'results': baseline}, indent=2))
+        print(f'Saved baseline to {baseline_path}')
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f'Regression: {name} is more than {100 * args.tolerance:.0f}% slower or larger than its baseline')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
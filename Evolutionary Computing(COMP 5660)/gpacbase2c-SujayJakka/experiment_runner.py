@@ -0,0 +1,380 @@
+
+# experiment_runner.py
+#
+# Command-line driver for multi-run GPac experiments.
+# Runs are fanned out across processes and each run's log, best controller(s), best game log
+# and histogram data are written to a ResultStore as soon as the run finishes.
+# Re-running the same command skips every run that already completed,
+# so an interrupted experiment resumes where it left off.
+#
+# Examples, with the budgets of the 2b and 2c notebooks:
+#   python experiment_runner.py configs/2b/green_config.txt --runs 10 --evaluations 10000
+#   python experiment_runner.py configs/2c/green_config.txt --kind coevolution --runs 10 --evaluations 10000
+#
+# With --records, gp runs keep per-generation records (records.csv, see run_records.py)
+# instead of a text log. Coevolution runs keep text logs, with both populations in one log.
+#
+# With --islands K, each run is an island-model run (see island_model.py) over K processes,
+# exchanging migrants every --migration-interval generations; runs are then done one at a time.
+#   python experiment_runner.py configs/2b/green_config.txt --runs 10 --evaluations 2000 --islands 4
+#
+# With --backend multiprocessing or futures, each run plays its games on a seeded evaluator
+# (see evaluators.py) with --processes workers; runs are then done one at a time.
+#   python experiment_runner.py configs/2b/green_config.txt --runs 10 --evaluations 2000 --backend multiprocessing
+
+import argparse
+import contextlib
+import copy
+import multiprocessing
+import random
+import statistics
+from pathlib import Path
+from snake_eyes import read_config
+from genetic_programming import GeneticProgrammingPopulation
+from gpac_population_evaluation import base_population_evaluation, competitive_population_evaluation
+from match_scheduler import MatchScheduler, Match
+from fitness import play_GPac
+from tree_genotype import *
+from prefix_genotype import PrefixTreeGenotype
+from selection import *
+from histogram import *
+from result_store import ResultStore
+from island_model import run_islands, island_budget, merge_logs, TOPOLOGIES
+from evaluators import make_evaluator
+
+
+# Columns of log_gp_stats in run records, in the order they are logged
+GP_STATS = ('Local best penalized fitness', 'Local mean penalized fitness', 'Local best base fitness',
+            'Local mean base fitness', 'Local mean tree size', 'Local mean tree height')
+
+
+def log_gp_stats(ea):
+    ea.log_entry('Evaluations', ea.evaluations)
+    ea.log_cache_stats()
+    ea.log_entry('Local best penalized fitness', max(map(lambda x:x.fitness, ea.population)))
+    ea.log_entry('Local mean penalized fitness', statistics.mean(map(lambda x:x.fitness, ea.population)))
+    ea.log_entry('Local best base fitness', max(map(lambda x:x.base_fitness, ea.population)))
+    ea.log_entry('Local mean base fitness', statistics.mean(map(lambda x:x.base_fitness, ea.population)))
+    ea.log_entry('Local mean tree size', statistics.mean(map(lambda x:x.genes.size, ea.population)))
+    ea.log_entry('Local mean tree height', statistics.mean(map(lambda x:x.genes.height, ea.population)))
+    ea.end_generation(GP_STATS)
+
+
+# Assignment 2b: GP Pac-Man controllers with parsimony pressure.
+def gp_run(num_evaluations, config, record_path=None, migration=None, evaluator=None):
+    hist = PenaltyHistogramMaker()
+    base_hist = RoundedFitnessHistogramMaker()
+
+    def record(individuals):
+        for individual in individuals:
+            hist.add(individual.fitness)
+            base_hist.add(individual.base_fitness)
+
+    ea = GeneticProgrammingPopulation(**config['ea'], **config, record_path=record_path, text_log=record_path is None)
+    base_population_evaluation(ea.population, evaluator=evaluator, cache=ea.fitness_cache, **config['fitness_kwargs'],
+                               **config['game'])
+    ea.evaluations = len(ea.population)
+    record(ea.population)
+    best_solution = max(ea.population, key=lambda individual: individual.base_fitness)
+    log_gp_stats(ea)
+
+    while ea.evaluations < num_evaluations:
+        children = ea.generate_children()
+        base_population_evaluation(children, evaluator=evaluator, cache=ea.fitness_cache, **config['fitness_kwargs'],
+                                   **config['game'])
+        ea.evaluations += len(children)
+        record(children)
+        best_solution = max([best_solution] + children, key=lambda individual: individual.base_fitness)
+        ea.population += children
+        ea.survival()
+        log_gp_stats(ea)
+        if migration is not None:
+            migration(ea)
+
+    texts = {
+        'best_solution': best_solution.serialize(),
+        'best_fitness': str(best_solution.base_fitness),
+        'best_log': ''.join(str(line) + '\n' for line in best_solution.log)
+    }
+    histograms = {
+        'histogram': hist,
+        'base_histogram': base_hist
+    }
+    return ea.log, texts, histograms
+
+
+# Splits a 2c config into the configs of its Pac-Man and ghost populations, as the 2c notebook
+# does: pac_ and ghost_ sections go to their population without the prefix, others to both.
+def split_config(config):
+    pac_config = dict()
+    ghost_config = dict()
+    for key in config:
+        if key.startswith('pac_'):
+            pac_config[key.partition('_')[-1]] = config[key]
+        elif key.startswith('ghost_'):
+            ghost_config[key.partition('_')[-1]] = config[key]
+        else:
+            pac_config[key] = config[key]
+            ghost_config[key] = config[key]
+    return copy.deepcopy(pac_config), copy.deepcopy(ghost_config)
+
+
+# Assignment 2c: Pac-Man and ghost controllers coevolved against each other.
+# Each generation, both populations' children join them and one MatchScheduler plays every
+# individual against opponents from the other population, reusing games of repeated pairings.
+# Evaluations are the games of each generation's plan, as in the 2c notebook.
+def coevolution_run(num_evaluations, config, record_path=None, evaluator=None):
+    assert record_path is None, 'Coevolution runs keep text logs'
+    pac_config, ghost_config = split_config(config)
+    pac_hist = RoundedFitnessHistogramMaker()
+    ghost_hist = RoundedFitnessHistogramMaker()
+
+    def record(pacs, ghosts):
+        for pac in pacs:
+            pac_hist.add(pac.base_fitness)
+        for ghost in ghosts:
+            ghost_hist.add(ghost.base_fitness)
+
+    pac_ea = GeneticProgrammingPopulation(**pac_config['ea'], **pac_config)
+    ghost_ea = GeneticProgrammingPopulation(**ghost_config['ea'], **ghost_config)
+    with MatchScheduler(config['fitness_kwargs']['sample_size'], evaluator=evaluator, **config['game']) as scheduler:
+        evaluations = competitive_population_evaluation(pac_ea.population, ghost_ea.population,
+                                                        scheduler=scheduler, **config['fitness_kwargs'])
+        pac_ea.evaluations = ghost_ea.evaluations = evaluations
+        record(pac_ea.population, ghost_ea.population)
+        log_gp_stats(pac_ea)
+        log_gp_stats(ghost_ea)
+
+        while evaluations < num_evaluations:
+            pac_children = pac_ea.generate_children()
+            ghost_children = ghost_ea.generate_children()
+            pac_ea.population += pac_children
+            ghost_ea.population += ghost_children
+            evaluations += competitive_population_evaluation(pac_ea.population, ghost_ea.population,
+                                                             scheduler=scheduler, **config['fitness_kwargs'])
+            pac_ea.evaluations = ghost_ea.evaluations = evaluations
+            record(pac_children, ghost_children)
+            pac_ea.survival()
+            ghost_ea.survival()
+            log_gp_stats(pac_ea)
+            log_gp_stats(ghost_ea)
+
+        games = [f'Games played: {scheduler.games_played}', f'Games reused: {scheduler.games_reused}']
+
+    # The best of the final populations, against each other's populations, and a game between them
+    best_pac = max(pac_ea.population, key=lambda individual: individual.base_fitness)
+    best_ghost = max(ghost_ea.population, key=lambda individual: individual.base_fitness)
+    _, best_log = play_GPac(best_pac, best_ghost, **config['game'])
+    log = [f'Pac-Man {line}' for line in pac_ea.log] + [f'Ghost {line}' for line in ghost_ea.log] + games
+    texts = {
+        'best_solution': best_pac.serialize(),
+        'best_fitness': str(best_pac.base_fitness),
+        'best_ghost': best_ghost.serialize(),
+        'best_ghost_fitness': str(best_ghost.base_fitness),
+        'best_log': ''.join(str(line) + '\n' for line in best_log)
+    }
+    histograms = {
+        'pac_histogram': pac_hist,
+        'ghost_histogram': ghost_hist
+    }
+    return log, texts, histograms
+
+
+RUN_KINDS = {
+    'gp': gp_run,
+    'coevolution': coevolution_run
+}
+
+
+# Histogram artifacts written by each kind of run, merged across runs by summarize
+RUN_HISTOGRAMS = {
+    'gp': {
+        'histogram': PenaltyHistogramMaker,
+        'base_histogram': RoundedFitnessHistogramMaker
+    },
+    'coevolution': {
+        'pac_histogram': RoundedFitnessHistogramMaker,
+        'ghost_histogram': RoundedFitnessHistogramMaker
+    }
+}
+
+
+# Texts of the best run that summarize copies to the experiment root
+RUN_BEST_TEXTS = {
+    'gp': ('best_solution', 'best_log'),
+    'coevolution': ('best_solution', 'best_ghost', 'best_log')
+}
+
+
+# Config entries each kind of run reads, by section. Trees need all of their primitives,
+# including constants, wherever they are grown (initialization and mutation).
+TREE_ENTRIES = ('depth_limit', 'terminals', 'nonterminals', 'constant_range')
+REQUIRED_ENTRIES = {
+    'gp': {
+        'ea': ('mu', 'num_children', 'individual_class'),
+        'problem': TREE_ENTRIES + ('prob_of_full_method',),
+        'mutation_kwargs': TREE_ENTRIES,
+        'fitness_kwargs': ('parsimony_coefficient', 'experiment')
+    },
+    'coevolution': {
+        'pac_ea': ('mu', 'num_children'),
+        'ghost_ea': ('mu', 'num_children'),
+        'pac_problem': TREE_ENTRIES + ('prob_of_full_method',),
+        'ghost_problem': TREE_ENTRIES + ('prob_of_full_method',),
+        'pac_mutation_kwargs': TREE_ENTRIES,
+        'ghost_mutation_kwargs': TREE_ENTRIES,
+        'fitness_kwargs': ('pac_parsimony_coefficient', 'ghost_parsimony_coefficient', 'sample_size')
+    }
+}
+
+
+# Checks that a config has every entry its kind of run reads, naming any that are missing,
+# so a bad config fails before any game is played rather than partway through a run
+def check_config(kind, config):
+    missing = [f'[{section}] {name}' for section, names in REQUIRED_ENTRIES[kind].items()
+               for name in names if name not in config.get(section, dict())]
+    assert not missing, f'{kind} runs need config entries the config lacks: {", ".join(missing)}'
+
+
+# Single-population runs can be island-model runs
+ISLAND_KINDS = ('gp',)
+
+
+# Island-model run: the budget is split over num_islands processes, and their logs are merged
+# into one, their best controllers compared and their histograms merged
+def island_run(kind, num_evaluations, config, seed, num_islands, interval, num_migrants, topology='ring'):
+    assert kind in ISLAND_KINDS, f'Island-model runs support {ISLAND_KINDS} runs'
+    island_evaluations = island_budget(num_evaluations, num_islands, config['ea']['mu'], config['ea']['num_children'])
+    outputs = run_islands(RUN_KINDS[kind], island_evaluations, config, num_islands, interval, num_migrants, topology, seed)
+    log = [f'islands: {num_islands}', f'migration interval: {interval}', f'migrants: {num_migrants}',
+           f'topology: {topology}'] + merge_logs([log for log, _, _ in outputs])
+    texts = max((texts for _, texts, _ in outputs), key=lambda texts: float(texts['best_fitness']))
+    histograms = {name: hist_class.merge([island_histograms[name] for _, _, island_histograms in outputs])
+                  for name, hist_class in RUN_HISTOGRAMS[kind].items()}
+    return log, texts, histograms
+
+
+# Evaluator of a run's games on backend with processes workers (see evaluators.py),
+# or a null context if games are played in the run's own process. Each game is seeded
+# from the run's random stream, so results don't depend on the backend.
+# Coevolution runs play Matches between controllers of both populations.
+def run_evaluator(kind, config, backend=None, processes=None):
+    if backend is None:
+        return contextlib.nullcontext()
+    individual_class = Match if kind == 'coevolution' else config['ea']['individual_class']
+    return make_evaluator(individual_class, backend, processes, **config['game'])
+
+
+# Runs one independent run and writes it to the store. Each run reads its own
+# config and seeds itself from its index, so results don't depend on scheduling.
+# islands holds island_run's num_islands, interval, num_migrants and topology, if any.
+# backend and processes, if any, choose the evaluator of the run's games.
+def run_and_store(kind, config_path, run, num_evaluations, store_root, seed, records=False, islands=None,
+                  backend=None, processes=None):
+    random.seed(seed + run)
+    config = read_config(str(config_path), globals(), locals())
+    check_config(kind, config)
+    store = ResultStore(store_root)
+    record_path = store.records_path(run) if records else None
+    if islands is not None:
+        assert not records, 'Island-model runs keep text logs'
+        assert backend is None, 'Island-model runs play their games in their island processes'
+        log, texts, histograms = island_run(kind, num_evaluations, config, seed + run, **islands)
+    else:
+        with run_evaluator(kind, config, backend, processes) as evaluator:
+            log, texts, histograms = RUN_KINDS[kind](num_evaluations, config, record_path, evaluator=evaluator)
+    store.write_run(run, log, texts, histograms)
+    return run
+
+
+def _run_and_store(args):
+    return run_and_store(*args)
+
+
+def run_experiment(kind, config_path, num_runs, num_evaluations, store_root, processes=None, seed=0, records=False,
+                   islands=None, backend=None):
+    check_config(kind, read_config(str(config_path), globals(), locals()))
+    assert not records or kind == 'gp', 'Only gp runs keep records; coevolution runs keep text logs'
+    store = ResultStore(store_root)
+    store.discard_partial_runs()
+    store.save_config(config_path)
+
+    pending = store.pending_runs(num_runs)
+    skipped = num_runs - len(pending)
+    if skipped:
+        print(f'Skipping {skipped} completed run(s) in {store.root}')
+
+    # With a parallel backend, processes are the evaluator's workers rather than runs
+    parallel_backend = backend is not None and backend != 'serial'
+    jobs = [(kind, config_path, run, num_evaluations, store_root, seed, records, islands, backend,
+             processes if parallel_backend else None) for run in pending]
+    if islands is not None or parallel_backend:
+        # Islands and evaluator workers are processes of their own, which pool workers can't start
+        for job in jobs:
+            run = _run_and_store(job)
+            print(f'Run {run} finished and saved to {store.run_dir(run)}')
+    elif jobs:
+        with multiprocessing.Pool(processes) as pool:
+            for run in pool.imap_unordered(_run_and_store, jobs):
+                print(f'Run {run} finished and saved to {store.run_dir(run)}')
+
+    summarize(kind, store, num_runs)
+    return store
+
+
+# Merges per-run histograms, writes best_per_run.txt for all completed runs,
+# and copies the best controller(s) across runs (and the best game log) to the experiment root
+def summarize(kind, store, num_runs):
+    runs = [run for run in range(num_runs) if store.is_complete(run)]
+    best_per_run = [float(store.read_text(run, 'best_fitness')) for run in runs]
+    with open(store.root / 'best_per_run.txt', 'w') as f:
+        for result in best_per_run:
+            f.write(str(result) + '\n')
+    if not runs:
+        return
+
+    for name, hist_class in RUN_HISTOGRAMS[kind].items():
+        hists = [store.read_histogram(run, name, hist_class()) for run in runs]
+        hist_class.merge(hists).save_to_file(store.root / f'{name}.txt')
+
+    best_run = runs[best_per_run.index(max(best_per_run))]
+    for name in RUN_BEST_TEXTS[kind]:
+        with open(store.root / f'{name}.txt', 'w') as f:
+            f.write(store.read_text(best_run, name))
+
+    print(f'{len(runs)}/{num_runs} runs complete; mean best: {statistics.mean(best_per_run)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a multi-run GPac experiment with a resumable result store.')
+    parser.add_argument('config', type=Path, help='path to the experiment config')
+    parser.add_argument('--kind', choices=sorted(RUN_KINDS), default='gp', help='gp (2b) or coevolution (2c)')
+    parser.add_argument('--runs', type=int, default=10, help='number of independent runs')
+    parser.add_argument('--evaluations', type=int, required=True, help='fitness evaluations per run')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: all cores), running runs or, with a parallel --backend, '
+                             'playing games')
+    parser.add_argument('--backend', choices=('serial', 'multiprocessing', 'futures'), default=None,
+                        help='play games through a seeded evaluator on this backend (see evaluators.py)')
+    parser.add_argument('--seed', type=int, default=0, help='run i is seeded with seed + i')
+    parser.add_argument('--records', action='store_true',
+                        help='keep per-generation records (records.csv) instead of text logs (gp runs)')
+    parser.add_argument('--islands', type=int, default=None, help='island-model runs over this many processes')
+    parser.add_argument('--migration-interval', type=int, default=5, help='generations between migrations')
+    parser.add_argument('--migrants', type=int, default=1, help='individuals each island sends per migration')
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='ring', help='where islands send their migrants')
+    parser.add_argument('--out', type=Path, default=None,
+                        help='result store directory (default: results/<config dir>/<config name>)')
+    args = parser.parse_args()
+
+    store_root = args.out or Path('results') / args.config.parent.name / args.config.stem
+    islands = None
+    if args.islands is not None:
+        islands = {'num_islands': args.islands, 'interval': args.migration_interval,
+                   'num_migrants': args.migrants, 'topology': args.topology}
+    run_experiment(args.kind, args.config, args.runs, args.evaluations, store_root, args.processes, args.seed,
+                   args.records, islands, args.backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,11 @@
 # fitness.py
 
 import gpac
+from gpac_vector import VectorGPacGame, ACTIONS, ACTION_DELTAS
+from maze_distances import MazeDistances, PillField
 import random
+import operator
+import numpy as np
 from functools import cache
 from math import inf
 
@@ -10,20 +14,20 @@ from math import inf
 def manhattan(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def nearest_distance_to_pills(set_of_pill_locations, current_location):
+def nearest_distance_to_pills(set_of_pill_locations, current_location, distance=manhattan):
     nearest_distance_to_pill = inf
     for pill_location in set_of_pill_locations:
-        nearest_distance_to_pill = min(nearest_distance_to_pill, manhattan(pill_location, current_location))
+        nearest_distance_to_pill = min(nearest_distance_to_pill, distance(pill_location, current_location))
     return nearest_distance_to_pill
 
-def nearest_distance_to_ghosts(player_location_dict, my_player, current_location):
+def nearest_distance_to_ghosts(player_location_dict, my_player, current_location, distance=manhattan):
     nearest_distance_to_ghost = inf
     for player in player_location_dict:
         # Makes sure to not calculate the distance with my_player to itself
         # Without this the function will always return 0
         # 2c Code: Makes sure it finds distances with other Ghosts not Pac-Man
         if player != my_player and player != "m":
-            nearest_distance_to_ghost = min(nearest_distance_to_ghost, manhattan(player_location_dict[player], current_location))
+            nearest_distance_to_ghost = min(nearest_distance_to_ghost, distance(player_location_dict[player], current_location))
     return nearest_distance_to_ghost
 
 def find_state_score(terminal_dict, node):
@@ -59,23 +63,327 @@ def find_state_score(terminal_dict, node):
         b = find_state_score(terminal_dict, node.right)
         return random.uniform(min(a, b), max(a, b))
     
+# Order of the terminals in a terminal vector, the input of a compiled tree.
+# Pac-Man vectors hold 0 for M.
+TERMINALS = ('G', 'P', 'F', 'W', 'M')
+
+# Trees taller than this run as postfix programs, since deeply nested
+# expressions exceed the limits of Python's parser
+MAX_COMPILED_HEIGHT = 50
+
+# If the denominator is 0, it will just return 0
+def protected_division(a, b):
+    return 0 if b == 0 else a / b
+
+def random_between(a, b):
+    return random.uniform(min(a, b), max(a, b))
+
+# Elementwise versions of the above over arrays of states.
+# Ties and nan pick the same bound as Python's min and max do, and RAND
+# draws once per state (shaped like states) even if a and b are constants.
+def protected_division_array(a, b):
+    a, b = np.broadcast_arrays(a, b)
+    result = np.zeros(a.shape)
+    with np.errstate(all='ignore'):
+        np.divide(a, b, out=result, where=b != 0)
+    return result
+
+def random_between_array(a, b, states):
+    a, b, _ = np.broadcast_arrays(a, b, states)
+    low = np.where(b < a, b, a)
+    high = np.where(b > a, b, a)
+    draws = [random.uniform(l, h) for l, h in zip(low.ravel().tolist(), high.ravel().tolist())]
+    return np.array(draws).reshape(low.shape)
+
+NONTERMINAL_FUNCTIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': protected_division,
+    'RAND': random_between
+}
+
+VECTORIZED_NONTERMINAL_FUNCTIONS = dict(NONTERMINAL_FUNCTIONS, **{
+    '/': protected_division_array,
+    'RAND': random_between_array
+})
+
+# Flattens a tree into a postfix program of (kind, value) instructions, where kind is
+# 'terminal' (value is an index into the terminal vector), 'constant' or 'nonterminal'
+# (value is the primitive). Children come before their parent, left before right,
+# so a program consumes RAND draws in the same order as find_state_score.
+def postfix_program(root):
+    # Genes that aren't Node trees, e.g. prefix_genotype.PrefixTree, flatten themselves
+    if hasattr(root, 'postfix_program'):
+        return root.postfix_program()
+    program = []
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node.primitive, str):
+            program.append(('constant', node.primitive))
+        elif node.primitive in TERMINALS:
+            program.append(('terminal', TERMINALS.index(node.primitive)))
+        elif expanded:
+            program.append(('nonterminal', node.primitive))
+        else:
+            assert node.primitive in NONTERMINAL_FUNCTIONS, f'Unknown primitive {node.primitive}'
+            stack.extend(((node, True), (node.right, False), (node.left, False)))
+    return program
+
+def run_postfix_program(program, terminals, functions=NONTERMINAL_FUNCTIONS):
+    stack = []
+    for kind, value in program:
+        if kind == 'terminal':
+            stack.append(terminals[value])
+        elif kind == 'constant':
+            stack.append(value)
+        else:
+            b = stack.pop()
+            a = stack.pop()
+            stack.append(functions[value](a, b))
+    return stack[0]
+
+# Compiles a tree into a function of a terminal vector that returns the same score as
+# find_state_score, including division by zero and the sequence of RAND draws.
+# The tree becomes one Python expression, e.g. ((G + 2.5) * _div(P, W)).
+#
+# A vectorized function takes a (len(TERMINALS), states) array instead and returns a
+# score per state (or a scalar, for trees without terminals). Scores are the same as
+# find_state_score's, but RAND draws are made node by node rather than state by state.
+def compile_tree(root, vectorized=False):
+    functions = VECTORIZED_NONTERMINAL_FUNCTIONS if vectorized else NONTERMINAL_FUNCTIONS
+    program = postfix_program(root)
+    namespace = {'_div': functions['/'], '_rand': functions['RAND']}
+    expressions = []
+    heights = []
+    for kind, value in program:
+        if kind == 'terminal':
+            expressions.append(TERMINALS[value])
+            heights.append(0)
+        elif kind == 'constant':
+            if value == value and abs(value) != inf:
+                expressions.append(repr(value))
+            else:
+                # nan and inf have no literal, so they are bound by name
+                name = f'_c{len(namespace)}'
+                namespace[name] = value
+                expressions.append(name)
+            heights.append(0)
+        else:
+            b, a = expressions.pop(), expressions.pop()
+            heights.append(1 + max(heights.pop(), heights.pop()))
+            if value == '/':
+                expressions.append(f'_div({a}, {b})')
+            elif value == 'RAND':
+                expressions.append(f'_rand({a}, {b}, G)' if vectorized else f'_rand({a}, {b})')
+            else:
+                expressions.append(f'({a} {value} {b})')
+
+    if heights[0] > MAX_COMPILED_HEIGHT:
+        if vectorized:
+            return lambda terminals: run_postfix_program(program, terminals, dict(
+                functions, RAND=lambda a, b: random_between_array(a, b, terminals[0])))
+        return lambda terminals: run_postfix_program(program, terminals, functions)
+    source = f'def controller(terminals):\n    {", ".join(TERMINALS)} = terminals\n    return {expressions[0]}\n'
+    if vectorized:
+        source = source.replace('    return', '    with _errstate(all="ignore"):\n        return')
+        namespace['_errstate'] = np.errstate
+    exec(compile(source, '<compiled tree>', 'exec'), namespace)
+    return namespace['controller']
+
+# Returns the compiled form of a controller's tree, cached on the controller.
+# The cache is rebuilt whenever genes is assigned a different tree.
+def compiled_controller(controller, vectorized=False):
+    compiled = getattr(controller, 'compiled', None)
+    if compiled is None or compiled[0] is not controller.genes:
+        compiled = (controller.genes, dict())
+        controller.compiled = compiled
+    if vectorized not in compiled[1]:
+        compiled[1][vectorized] = compile_tree(controller.genes, vectorized)
+    return compiled[1][vectorized]
+
+# Number of walls or map edges next to each cell, as in play_GPac's W terminal
+@cache
+def wall_counts(game_map):
+    walls = np.ones((len(game_map) + 2, len(game_map[0]) + 2), dtype=bool)
+    walls[1:-1, 1:-1] = game_map
+    return (walls[:-2, 1:-1].astype(np.int64) + walls[2:, 1:-1] + walls[1:-1, :-2] + walls[1:-1, 2:])
+
+# Manhattan distance from each cell to its nearest pill, as in nearest_distance_to_pills
+def pill_distance_field(pills, width, height):
+    grid = np.zeros((width, height), dtype=bool)
+    if pills:
+        xs, ys = zip(*pills)
+        grid[list(xs), list(ys)] = True
+    return distance_field(grid)
+
+# Manhattan distance from each cell to the nearest True cell of grid, over its last two axes.
+# The L1 distance transform is separable: nearest cell along x, then a pass along y.
+def distance_field(grid):
+    field = np.where(grid, 0.0, inf)
+    width, height = field.shape[-2:]
+    for x in range(1, width):
+        np.minimum(field[..., x, :], field[..., x - 1, :] + 1, out=field[..., x, :])
+    for x in range(width - 2, -1, -1):
+        np.minimum(field[..., x, :], field[..., x + 1, :] + 1, out=field[..., x, :])
+    for y in range(1, height):
+        np.minimum(field[..., y], field[..., y - 1] + 1, out=field[..., y])
+    for y in range(height - 2, -1, -1):
+        np.minimum(field[..., y], field[..., y + 1] + 1, out=field[..., y])
+    return field
+
+# Terminals of every action available to player, as a (len(TERMINALS), actions) array.
+# Each column holds the values play_GPac computes from the action's observation.
+# With a MazeDistances, G, F and M are maze distances, and pill_field should be one too.
+def batched_terminals(game, player, actions, pill_field, maze=None):
+    current_location = game.players[player]
+    locations = np.array([gpac.apply_action(current_location, action) for action in actions])
+    xs, ys = locations[:, 0], locations[:, 1]
+    terminals = np.zeros((len(TERMINALS), len(actions)))
+
+    # Distances to the other ghosts, then the fruit and Pac-Man, are found together
+    targets = [location for other, location in game.players.items() if other != player and other != 'm']
+    num_others = len(targets)
+    if game.fruit_location is not None:
+        targets.append(game.fruit_location)
+    if 'm' not in player:
+        targets.append(game.players['m'])
+    if maze is None:
+        distances = np.abs(locations[:, np.newaxis] - np.array(targets).reshape(-1, 2)).sum(axis=2)
+    else:
+        distances = maze.between(locations, targets)
+
+    terminals[0] = distances[:, :num_others].min(axis=1) if num_others else inf
+    terminals[1] = pill_field[xs, ys]
+    if game.fruit_location is not None:
+        terminals[2] = distances[:, num_others]
+    terminals[3] = wall_counts(game.walls)[xs, ys]
+    if 'm' not in player:
+        terminals[4] = distances[:, -1]
+    return terminals
+
+# Index of the first best score, or 0 if no score beats -inf, as in play_GPac's loops
+def best_action_index(scores):
+    valid = scores > -inf
+    if not valid.any():
+        return 0
+    return int(np.argmax(np.where(valid, scores, -inf)))
+
+# Terminals of every action of one player in every game of a VectorGPacGame, as a
+# (len(TERMINALS), games, len(ACTIONS)) array. Columns of unavailable actions are meaningless.
+def vectorized_terminals(game, player, pill_fields):
+    locations = game.positions[:, player, np.newaxis] + ACTION_DELTAS
+    xs = np.clip(locations[..., 0], 0, game.width - 1)
+    ys = np.clip(locations[..., 1], 0, game.height - 1)
+    terminals = np.zeros((len(TERMINALS),) + xs.shape)
+
+    others = [other for other, name in enumerate(game.player_names) if other != player and name != 'm']
+    if others:
+        distances = np.abs(locations[:, :, np.newaxis] - game.positions[:, np.newaxis, others]).sum(axis=3)
+        terminals[0] = np.where(game.alive[:, np.newaxis, others], distances, inf).min(axis=2)
+    else:
+        terminals[0] = inf
+    terminals[1] = pill_fields[np.arange(game.num_games)[:, np.newaxis], xs, ys]
+    terminals[2] = np.where(game.has_fruit[:, np.newaxis], np.abs(locations - game.fruit[:, np.newaxis]).sum(axis=2), 0)
+    terminals[3] = wall_counts(game.game_map)[xs, ys]
+    if player >= game.num_pacs and 'm' in game.player_names:
+        pac = game.player_names.index('m')
+        terminals[4] = np.abs(locations - game.positions[:, pac, np.newaxis]).sum(axis=2)
+    return terminals
+
+# Per row, the first available action with the best score, or the first available
+# action if no score beats -inf, as in best_action_index
+def best_action_indices(scores, available):
+    scores = np.where(available & (scores > -inf), scores, -inf)
+    best = np.argmax(scores, axis=1)
+    unscored = ~(scores > -inf).any(axis=1)
+    best[unscored] = np.argmax(available[unscored], axis=1)
+    return best
+
+# Plays one game per entry of pac_controllers, all in lockstep in a VectorGPacGame, and returns
+# their scores. ghost_controllers optionally holds a ghost controller per game. None entries play
+# randomly. Games sharing a controller are scored by one call of its vectorized compiled tree.
+# Actions are chosen as in play_GPac(..., batched=True).
+def play_GPac_vectorized(pac_controllers, ghost_controllers=None, game_map=None, seed=None, **kwargs):
+    game_map = parse_map(game_map)
+    num_games = len(pac_controllers)
+    if ghost_controllers is None:
+        ghost_controllers = [None] * num_games
+    assert len(ghost_controllers) == num_games, 'There must be one ghost controller per game'
+    game = VectorGPacGame(game_map, num_games, seed=seed, **kwargs)
+    pill_counts = None
+
+    while not game.gameover.all():
+        # Pills only change when eaten, and the pill fields with them
+        if pill_counts is None or (game.pill_counts != pill_counts).any():
+            pill_counts = game.pill_counts.copy()
+            pill_fields = distance_field(game.pills)
+
+        available = game.get_action_mask()
+        # Random controllers pick uniformly among available actions
+        actions = np.argmax(game.rng.random(available.shape) * available, axis=2)
+        for player in range(len(game.player_names)):
+            controllers = pac_controllers if player < game.num_pacs else ghost_controllers
+            groups = dict()
+            for index, controller in enumerate(controllers):
+                if controller is not None and game.alive[index, player] and not game.gameover[index]:
+                    groups.setdefault(id(controller), (controller, []))[1].append(index)
+            if not groups:
+                continue
+
+            terminals = vectorized_terminals(game, player, pill_fields)
+            for controller, indices in groups.values():
+                scores = compiled_controller(controller, True)(terminals[:, indices])
+                scores = np.broadcast_to(scores, (len(indices), len(ACTIONS)))
+                actions[indices, player] = best_action_indices(scores, available[indices, player])
+        game.step(actions)
+    return game.score.tolist()
+
 # Fitness function that plays a game using the provided pac_controller
 # with optional ghost controller and game map specifications.
 # Returns Pac-Man score from a full game as well as the game log.
-def play_GPac(pac_controller, ghost_controller=None, game_map=None, **kwargs):
+# With batched=True, each player's actions are scored together (see batched_terminals);
+# games are the same, except that trees with RAND draw in a different order.
+# With maze=True, the G, P, F and M terminals are shortest-path distances through the
+# maze (see maze_distances) instead of Manhattan distances.
+def play_GPac(pac_controller, ghost_controller=None, game_map=None, batched=False, maze=False, **kwargs):
     game_map = parse_map(game_map)
     game = gpac.GPacGame(game_map, **kwargs)
 
+    # Trees are compiled once per controller rather than walked for every state
+    pac_function = None if pac_controller is None else compiled_controller(pac_controller, batched)
+    ghost_function = None if ghost_controller is None else compiled_controller(ghost_controller, batched)
+    field_pills = None
+    maze = maze_distances(game_map) if maze else None
+    distance = manhattan if maze is None else maze.distance
+    maze_pill_field = None if maze is None else PillField(maze, game.pills)
+
     # Game loop, representing one turn.
     while not game.gameover:
+        # Pills only change when eaten, and the pill field with them
+        if maze is not None:
+            maze_pill_field.update(game.pills)
+            pill_field = maze_pill_field.grid
+        elif batched and game.pills is not field_pills:
+            field_pills = game.pills
+            pill_field = pill_distance_field(field_pills, len(game.walls), len(game.walls[0]))
+
         # Evaluate moves for each player.
         for player in game.players:
             actions = game.get_actions(player)
-            s_primes = game.get_observations(actions, player)
+            # Batched scoring reads the game state directly instead of per-action observations
+            s_primes = None if batched else game.get_observations(actions, player)
             selected_action_idx = None
 
+            player_function = pac_function if 'm' in player else ghost_function
+            if batched and player_function is not None:
+                terminals = batched_terminals(game, player, actions, pill_field, maze)
+                scores = np.broadcast_to(player_function(terminals), len(actions))
+                selected_action_idx = best_action_index(scores)
+
             # Select Pac-Man action(s) using provided strategy.
-            if 'm' in player:
+            elif 'm' in player:
                 if pac_controller is None:
                     # Random Pac-Man controller.
                     selected_action_idx = random.randrange(len(actions))
@@ -104,13 +412,16 @@ def play_GPac(pac_controller, ghost_controller=None, game_map=None, **kwargs):
 
                         # Dictionary that we will use to cache our G, P, F, and W values
                         terminal_dict = {}
-                        terminal_dict["G"] = nearest_distance_to_ghosts(curr_state["players"], player, curr_state["players"][player])
-                        terminal_dict["P"] = nearest_distance_to_pills(curr_state["pills"], curr_state["players"][player])
+                        terminal_dict["G"] = nearest_distance_to_ghosts(curr_state["players"], player, curr_state["players"][player], distance)
+                        if maze is None:
+                            terminal_dict["P"] = nearest_distance_to_pills(curr_state["pills"], curr_state["players"][player])
+                        else:
+                            terminal_dict["P"] = maze_pill_field[curr_state["players"][player]]
                         terminal_dict["F"] = 0
 
                         # If the fruit is not on the board, it will just set F to 0
                         if curr_state["fruit"] is not None:
-                            terminal_dict["F"] = manhattan(curr_state["fruit"], curr_state["players"][player])
+                            terminal_dict["F"] = distance(curr_state["fruit"], curr_state["players"][player])
 
                         terminal_dict["W"] = 0
                         for d1, d2 in directions:
@@ -121,7 +432,7 @@ def play_GPac(pac_controller, ghost_controller=None, game_map=None, **kwargs):
                                 terminal_dict["W"] += 1
 
                         # Finds the score of the state and checks to see if it is the best state seen so far
-                        state_score = find_state_score(terminal_dict, pac_controller.genes)
+                        state_score = pac_function((terminal_dict["G"], terminal_dict["P"], terminal_dict["F"], terminal_dict["W"], 0))
                         if state_score > best_score:
                             best_action_idx = i
                             best_score = state_score
@@ -169,14 +480,17 @@ def play_GPac(pac_controller, ghost_controller=None, game_map=None, **kwargs):
                         # Dictionary that we will use to cache our G, P, F, and W values
                         terminal_dict = {}
                         # Nearest distance of ghost other than itself
-                        terminal_dict["G"] = nearest_distance_to_ghosts(curr_state["players"], player, curr_state["players"][player])
-                        terminal_dict["P"] = nearest_distance_to_pills(curr_state["pills"], curr_state["players"][player])
-                        terminal_dict["M"] = manhattan(curr_state["players"][player], curr_state["players"]["m"])
+                        terminal_dict["G"] = nearest_distance_to_ghosts(curr_state["players"], player, curr_state["players"][player], distance)
+                        if maze is None:
+                            terminal_dict["P"] = nearest_distance_to_pills(curr_state["pills"], curr_state["players"][player])
+                        else:
+                            terminal_dict["P"] = maze_pill_field[curr_state["players"][player]]
+                        terminal_dict["M"] = distance(curr_state["players"][player], curr_state["players"]["m"])
                         terminal_dict["F"] = 0
 
                         # If the fruit is not on the board, it will just set F to 0
                         if curr_state["fruit"] is not None:
-                            terminal_dict["F"] = manhattan(curr_state["fruit"], curr_state["players"][player])
+                            terminal_dict["F"] = distance(curr_state["fruit"], curr_state["players"][player])
 
                         terminal_dict["W"] = 0
                         for d1, d2 in directions:
@@ -187,7 +501,7 @@ def play_GPac(pac_controller, ghost_controller=None, game_map=None, **kwargs):
                                 terminal_dict["W"] += 1
 
                         # Finds the score of the state and checks to see if it is the best state seen so far
-                        state_score = find_state_score(terminal_dict, pac_controller.genes)
+                        state_score = ghost_function((terminal_dict["G"], terminal_dict["P"], terminal_dict["F"], terminal_dict["W"], terminal_dict["M"]))
                         if state_score > best_score:
                             best_action_idx = i
                             best_score = state_score
@@ -253,3 +567,9 @@ def parse_map(path_or_contents):
                 game_map[x][y] = True
         y -= 1
     return tuple(tuple(y for y in x) for x in game_map)
+
+
+# Maze distances of a parsed map, built once per map like parse_map's results
+@cache
+def maze_distances(game_map):
+    return MazeDistances(parse_map(game_map))
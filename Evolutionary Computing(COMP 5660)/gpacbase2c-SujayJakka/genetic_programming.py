@@ -37,8 +37,8 @@ class GeneticProgrammingPopulation(BaseEvolutionPopulation):
                 recombined_child_count += 1
                 curr_index_parents_list += 2
 
-        self.log.append(f'Number of children: {len(children)}')
-        self.log.append(f'Number of recombinations: {recombined_child_count}')
-        self.log.append(f'Number of mutations: {mutated_child_count}')
+        self.log_entry('Number of children', len(children))
+        self.log_entry('Number of recombinations', recombined_child_count)
+        self.log_entry('Number of mutations', mutated_child_count)
 
         return children
@@ -2,6 +2,7 @@
 # gpac.py
 
 import random
+from array import array
 from copy import deepcopy
 import matplotlib.pyplot as plt
 import matplotlib.path as mpath
@@ -19,10 +20,11 @@ class GPacGame():
                  fruit_prob=0.2, fruit_score=10,
                  time_multiplier=2, num_ghosts=3,
                  num_pacs=1, pill_spawn='stochastic',
-                 fruit_spawn='stochastic', **kwargs):
+                 fruit_spawn='stochastic', record_log=True, **kwargs):
         assert len(game_map) > 0 and len(game_map[0]) > 0,\
                     "ERROR: MAP MUST BE 2 DIMENSIONAL"
         self.walls = game_map
+        self.record_log = record_log
         self.num_pacs = num_pacs
         self.num_ghosts = num_ghosts
         self.pill_density = pill_density
@@ -120,17 +122,19 @@ class GPacGame():
         self.registered_ghost_actions = dict()
         self.score_vector = [0.0, 0.0, 0.0]
 
-        # initialize new world file log
-        self.log = [f'{len(self.walls)}', f'{len(self.walls[0])}']
-        for player, location in self.players.items():
-            self.log.append(f'{player} {location[0]} {location[1]}')
-        for x in range(len(self.walls)):
-            for y in range(len(self.walls[x])):
-                if self.walls[x][y]:
-                    self.log.append(f'w {x} {y}')
-        for x, y in self.pills:
-            self.log.append(f'p {x} {y}')
-        self.log.append(f't {self.time} {self.score}')
+        # initialize new world file log, unless the game is played without one
+        self.log = None
+        if self.record_log:
+            self.log = GameLog(len(self.walls), len(self.walls[0]), self.players)
+            for player, location in self.players.items():
+                self.log.add_player(player, location)
+            for x in range(len(self.walls)):
+                for y in range(len(self.walls[x])):
+                    if self.walls[x][y]:
+                        self.log.add(GameLog.WALL, x, y)
+            for x, y in self.pills:
+                self.log.add(GameLog.PILL, x, y)
+            self.log.add_time(self.time, self.score)
 
 
     def update_score(self, time_bonus_or_penalty=None):
@@ -164,7 +168,8 @@ class GPacGame():
                     else:
                         self.fruit_location = random.choice(available_locations)
                         # log spawn of fruit
-                        self.log.append(f'f {self.fruit_location[0]} {self.fruit_location[1]}')
+                        if self.log is not None:
+                            self.log.add(GameLog.FRUIT, *self.fruit_location)
 
             else:
                 if self.fruit_spawn == 'corners_eaten':
@@ -186,7 +191,8 @@ class GPacGame():
                             self.last_fruit_spawned = self.time
                             self.fruit_location = spawns[self.fruit_rotation]
                             # log spawn of fruit
-                            self.log.append(f'f {self.fruit_location[0]} {self.fruit_location[1]}')
+                            if self.log is not None:
+                                self.log.add(GameLog.FRUIT, *self.fruit_location)
                             return
 
 
@@ -301,11 +307,125 @@ class GPacGame():
                 self.gameover = True
 
         # update log
-        for player, location in self.players.items():
-            self.log.append(f'{player} {location[0]} {location[1]}')
+        if self.log is not None:
+            for player, location in self.players.items():
+                self.log.add_player(player, location)
         if not self.gameover:
             self.manage_fruit() # do things with fruit
-        self.log.append(f't {self.time} {self.score}')
+        if self.log is not None:
+            self.log.add_time(self.time, self.score)
+
+
+# Compact game log. Each line of the text log is a fixed-width record of three int16s,
+# (kind, x, y): kind is a player's index in players, or one of the negative kinds below.
+# Time records hold (TIME, time, turn), where turn indexes the float64 scores.
+# Logs of maps or games too large for int16s switch to int64 records.
+#
+# A GameLog reads like the list of text lines GPacGame used to keep: len, indexing,
+# iteration and to_text all give the same strings, decoded on demand, so writing
+# a log to a file is unchanged. get_frames decodes the records directly.
+class GameLog():
+    WALL = -1
+    PILL = -2
+    FRUIT = -3
+    TIME = -4
+    KINDS = {'w': WALL, 'p': PILL, 'f': FRUIT, 't': TIME}
+    LETTERS = {kind: letter for letter, kind in KINDS.items()}
+
+    def __init__(self, width, height, players):
+        self.width = width
+        self.height = height
+        self.players = list(players)
+        self.player_indices = {player: index for index, player in enumerate(self.players)}
+        self.records = array('h')
+        self.fit(width, height, len(self.players))
+        self.scores = array('d')
+        # Turns whose score was an int (the starting score), so the text keeps it as one
+        self.int_scores = set()
+
+
+    # Parses a text log, e.g. one read back from a file
+    @classmethod
+    def from_text(cls, lines):
+        lines = [line.rstrip('\n') for line in lines]
+        players = []
+        for line in lines[2:]:
+            name = line.split(' ')[0]
+            if name not in cls.KINDS and name not in players:
+                players.append(name)
+        log = cls(int(lines[0]), int(lines[1]), players)
+        for line in lines[2:]:
+            name, x, y = line.split(' ')
+            if name == 't':
+                score = float(y) if any(c in y for c in '.eEni') else int(y)
+                log.add_time(int(x), score)
+            elif name in cls.KINDS:
+                log.add(cls.KINDS[name], int(x), int(y))
+            else:
+                log.add_player(name, (int(x), int(y)))
+        return log
+
+
+    # Widens the records to int64 if any of values does not fit in the current ones
+    def fit(self, *values):
+        if self.records.typecode == 'h' and max(abs(value) for value in values) >= 2**15:
+            self.records = array('q', self.records)
+
+
+    def add(self, kind, x, y):
+        self.records.extend((kind, x, y))
+
+
+    def add_player(self, player, location):
+        self.records.extend((self.player_indices[player], location[0], location[1]))
+
+
+    def add_time(self, time, score):
+        self.fit(time, len(self.scores))
+        if isinstance(score, int):
+            self.int_scores.add(len(self.scores))
+        self.records.extend((self.TIME, time, len(self.scores)))
+        self.scores.append(score)
+
+
+    def score(self, turn):
+        return int(self.scores[turn]) if turn in self.int_scores else self.scores[turn]
+
+
+    def line(self, kind, x, y):
+        if kind >= 0:
+            return f'{self.players[kind]} {x} {y}'
+        if kind == self.TIME:
+            return f't {x} {self.score(y)}'
+        return f'{self.LETTERS[kind]} {x} {y}'
+
+
+    def __len__(self):
+        return 2 + len(self.records) // 3
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('game log index out of range')
+        if index < 2:
+            return str(self.height if index else self.width)
+        return self.line(*self.records[3 * index - 6:3 * index - 3])
+
+
+    def __iter__(self):
+        yield str(self.width)
+        yield str(self.height)
+        records = self.records.tolist()
+        for i in range(0, len(records), 3):
+            yield self.line(*records[i:i + 3])
+
+
+    def to_text(self):
+        return list(self)
 
 
 @cache
@@ -369,106 +489,83 @@ GHOST_ICON = mpath.Path(vertices=ghost_vertices,codes=ghost_codes)
 SCOREBOARD_SIZE = 4
 
 
+# Renders a GameLog or a text log; frames are decoded as the animation draws them
 def render_game(log):
+    if not isinstance(log, GameLog):
+        log = GameLog.from_text(log)
     fig, ax = plt.subplots(layout='none', figsize=(4.0, 3.0))
     fig.canvas.header_visible = False
     fig.canvas.footer_visible = False
     ax.axis('off')
 
-    frames = get_frames(log)
-    artists = init_artists(ax, frames[0])
-    animation = FuncAnimation(fig, partial(render_frame, artists=artists), frames, partial(draw_walls, log, ax), blit=True)
+    artists = init_artists(ax, next(iter_frames(log)))
+    animation = FuncAnimation(fig, partial(render_frame, artists=artists), partial(iter_frames, log),
+                              partial(draw_walls, log, ax), blit=True, save_count=len(log.scores))
     jshtml = animation.to_jshtml()
     plt.close(fig)
     return jshtml
 
 
 def draw_walls(log, ax):
-    width = int(log[0])
-    height = int(log[1]) + SCOREBOARD_SIZE
+    width = log.width
+    height = log.height + SCOREBOARD_SIZE
     walls = [[(0, 0, 0) for x in range(width)] for y in range(height)]
-    log_idx = 2
-    while log[log_idx][0] != 'w':
-        log_idx += 1
-    while log[log_idx][0] == 'w':
-        elements = log[log_idx].split(' ')
-        x = int(elements[1])
-        y = int(elements[2])
-        walls[y][x] = (0.2, 0.2, 1)
-        log_idx += 1
+    records = log.records.tolist()
+    for i in range(0, len(records), 3):
+        kind, x, y = records[i:i + 3]
+        if kind == GameLog.WALL:
+            walls[y][x] = (0.2, 0.2, 1)
     with plt.ioff():
         return [ax.imshow(walls, origin='lower')]
 
 
+# Frames of a GameLog or a text log, as a list
 def get_frames(log):
+    return list(iter_frames(log))
+
+
+# Generates the frames of a game one turn at a time. Each frame is
+# (players, pills, fruit, time, score, pills_changed, fruit_changed).
+def iter_frames(log):
+    if not isinstance(log, GameLog):
+        log = GameLog.from_text(log)
+    pacs = [player[0] == 'm' for player in log.players]
     players = dict()
     pills = set()
-    log_idx = 2
-    while log[log_idx][0] != 'w':
-        elements = log[log_idx].split(' ')
-        coords = (int(elements[1]), int(elements[2]))
-        players[elements[0]] = coords
-        log_idx += 1
-    while log[log_idx][0] != 'p':
-        log_idx += 1
-    while log[log_idx][0] == 'p':
-        elements = log[log_idx].split(' ')
-        coords = (int(elements[1]), int(elements[2]))
-        pills.add(coords)
-        log_idx += 1
-    while log[log_idx][0] != 't':
-        log_idx += 1
-    elements = log[log_idx].split(' ')
-    time = int(elements[1])
-    score = round(float(elements[2]), 2)
     fruit = None
-    frame = (
-                players,
-                pills.copy(),
-                fruit,
-                time,
-                score,
-                True,
-                True
-            )
-    frames = [frame]
-    log_idx += 1
-    while log_idx < len(log):
-        pills_changed = False
-        fruit_changed = False
-        players = dict()
-        while log[log_idx][0] not in {'t', 'f'}:
-            elements = log[log_idx].split(' ')
-            coords = (int(elements[1]), int(elements[2]))
-            players[elements[0]] = coords
-            if elements[0][0] == 'm':
+    first = True
+    pills_changed = fruit_changed = True
+    records = log.records.tolist()
+    for i in range(0, len(records), 3):
+        kind, x, y = records[i:i + 3]
+        if kind >= 0:
+            coords = (x, y)
+            players[log.players[kind]] = coords
+            if pacs[kind] and not first:
                 if coords in pills:
                     pills.remove(coords)
                     pills_changed = True
                 if fruit == coords:
                     fruit = None
                     fruit_changed = True
-            log_idx += 1
-        if log[log_idx][0] == 'f':
-            elements = log[log_idx].split(' ')
-            fruit = (int(elements[1]), int(elements[2]))
+        elif kind == GameLog.PILL:
+            pills.add((x, y))
+        elif kind == GameLog.FRUIT:
+            fruit = (x, y)
             fruit_changed = True
-            log_idx += 1
-        elements = log[log_idx].split(' ')
-        time = int(elements[1])
-        score = round(float(elements[2]), 2)
-        frame = (
+        elif kind == GameLog.TIME:
+            yield (
                     players,
                     pills.copy(),
                     fruit,
-                    time,
-                    score,
+                    x,
+                    round(float(log.score(y)), 2),
                     pills_changed,
                     fruit_changed
                 )
-        frames.append(frame)
-        log_idx += 1
-    return frames
+            first = False
+            players = dict()
+            pills_changed = fruit_changed = False
 
 
 def init_artists(ax, frame):
@@ -1,16 +1,86 @@
 
 # gpac_population_evaluation.py
 
+import random
+import hashlib
 from fitness import *
+from match_scheduler import MatchScheduler
+
+
+# Fitness function for evaluators (see evaluators.py), which expect a dict per individual
+def gpac_fitness(controller, **kwargs):
+    score, log = play_GPac(controller, **kwargs)
+    return {'score': score, 'log': log}
+
+
+# Plays one game per controller. With seeds, each game is seeded with its own seed,
+# without disturbing the caller's random state; without, games draw from the global random module.
+def play_games(population, seeds=None, evaluator=None, **kwargs):
+    if evaluator is not None:
+        return evaluator.evaluate(population, gpac_fitness, seeds=seeds, **kwargs)
+    if seeds is None:
+        return [gpac_fitness(individual, **kwargs) for individual in population]
+
+    state = random.getstate()
+    try:
+        outputs = []
+        for individual, seed in zip(population, seeds):
+            random.seed(seed)
+            outputs.append(gpac_fitness(individual, **kwargs))
+        return outputs
+    finally:
+        random.setstate(state)
+
+
+# Seed of an individual's game in a generation, drawn from the generation's seed and its genotype:
+# a repeated genotype replays the same game, while different genotypes play different games.
+def game_seed(generation_seed, individual):
+    digest = hashlib.blake2b(f'{generation_seed}\n{individual.serialize()}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
 
 
 # 2b TODO: Evaluate the population and assign base_fitness, fitness, and log
 #          member variables as described in the Assignment 2b notebook.
-def base_population_evaluation(population, parsimony_coefficient, experiment, **kwargs):
+#          Pass a seeded evaluator from evaluators.py to play the games in parallel.
+#          Each call draws one seed from the run's random stream, and each individual's game
+#          is seeded from it and its genotype (see game_seed), so different individuals and
+#          different generations play different games, reproducibly under a fixed random.seed.
+#          Pass a FitnessCache from fitness_cache.py to reuse the results of repeated genotypes;
+#          cached results are keyed on each game's seed as well, i.e., on the genotype and the
+#          generation, so a hit is exactly the game the individual would have played, and the
+#          cache never changes fitnesses. Pass a fixed seed to instead have every controller
+#          in every generation play one identical game, which makes repeats always hit the cache
+#          but turns the stochastic fitness into a single fixed game.
+#          With replay_best_log, games are played without logs and only the individuals that
+#          keep theirs (see the end of this function) replay their game, from its seed, to log it.
+#          The cache only holds scores, so runs with a cache always replay logs this way.
+def base_population_evaluation(population, parsimony_coefficient, experiment, evaluator=None,
+                               cache=None, seed=None, replay_best_log=False, **kwargs):
+    seeds = None
     if experiment.casefold() == 'green':
         # Evaluate a population of Pac-Man controllers against the default ghost agent.
         # Sample call: score, log = play_GPac(controller, **kwargs)
-        pass
+        if seed is not None:
+            seeds = [seed] * len(population)
+        else:
+            generation_seed = random.getrandbits(64)
+            seeds = [game_seed(generation_seed, individual) for individual in population]
+        replay_best_log = replay_best_log or cache is not None
+        if replay_best_log:
+            kwargs['record_log'] = False
+
+        if cache is not None:
+            outputs = cache.evaluate(population, lambda misses, miss_seeds: [
+                {'score': output['score']} for output in play_games(misses, miss_seeds, evaluator, **kwargs)], seeds)
+        else:
+            outputs = play_games(population, seeds, evaluator, **kwargs)
+
+        for individual, output in zip(population, outputs):
+            individual.base_fitness = output['score']
+            individual.log = output.get('log')
+
+            # Calculate Penalized Fitness
+            individual.fitness = individual.base_fitness - (individual.genes.size * parsimony_coefficient)
 
     elif experiment.casefold() == 'yellow':
         # YELLOW: Evaluate a population of Pac-Man controllers against the default ghost agent.
@@ -54,3 +124,25 @@ def base_population_evaluation(population, parsimony_coefficient, experiment, **
             del individual.log
             individual.log = None
 
+    if replay_best_log and seeds is not None:
+        best = [i for i, individual in enumerate(population) if individual.log is None and
+                (individual.fitness == max_fit or individual.base_fitness == max_base_fit)]
+        outputs = play_games([population[i] for i in best], [seeds[i] for i in best], **dict(kwargs, record_log=True))
+        for i, output in zip(best, outputs):
+            assert output['score'] == population[i].base_fitness, 'Replayed game does not match the original'
+            population[i].log = output['log']
+
+
+
+# 2c: Evaluates a Pac-Man and a ghost population against each other, assigning base_fitness
+# (mean game score, negated for ghosts) and fitness (with parsimony) to every individual.
+# Pass the same MatchScheduler every generation to reuse games between generations and to
+# play them in parallel; without one, every game is played here. Returns the number of
+# games in the generation's plan, to count towards the evaluation budget.
+def competitive_population_evaluation(pac_population, ghost_population, pac_parsimony_coefficient,
+                                      ghost_parsimony_coefficient, sample_size, scheduler=None, **kwargs):
+    if scheduler is None:
+        with MatchScheduler(sample_size, **kwargs) as scheduler:
+            return scheduler.evaluate(pac_population, ghost_population,
+                                      pac_parsimony_coefficient, ghost_parsimony_coefficient)
+    return scheduler.evaluate(pac_population, ghost_population, pac_parsimony_coefficient, ghost_parsimony_coefficient)
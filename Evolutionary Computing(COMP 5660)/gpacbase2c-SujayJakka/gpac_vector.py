@@ -0,0 +1,325 @@
+
+# gpac_vector.py
+
+import random
+import numpy as np
+from gpac import GPacGame, PAC_ACTIONS, get_frames
+
+# Actions are integer codes indexing ACTIONS, in the order of gpac.get_player_actions.
+# Ghosts can take every action except HOLD.
+ACTIONS = tuple(PAC_ACTIONS)
+ACTION_DELTAS = np.array([PAC_ACTIONS[action] for action in ACTIONS])
+HOLD = ACTIONS.index('hold')
+
+
+# Headless GPac that steps num_games independent games in lockstep over NumPy arrays.
+#
+# The rules are those of gpac.GPacGame: movement, deaths by swapping cells with a ghost
+# or ending in one, pills, fruit spawning and the score vector. Players are indexed in
+# the order of GPacGame.players, Pac-Men first (see player_names). Dead Pac-Men keep their
+# last location in positions but are no longer alive, and finished games stay frozen while
+# the others keep stepping. Games draw from a NumPy Generator rather than the random module,
+# so they don't match GPacGame draw for draw; replay_logged_games checks the rules instead.
+# Nothing is logged.
+class VectorGPacGame():
+    def __init__(self, game_map, num_games, pill_density=0.1,
+                 fruit_prob=0.2, fruit_score=10,
+                 time_multiplier=2, num_ghosts=3,
+                 num_pacs=1, pill_spawn='stochastic',
+                 fruit_spawn='stochastic', seed=None, **kwargs):
+        assert len(game_map) > 0 and len(game_map[0]) > 0,\
+                    "ERROR: MAP MUST BE 2 DIMENSIONAL"
+        assert num_games > 0, "ERROR: AT LEAST ONE GAME IS REQUIRED"
+        self.game_map = game_map
+        self.walls = np.array(game_map, dtype=bool)
+        self.width, self.height = self.walls.shape
+        self.num_games = num_games
+        self.num_pacs = num_pacs
+        self.num_ghosts = num_ghosts
+        self.pill_density = pill_density
+        self.fruit_prob = fruit_prob
+        self.fruit_score = fruit_score
+        self.total_time = int(self.width * self.height * time_multiplier)
+        self.pill_spawn = pill_spawn.casefold()
+        self.fruit_spawn = fruit_spawn.casefold()
+        self.rng = np.random.default_rng(seed)
+
+        # Starting locations are those of GPacGame.reset; linear pill spawns draw no random numbers
+        players = GPacGame(game_map, num_pacs=num_pacs, num_ghosts=num_ghosts, pill_spawn='linear').players
+        self.player_names = list(players)
+        self.start_locations = np.array(list(players.values()))
+
+        # valid_actions[x, y, a] is True if action a keeps a player at (x, y) in an open cell
+        padded = np.ones((self.width + 2, self.height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = self.walls
+        self.valid_actions = np.stack([~padded[1 + dx:1 + dx + self.width, 1 + dy:1 + dy + self.height]
+                                       for dx, dy in ACTION_DELTAS], axis=2)
+
+        corners = ((0, self.height - 1), (self.width - 1, self.height - 1), (self.width - 1, 0), (0, 0))
+        self.fruit_corners = [corner for corner in corners if not self.walls[corner]]
+        self.reset()
+
+
+    # Starts every game over. pills, a (num_games, width, height) or (width, height) boolean
+    # array, replaces pill spawning, e.g. to replay games.
+    def reset(self, pills=None):
+        n = self.num_games
+        self.positions = np.broadcast_to(self.start_locations, (n, len(self.player_names), 2)).copy()
+        self.alive = np.ones((n, len(self.player_names)), dtype=bool)
+
+        if pills is None:
+            pills = self.spawn_pills()
+        self.pills = np.broadcast_to(np.asarray(pills, dtype=bool), (n, self.width, self.height)).copy()
+        self.pill_counts = self.pills.sum(axis=(1, 2))
+        self.pills_consumed = np.zeros(n, dtype=np.int64)
+
+        self.fruit = np.zeros((n, 2), dtype=np.int64)
+        self.has_fruit = np.zeros(n, dtype=bool)
+        self.fruit_consumed = np.zeros(n, dtype=np.int64)
+        self.fruit_rotation = np.zeros(n, dtype=np.int64)
+        self.time = np.full(n, self.total_time, dtype=np.int64)
+        self.last_fruit_eaten = self.time.copy()
+        self.last_fruit_spawned = self.time.copy()
+
+        self.score_vector = np.zeros((n, 3))
+        self.score = np.zeros(n)
+        self.gameover = np.zeros(n, dtype=bool)
+
+
+    # Pills of every game, placed as in GPacGame.reset
+    def spawn_pills(self):
+        placement_strategies = {'stochastic', 'linear', 'manhattan', 'grid', 'waves'}
+        assert self.pill_spawn in placement_strategies,\
+                f"ERROR: UNRECOGNIZED PILL SPAWN STRATEGY {self.pill_spawn} "+\
+                f"BUT EXPECTED ONE OF {placement_strategies}"
+
+        # Open cells other than Pac-Man spawns, in the order GPacGame visits them
+        available = ~self.walls
+        available[tuple(self.start_locations[:self.num_pacs].T)] = False
+        xs, ys = np.nonzero(available)
+        assert len(xs) > 0, "ERROR: NO VALID PILL LOCATIONS"
+
+        pills = np.zeros((self.num_games, self.width, self.height), dtype=bool)
+        if self.pill_spawn == 'stochastic':
+            chosen = self.rng.random((self.num_games, len(xs))) <= self.pill_density
+            # failsafe logic to guarantee a pill placement
+            empty = np.nonzero(~chosen.any(axis=1))[0]
+            chosen[empty, self.rng.integers(len(xs), size=len(empty))] = True
+            pills[:, xs, ys] = chosen
+            return pills
+
+        pill_freq = max(1, int(round(1/self.pill_density)))
+        if self.pill_spawn == 'linear':
+            chosen = np.arange(0, len(xs), pill_freq)
+        elif self.pill_spawn == 'manhattan':
+            chosen = np.argsort(xs + ys, kind='stable')[::pill_freq]
+        elif self.pill_spawn == 'grid':
+            chosen = (xs % pill_freq == 0) & (ys % pill_freq == 0)
+            assert chosen.any(), "ERROR: NO VALID PILL LOCATIONS"
+        else:
+            chosen = (xs + ys) % pill_freq == 0
+            assert chosen.any(), "ERROR: NO VALID PILL LOCATIONS"
+        pills[:, xs[chosen], ys[chosen]] = True
+        return pills
+
+
+    # (num_games, players, len(ACTIONS)) mask of the actions each player can take
+    def get_action_mask(self):
+        mask = self.valid_actions[self.positions[..., 0], self.positions[..., 1]]
+        mask[:, self.num_pacs:, HOLD] = False
+        return mask
+
+
+    # Advances every unfinished game by one turn. actions is a (num_games, players) array
+    # of action codes; those of dead Pac-Men and finished games are ignored.
+    # fruit_spawns, a (num_games, 2) array of locations or -1, replaces stochastic fruit
+    # spawning for this turn, e.g. to replay games.
+    def step(self, actions, fruit_spawns=None):
+        actions = np.asarray(actions)
+        active = ~self.gameover
+        moving = self.alive & active[:, np.newaxis]
+        assert self.get_action_mask()[np.arange(self.num_games)[:, np.newaxis],
+                                      np.arange(len(self.player_names)), actions][moving].all(),\
+                    'ERROR: INVALID ACTION'
+        self.time[active] -= 1
+
+        k = self.num_pacs
+        destinations = np.where(moving[..., np.newaxis], self.positions + ACTION_DELTAS[actions], self.positions)
+        pac_from, ghost_from = self.positions[:, :k, np.newaxis], self.positions[:, np.newaxis, k:]
+        pac_to, ghost_to = destinations[:, :k, np.newaxis], destinations[:, np.newaxis, k:]
+        self.positions = destinations
+
+        # Pac-Men that swapped cells with a ghost die before eating; those ending
+        # in a ghost's cell get to eat and die afterwards
+        swapped = moving[:, :k] & ((pac_from == ghost_to).all(axis=3) & (pac_to == ghost_from).all(axis=3)).any(axis=2)
+        eating = moving[:, :k] & ~swapped
+        late_deaths = eating & (pac_to == ghost_to).all(axis=3).any(axis=2)
+        self.alive[:, :k] &= ~swapped
+        exchanged = active & ~self.alive[:, :k].any(axis=1)
+
+        # eat pills, each at most once
+        games = np.arange(self.num_games)
+        for pac in range(k):
+            x, y = destinations[:, pac, 0], destinations[:, pac, 1]
+            ate = eating[:, pac] & self.pills[games, x, y]
+            self.pills[games[ate], x[ate], y[ate]] = False
+            self.pill_counts -= ate
+            self.pills_consumed += ate
+
+        # eat fruit
+        touched_fruit = self.has_fruit & (eating & (destinations[:, :k] == self.fruit[:, np.newaxis]).all(axis=2)).any(axis=1)
+        self.fruit_consumed += touched_fruit
+        self.has_fruit &= ~touched_fruit
+        self.last_fruit_eaten[touched_fruit] = self.time[touched_fruit]
+
+        # check if all pills are eaten, then apply late deaths
+        cleared = active & ~exchanged & (self.pill_counts == 0)
+        self.alive[:, :k] &= ~late_deaths
+        caught = active & ~exchanged & ~cleared & ~self.alive[:, :k].any(axis=1)
+
+        self.update_score(active, cleared)
+        timed_out = active & ~(exchanged | cleared | caught) & (self.time <= 0)
+        self.gameover |= exchanged | cleared | caught | timed_out
+        self.manage_fruit(active & ~self.gameover, fruit_spawns)
+
+
+    # Updates the score vector of games, as in GPacGame.update_score. Games in bonus
+    # get the time bonus; the rest get none.
+    def update_score(self, games, bonus):
+        total_pills = self.pills_consumed + self.pill_counts
+        self.score_vector[games, 0] = (100 * self.pills_consumed / total_pills)[games]
+        self.score_vector[games, 1] = (self.fruit_consumed * self.fruit_score)[games]
+        self.score_vector[games, 2] = np.where(bonus, 100 * self.time / self.total_time, 0)[games]
+        self.score[games] = (self.score_vector[games, 0] + self.score_vector[games, 1]) + self.score_vector[games, 2]
+
+
+    # Spawns fruit in games, as in GPacGame.manage_fruit
+    def manage_fruit(self, games, fruit_spawns=None):
+        games = games & ~self.has_fruit & (self.last_fruit_eaten != self.time)
+        assert self.fruit_spawn in {'stochastic', 'corners_eaten', 'corners_spawned'}
+
+        if self.fruit_spawn == 'stochastic':
+            if fruit_spawns is not None:
+                fruit_spawns = np.asarray(fruit_spawns)
+                spawned = games & (fruit_spawns[:, 0] >= 0)
+                self.fruit[spawned] = fruit_spawns[spawned]
+                self.has_fruit |= spawned
+                return
+            for game in np.nonzero(games & (self.rng.random(self.num_games) <= self.fruit_prob))[0]:
+                available = ~self.walls & ~self.pills[game]
+                available[tuple(self.positions[game, :self.num_pacs][self.alive[game, :self.num_pacs]].T)] = False
+                xs, ys = np.nonzero(available)
+                if len(xs) > 0:
+                    choice = self.rng.integers(len(xs))
+                    self.fruit[game] = (xs[choice], ys[choice])
+                    self.has_fruit[game] = True
+            return
+
+        if self.fruit_spawn == 'corners_eaten':
+            elapsed_time = self.last_fruit_eaten - self.time
+        else:
+            elapsed_time = self.last_fruit_spawned - self.time
+        due = games & ((elapsed_time + 1) % max(1, int(round(1 / self.fruit_prob))) == 0)
+        for game in np.nonzero(due)[0]:
+            pac_locations = {tuple(location) for location in
+                             self.positions[game, :self.num_pacs][self.alive[game, :self.num_pacs]].tolist()}
+            if all(corner in pac_locations for corner in self.fruit_corners):
+                continue # no available place to spawn
+            while True:
+                self.fruit_rotation[game] = (self.fruit_rotation[game] + 1) % len(self.fruit_corners)
+                corner = self.fruit_corners[self.fruit_rotation[game]]
+                if corner not in pac_locations:
+                    self.last_fruit_spawned[game] = self.time[game]
+                    self.fruit[game] = corner
+                    self.has_fruit[game] = True
+                    break
+
+
+    # State of one game in the form of a gpac.get_frames frame:
+    # (players, pills, fruit, time, score), with live players only
+    def get_frame(self, game):
+        players = {name: tuple(location) for name, location, alive in
+                   zip(self.player_names, self.positions[game].tolist(), self.alive[game]) if alive}
+        pills = set(zip(*(xs.tolist() for xs in np.nonzero(self.pills[game]))))
+        fruit = tuple(self.fruit[game].tolist()) if self.has_fruit[game] else None
+        return players, pills, fruit, int(self.time[game]), float(self.score[game])
+
+
+# Plays num_games GPacGames with random agents, logging every action, then replays all
+# of them in lockstep in a VectorGPacGame: pills are taken from each log, stochastic fruit
+# spawns from its 'f' lines, and every turn is compared with the log's frames. Pills and
+# fruit are compared with the GPacGame's own, since a Pac-Man who eats and dies in the
+# same turn is missing from the log. Returns the number of turns checked.
+def replay_logged_games(game_map, num_games=10, seed=0, **kwargs):
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        logs, turns, items, scores = [], [], [], []
+        for _ in range(num_games):
+            game = GPacGame(game_map, **kwargs)
+            actions = []
+            pills_and_fruit = []
+            while not game.gameover:
+                actions.append({player: random.choice(game.get_actions(player)) for player in game.players})
+                for player, action in actions[-1].items():
+                    game.register_action(action, player)
+                game.step()
+                pills_and_fruit.append((game.pills, game.fruit_location))
+            logs.append(game.log)
+            turns.append(actions)
+            items.append(pills_and_fruit)
+            scores.append(game.score)
+    finally:
+        random.setstate(state)
+
+    vector_game = VectorGPacGame(game_map, num_games, **kwargs)
+    frames = [get_frames(log) for log in logs]
+    # Exact scores, since frames round them
+    exact_scores = [[float(line.split(' ')[2]) for line in log if line[0] == 't'] for log in logs]
+    pills = np.zeros((num_games, vector_game.width, vector_game.height), dtype=bool)
+    for game, game_frames in enumerate(frames):
+        for x, y in game_frames[0][1]:
+            pills[game, x, y] = True
+    vector_game.reset(pills)
+
+    checked = 0
+    for turn in range(max(len(actions) for actions in turns)):
+        actions = np.full((num_games, len(vector_game.player_names)), HOLD)
+        fruit_spawns = np.full((num_games, 2), -1)
+        for game in range(num_games):
+            if turn < len(turns[game]):
+                for player, action in turns[game][turn].items():
+                    actions[game, vector_game.player_names.index(player)] = ACTIONS.index(action)
+                _, _, fruit, _, _, _, fruit_changed = frames[game][turn + 1]
+                if fruit_changed and fruit is not None:
+                    fruit_spawns[game] = fruit
+        vector_game.step(actions, fruit_spawns if vector_game.fruit_spawn == 'stochastic' else None)
+
+        for game in range(num_games):
+            if turn >= len(turns[game]):
+                continue
+            players, pills, fruit, time, score = vector_game.get_frame(game)
+            expected_players, _, _, expected_time, _, _, _ = frames[game][turn + 1]
+            expected_pills, expected_fruit = items[game][turn]
+            over = turn + 1 == len(turns[game])
+            assert bool(vector_game.gameover[game]) == over, f'Game {game} turn {turn}: gameover differs'
+            assert players == expected_players, f'Game {game} turn {turn}: players differ'
+            assert pills == expected_pills, f'Game {game} turn {turn}: pills differ'
+            assert fruit == expected_fruit, f'Game {game} turn {turn}: fruit differs'
+            assert time == expected_time, f'Game {game} turn {turn}: time differs'
+            assert score == exact_scores[game][turn + 1], f'Game {game} turn {turn}: score differs'
+            checked += 1
+
+    assert vector_game.gameover.all() and vector_game.score.tolist() == scores
+    return checked
+
+
+# replay games under a few rule settings if you run this file
+if __name__ == "__main__":
+    from fitness import parse_map
+    for kwargs in ({}, {'game_map': 'map.txt', 'pill_spawn': 'waves', 'pill_density': 1/3, 'fruit_prob': 1/75,
+                        'fruit_spawn': 'corners_spawned', 'time_multiplier': 2.5},
+                   {'pill_spawn': 'grid', 'fruit_spawn': 'corners_eaten', 'fruit_prob': 1/10, 'num_pacs': 2},
+                   {'pill_spawn': 'manhattan', 'num_ghosts': 5, 'num_pacs': 3}):
+        game_map = parse_map(kwargs.pop('game_map', None))
+        print(kwargs, replay_logged_games(game_map, 25, **kwargs), 'turns match')
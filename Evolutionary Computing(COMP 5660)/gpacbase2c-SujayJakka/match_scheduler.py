@@ -0,0 +1,170 @@
+
+# match_scheduler.py
+
+import random
+import hashlib
+import statistics
+from collections import OrderedDict
+from evaluators import make_evaluator
+from fitness import play_GPac
+from tree_genotype import TreeGenotype
+
+# Match scheduling for competitive (Pac-Man vs. ghost) coevolution.
+#
+# Each generation, plan pairs every individual of the larger population with
+# sample_size opponents, spreading games over the smaller population as uniformly
+# as possible (each plays sample_size * floor(x / y) or sample_size * ceil(x / y) games).
+# Pairings are keyed on both genotypes, so identical pairings are scheduled together,
+# and the scores of every pairing are kept: a pairing that comes up again, e.g. between
+# two survivors, reuses its earlier games and only plays the ones it is missing.
+# With sticky=True, survivors are paired with their previous opponents where the
+# quotas allow, so most of a generation's games are reused and only children play.
+#
+# New games are dispatched through an evaluator (see evaluators.py), each with its own
+# seed drawn from the global random module, so results don't depend on the backend.
+# An evaluator of Matches made elsewhere may be passed in instead of a backend; it is
+# then left to its maker to close.
+class MatchScheduler():
+    def __init__(self, sample_size, backend='serial', processes=None, chunksize=None,
+                 sticky=False, maxsize=100_000, evaluator=None, **game):
+        assert sample_size > 0, 'Sample size must be positive'
+        self.sample_size = sample_size
+        self.sticky = sticky
+        self.maxsize = maxsize
+        self.owns_evaluator = evaluator is None
+        self.evaluator = make_evaluator(Match, backend, processes, chunksize, **game) if evaluator is None else evaluator
+        self.results = OrderedDict()
+        self.opponents = dict()
+        self.games_played = 0
+        self.games_reused = 0
+
+
+    # Returns the (pac, ghost) pairs of a generation, one per game
+    def plan(self, pac_population, ghost_population):
+        pacs_larger = len(pac_population) >= len(ghost_population)
+        larger, smaller = (pac_population, ghost_population) if pacs_larger else (ghost_population, pac_population)
+        larger = random.sample(larger, len(larger))
+        smaller = random.sample(smaller, len(smaller))
+
+        total = len(larger) * self.sample_size
+        quotas = [total // len(smaller) + (i < total % len(smaller)) for i in range(len(smaller))]
+        smaller_keys = [genotype_key(individual) for individual in smaller]
+        indices_by_key = dict()
+        for index, key in enumerate(smaller_keys):
+            indices_by_key.setdefault(key, []).append(index)
+
+        pairs = []
+        opponents = dict()
+        next_index = 0
+        for individual in larger:
+            key = genotype_key(individual)
+            chosen = []
+            if self.sticky:
+                for opponent_key in self.opponents.get(key, ()):
+                    for index in indices_by_key.get(opponent_key, ()):
+                        if quotas[index] > 0 and len(chosen) < self.sample_size:
+                            quotas[index] -= 1
+                            chosen.append(index)
+                            break
+            while len(chosen) < self.sample_size:
+                while quotas[next_index % len(smaller)] == 0:
+                    next_index += 1
+                index = next_index % len(smaller)
+                quotas[index] -= 1
+                chosen.append(index)
+                next_index += 1
+
+            opponents[key] = [smaller_keys[index] for index in chosen]
+            for index in chosen:
+                pairs.append((individual, smaller[index]) if pacs_larger else (smaller[index], individual))
+
+        self.opponents = opponents
+        return pairs
+
+
+    # Plays a generation's games and assigns base_fitness (mean score, negated for ghosts)
+    # and fitness (with parsimony) to every individual. Returns the number of games in
+    # the plan, i.e., the generation's evaluations, whether played or reused.
+    def evaluate(self, pac_population, ghost_population, pac_parsimony_coefficient, ghost_parsimony_coefficient):
+        pairs = self.plan(pac_population, ghost_population)
+
+        # Identical pairings share one list of scores, extended with any missing games
+        pairings = OrderedDict()
+        for pac, ghost in pairs:
+            key = (genotype_key(pac), genotype_key(ghost))
+            pairings.setdefault(key, [pac, ghost, 0])[2] += 1
+
+        new_games = []
+        for key, (pac, ghost, count) in pairings.items():
+            scores = self.results.get(key, [])
+            self.games_reused += min(count, len(scores))
+            new_games += [(key, Match(pac, ghost))] * max(0, count - len(scores))
+
+        if new_games:
+            seeds = [random.getrandbits(64) for _ in range(len(new_games))]
+            outputs = self.evaluator.evaluate([match for _, match in new_games], play_match, seeds=seeds)
+            for (key, _), output in zip(new_games, outputs):
+                self.results.setdefault(key, []).append(output['score'])
+            self.games_played += len(new_games)
+
+        pac_scores = dict()
+        ghost_scores = dict()
+        for key, (pac, ghost, count) in pairings.items():
+            self.results.move_to_end(key)
+            scores = self.results[key][:count]
+            pac_scores.setdefault(id(pac), (pac, []))[1].extend(scores)
+            ghost_scores.setdefault(id(ghost), (ghost, []))[1].extend(-score for score in scores)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+        for scores, parsimony_coefficient in ((pac_scores, pac_parsimony_coefficient),
+                                              (ghost_scores, ghost_parsimony_coefficient)):
+            for individual, individual_scores in scores.values():
+                individual.base_fitness = statistics.mean(individual_scores)
+                individual.fitness = individual.base_fitness - (individual.genes.size * parsimony_coefficient)
+        return len(pairs)
+
+
+    def close(self):
+        if self.owns_evaluator:
+            self.evaluator.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Compact key of an individual's genotype
+def genotype_key(individual):
+    return hashlib.blake2b(individual.serialize().encode(), digest_size=16).digest()
+
+
+# A Pac-Man and a ghost controller, serialized together so evaluators can ship them
+class Match():
+    SEPARATOR = '#\n'
+
+    def __init__(self, pac=None, ghost=None):
+        self.pac = pac
+        self.ghost = ghost
+
+
+    def serialize(self):
+        return self.pac.serialize() + self.SEPARATOR + self.ghost.serialize()
+
+
+    def deserialize(self, serialization):
+        pac, ghost = serialization.split('\n' + self.SEPARATOR)
+        self.pac = TreeGenotype()
+        self.pac.deserialize(pac + '\n')
+        self.ghost = TreeGenotype()
+        self.ghost.deserialize(ghost)
+
+
+# Fitness function for evaluators: plays one game of a Match, without a log
+def play_match(match, **kwargs):
+    score, _ = play_GPac(match.pac, match.ghost, **dict(kwargs, record_log=False))
+    return {'score': score}
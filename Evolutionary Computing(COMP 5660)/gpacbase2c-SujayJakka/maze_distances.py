@@ -0,0 +1,134 @@
+
+# maze_distances.py
+
+import numpy as np
+from math import inf
+
+# Shortest-path distances through a GPac maze, for terminals that measure how far a
+# player really has to walk rather than the Manhattan distance through walls.
+#
+# MazeDistances is built once per parsed map (see fitness.maze_distances): open cells
+# are numbered by x, then y, and a breadth-first search from every cell at
+# once fills a (cells, cells) uint16 matrix. Cells that cannot reach each other hold
+# UNREACHABLE, which queries report as inf, as Manhattan queries do with no targets.
+#
+# PillField keeps, for every open cell, the maze distance to its nearest pill. Pills
+# are only ever eaten, so when pills disappear only the cells whose nearest pill was
+# eaten are recomputed, against the remaining pills.
+
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# Moves between neighboring cells, as in gpac's actions other than holding still
+NEIGHBORS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+class MazeDistances():
+    def __init__(self, game_map):
+        walls = np.array(game_map, dtype=bool)
+        self.width, self.height = walls.shape
+        xs, ys = np.nonzero(~walls)
+        self.cells = np.stack((xs, ys), axis=1)
+        self.index = np.full(walls.shape, -1, dtype=np.int64)
+        self.index[xs, ys] = np.arange(len(xs))
+        assert len(xs) < UNREACHABLE, 'Maze has too many open cells for uint16 distances'
+
+        # Index of each cell's open neighbor in each direction, or -1
+        neighbors = np.full((len(xs), len(NEIGHBORS)), -1, dtype=np.int64)
+        for direction, (dx, dy) in enumerate(NEIGHBORS):
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+            neighbors[inside, direction] = self.index[nx[inside], ny[inside]]
+
+        # Level-synchronous BFS from all sources: row i is the search from cell i
+        self.distances = np.full((len(xs), len(xs)), UNREACHABLE, dtype=np.uint16)
+        reached = np.eye(len(xs), dtype=bool)
+        frontier = reached.copy()
+        np.fill_diagonal(self.distances, 0)
+        distance = 0
+        while frontier.any():
+            distance += 1
+            expanded = np.zeros_like(frontier)
+            for direction in range(len(NEIGHBORS)):
+                has_neighbor = neighbors[:, direction] >= 0
+                expanded[:, has_neighbor] |= frontier[:, neighbors[has_neighbor, direction]]
+            frontier = expanded & ~reached
+            reached |= frontier
+            self.distances[frontier] = distance
+
+
+    # Index of the open cell at location; locations must not be walls
+    def cell(self, location):
+        index = self.index[location[0], location[1]]
+        assert index >= 0, f'{location} is not an open cell'
+        return index
+
+
+    def distance(self, a, b):
+        distance = self.distances[self.cell(a), self.cell(b)]
+        return inf if distance == UNREACHABLE else int(distance)
+
+
+    # Distance from location to the nearest of locations, or inf if there are none
+    def nearest(self, location, locations):
+        if not locations:
+            return inf
+        distances = self.distances[self.cell(location), [self.cell(other) for other in locations]]
+        distance = distances.min()
+        return inf if distance == UNREACHABLE else int(distance)
+
+
+    # Float (len(sources), len(targets)) distances between the cells of two location
+    # arrays, with inf for unreachable pairs, as batched terminals use them
+    def between(self, sources, targets):
+        sources, targets = np.asarray(sources), np.asarray(targets).reshape(-1, 2)
+        distances = self.distances[self.index[sources[:, 0], sources[:, 1], np.newaxis],
+                                   self.index[targets[:, 0], targets[:, 1]]]
+        return np.where(distances == UNREACHABLE, inf, distances)
+
+
+class PillField():
+    def __init__(self, maze, pills):
+        self.maze = maze
+        self.pills = frozenset()
+        # Nearest pill cell and its distance for every open cell, -1 and UNREACHABLE if none
+        self.nearest = np.full(len(maze.cells), -1, dtype=np.int64)
+        self.field = np.full(len(maze.cells), UNREACHABLE, dtype=np.uint16)
+        # (width, height) float view of the field, inf at walls, for terminal lookups
+        self.grid = np.full((maze.width, maze.height), inf)
+        self.update(pills)
+
+
+    # Brings the field up to date with pills, a set of pill locations
+    def update(self, pills):
+        if pills is self.pills:
+            return
+        eaten = self.pills - pills
+        if not pills <= self.pills or not self.pills:
+            # New pills (or the first pills) move nearest pills anywhere; start over
+            self.pills = pills
+            self._recompute(np.arange(len(self.maze.cells)))
+            return
+        self.pills = pills
+        if eaten:
+            eaten_cells = [self.maze.cell(location) for location in eaten]
+            self._recompute(np.flatnonzero(np.isin(self.nearest, eaten_cells)))
+
+
+    # Recomputes the nearest pill of the given cells
+    def _recompute(self, cells):
+        pill_cells = np.array([self.maze.cell(location) for location in self.pills], dtype=np.int64)
+        if len(pill_cells) == 0 or len(cells) == 0:
+            self.nearest[cells] = -1
+            self.field[cells] = UNREACHABLE
+        else:
+            distances = self.maze.distances[np.ix_(cells, pill_cells)]
+            closest = distances.argmin(axis=1)
+            self.nearest[cells] = pill_cells[closest]
+            self.field[cells] = distances[np.arange(len(cells)), closest]
+        xs, ys = self.maze.cells[cells, 0], self.maze.cells[cells, 1]
+        self.grid[xs, ys] = np.where(self.field[cells] == UNREACHABLE, inf, self.field[cells])
+
+
+    # Maze distance from location to its nearest pill, or inf if none can be reached
+    def __getitem__(self, location):
+        return self.grid[location[0], location[1]]
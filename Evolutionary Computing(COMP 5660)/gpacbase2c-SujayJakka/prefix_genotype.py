@@ -0,0 +1,222 @@
+
+# prefix_genotype.py
+
+import random
+from bisect import bisect_right
+from itertools import accumulate
+from fitness import TERMINALS, NONTERMINAL_FUNCTIONS
+from tree_genotype import TreeGenotype
+
+# Tree genome stored as parallel tuples in prefix (preorder) order, an alternative
+# to TreeGenotype's linked nodes with the same initialization, recombine, mutate and
+# serialize API, so either can be the individual_class of a GeneticProgrammingPopulation.
+#
+# The subtree rooted at index i occupies indices [i, subtree_ends[i]), so its size is
+# subtree_ends[i] - i, its left child is i + 1 and its right child is subtree_ends[i + 1].
+# Crossover and mutation splice a slice of one tuple into another, and point selection
+# is arithmetic on the depths and heights, with no traversal or rejection sampling.
+#
+# This is not the faster genotype. Splicing copies every array, O(size), where
+# TreeGenotype only copies the ancestors of the point, O(height). On the 2c config's
+# Pac-Man trees (about 40 nodes), recombine and mutate take about 1.5x as long as
+# TreeGenotype's in benchmarks.py (0.93 ms vs 0.64 ms per generation's children).
+# Tuples are used rather than numpy arrays, whose per-call overhead at this size made
+# it over 3x slower (2.16 ms).
+
+# Opcodes: terminals first, then constants (valued from PrefixTree.constants),
+# then the binary nonterminals
+PRIMITIVES = TERMINALS + ('C',) + tuple(NONTERMINAL_FUNCTIONS)
+CONSTANT = len(TERMINALS)
+OPCODES = {primitive: opcode for opcode, primitive in enumerate(PRIMITIVES) if opcode != CONSTANT}
+
+
+# Genes of a PrefixTreeGenotype. The tuples are never modified, so they can be
+# shared between individuals. size and height are those of the whole tree, as for a Node.
+class PrefixTree():
+    def __init__(self, opcodes, constants, subtree_ends, depths, heights):
+        self.opcodes = opcodes
+        self.constants = constants
+        self.subtree_ends = subtree_ends
+        self.depths = depths
+        self.heights = heights
+        self.size = len(opcodes)
+        self.height = heights[0]
+
+
+    # Builds a tree from its opcodes, constants and depths in prefix order,
+    # finding subtree ends and heights in one pass from the last node back
+    @classmethod
+    def from_prefix(cls, opcodes, constants, depths):
+        size = len(opcodes)
+        subtree_ends = [0] * size
+        heights = [0] * size
+        stack = []
+        for i in range(size - 1, -1, -1):
+            if opcodes[i] <= CONSTANT:
+                subtree_ends[i] = i + 1
+            else:
+                assert len(stack) >= 2, 'Nonterminals must have two children'
+                left = stack.pop()
+                right = stack.pop()
+                subtree_ends[i] = subtree_ends[right]
+                heights[i] = 1 + max(heights[left], heights[right])
+            stack.append(i)
+        assert stack == [0], 'Prefix arrays must hold exactly one tree'
+        return cls(tuple(opcodes), tuple(constants), tuple(subtree_ends), tuple(depths), tuple(heights))
+
+
+    # Returns a new tree where the subtree at point is replaced by donor's subtree at
+    # donor_point. Ancestors of point are the earlier nodes whose subtrees extend past
+    # it; their ends shift by the change in size and their heights are recomputed.
+    def splice(self, point, donor, donor_point):
+        end = self.subtree_ends[point]
+        donor_end = donor.subtree_ends[donor_point]
+        shift = (donor_end - donor_point) - (end - point)
+        offset = point - donor_point
+        depth_offset = self.depths[point] - donor.depths[donor_point]
+
+        subtree_ends = list(self.subtree_ends[:point])
+        ancestors = [i for i, subtree_end in enumerate(subtree_ends) if subtree_end > point]
+        for ancestor in ancestors:
+            subtree_ends[ancestor] += shift
+        subtree_ends.extend(subtree_end + offset for subtree_end in donor.subtree_ends[donor_point:donor_end])
+        subtree_ends.extend(subtree_end + shift for subtree_end in self.subtree_ends[end:])
+        depths = (self.depths[:point] + tuple(depth + depth_offset for depth in donor.depths[donor_point:donor_end])
+                  + self.depths[end:])
+        heights = list(self.heights[:point] + donor.heights[donor_point:donor_end] + self.heights[end:])
+        for ancestor in reversed(ancestors):
+            heights[ancestor] = 1 + max(heights[ancestor + 1], heights[subtree_ends[ancestor + 1]])
+
+        return PrefixTree(self.opcodes[:point] + donor.opcodes[donor_point:donor_end] + self.opcodes[end:],
+                          self.constants[:point] + donor.constants[donor_point:donor_end] + self.constants[end:],
+                          tuple(subtree_ends), depths, tuple(heights))
+
+
+    # Postfix program for fitness.compile_tree, with the instructions of fitness.postfix_program
+    def postfix_program(self):
+        opcodes = self.opcodes
+        constants = self.constants
+        subtree_ends = self.subtree_ends
+        program = []
+        stack = [(0, False)]
+        while stack:
+            i, expanded = stack.pop()
+            if opcodes[i] == CONSTANT:
+                program.append(('constant', constants[i]))
+            elif opcodes[i] < CONSTANT:
+                program.append(('terminal', opcodes[i]))
+            elif expanded:
+                program.append(('nonterminal', PRIMITIVES[opcodes[i]]))
+            else:
+                stack.extend(((i, True), (subtree_ends[i + 1], False), (i + 1, False)))
+        return program
+
+
+# Makes a random tree in prefix order by the full or grow method, drawing random numbers
+# in the same order as tree_genotype.full_method and grow_method. The root is at curr_depth,
+# so a subtree made for a node at that depth stays within depth_limit.
+def random_prefix_tree(curr_depth, full, **kwargs):
+    terminals = kwargs["terminals"]
+    opcodes = []
+    constants = []
+    depths = []
+    stack = [curr_depth]
+    while stack:
+        depth = stack.pop()
+        continue_depth = 1 if full else random.randint(0, 1)
+        if depth == kwargs["depth_limit"] or continue_depth == 0:
+            terminal_type = random.randint(0, len(terminals) - 1)
+            if terminal_type != len(terminals) - 1:
+                opcodes.append(OPCODES[terminals[terminal_type]])
+                constants.append(0.0)
+            else:
+                constant_range = kwargs["constant_range"]
+                opcodes.append(CONSTANT)
+                constants.append(random.uniform(constant_range[0], constant_range[1]))
+        else:
+            opcodes.append(OPCODES[kwargs["nonterminals"][random.randint(0, 4)]])
+            constants.append(0.0)
+            stack.extend((depth + 1, depth + 1))
+        depths.append(depth)
+    return PrefixTree.from_prefix(opcodes, constants, depths)
+
+
+class PrefixTreeGenotype(TreeGenotype):
+    @classmethod
+    def initialization(cls, mu, depth_limit, **kwargs):
+        population = [cls() for _ in range(mu)]
+
+        # Ramped half-and-half, as in TreeGenotype.initialization
+        for individual in population:
+            prob_of_full_method = random.uniform(0, 1)
+            rand_depth_limit = random.randint(1, depth_limit)
+            full = prob_of_full_method <= kwargs["prob_of_full_method"]
+            individual.genes = random_prefix_tree(0, full, depth_limit=rand_depth_limit, **kwargs)
+
+        return population
+
+
+    def serialize(self):
+        lines = []
+        for opcode, constant, depth in zip(self.genes.opcodes, self.genes.constants, self.genes.depths):
+            primitive = constant if opcode == CONSTANT else PRIMITIVES[opcode]
+            lines.append(("|" * depth) + str(primitive) + "\n")
+        return "".join(lines)
+
+
+    def deserialize(self, serialization):
+        opcodes = []
+        constants = []
+        depths = []
+
+        # We pop the last element as each serialization has an unneccessary new line character at the end
+        lines = serialization.split('\n')
+        lines.pop()
+
+        for line in lines:
+            primitive = line.strip('|')
+            depths.append(line.count('|'))
+            if primitive in OPCODES:
+                opcodes.append(OPCODES[primitive])
+                constants.append(0.0)
+            else:
+                opcodes.append(CONSTANT)
+                constants.append(float(primitive))
+        self.genes = PrefixTree.from_prefix(opcodes, constants, depths)
+
+
+    # Subtree crossover with the same distribution over (point, donor point) pairs as
+    # TreeGenotype.recombine's rejection sampling: a point is chosen in proportion to the
+    # number of mate's subtrees that fit there, then one of those subtrees uniformly.
+    def recombine(self, mate, depth_limit, **kwargs):
+        child = self.__class__()
+
+        # Number of mate's subtrees that fit at each depth
+        mate_heights = sorted(mate.genes.heights)
+        fitting = [bisect_right(mate_heights, depth_limit - depth) for depth in range(depth_limit + 1)]
+        cumulative = list(accumulate(map(fitting.__getitem__, self.genes.depths)))
+        assert cumulative[-1] > 0, 'No subtree of the mate fits within the depth limit'
+
+        point = random.choices(range(self.genes.size), cum_weights=cumulative)[0]
+        budget = depth_limit - self.genes.depths[point]
+        candidates = [i for i, height in enumerate(mate.genes.heights) if height <= budget]
+        donor_point = candidates[random.randrange(len(candidates))]
+
+        child.genes = self.genes.splice(point, mate.genes, donor_point)
+        return child
+
+
+    # Subtree mutation at a uniformly chosen non-root node, replaced by a tree grown
+    # from that node's depth, so it always fits within depth_limit
+    def mutate(self, depth_limit, **kwargs):
+        mutant = self.__class__()
+        mutant.genes = self.genes
+
+        # If there is only one node then return, as you do not want to change the whole tree
+        if self.genes.size == 1:
+            return mutant
+
+        point = random.randint(1, self.genes.size - 1)
+        new_subtree = random_prefix_tree(self.genes.depths[point], False, depth_limit=depth_limit, **kwargs)
+        mutant.genes = self.genes.splice(point, new_subtree, 0)
+        return mutant
@@ -0,0 +1,96 @@
+
+# run_records.py
+
+import csv
+import numpy as np
+
+# Structured, append-only records of an EA run, one CSV row per generation.
+#
+# Entries logged before the first generation (mu, num_children, selection kwargs, ...)
+# are kept as '# name: value' comment lines. The header row then fixes the schema:
+# the GENERATION_COLUMNS shared by every run, followed by the statistics of the
+# log_*_stats method that ended the first generation. Column names are the names of
+# the text log entries, so both describe a run with the same vocabulary. A value not
+# logged in a generation (e.g., children of the initial population) is left empty.
+#
+# Rows are appended as each generation ends, so a run's records can be read, analyzed
+# and plotted one row at a time while the run is in progress or after it crashed.
+
+# Per-generation entries logged by BaseEvolutionPopulation (and GeneticProgrammingPopulation)
+# outside of the stats methods
+GENERATION_COLUMNS = (
+    'Evaluations',
+    'Number of children',
+    'Number of recombinations',
+    'Number of mutations',
+    'Pre-survival population size',
+    'Post-survival population size',
+    'Fitness cache hits',
+    'Fitness cache misses'
+)
+
+
+class RunRecorder():
+    def __init__(self, path):
+        self.path = path
+        self.metadata = []
+        self.columns = None
+        self.row = dict()
+
+
+    def add(self, name, value):
+        if self.columns is None and name not in GENERATION_COLUMNS and not self.row:
+            self.metadata.append(f'{name}: {value}')
+        else:
+            assert self.columns is None or name in self.columns, f'Entry {name} is not a column of {self.path}'
+            self.row[name] = value
+
+
+    # Appends the current generation's row, writing the metadata and header
+    # first if this is the first generation. stats are the stats method's columns.
+    def end_generation(self, stats):
+        if self.columns is None:
+            self.columns = GENERATION_COLUMNS + tuple(stats)
+            with open(self.path, 'w', newline='') as f:
+                f.write(''.join(f'# {line}\n' for line in self.metadata))
+                csv.writer(f).writerow(self.columns)
+
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerow([self.row.get(name, '') for name in self.columns])
+        self.row = dict()
+
+
+# Streams a records file. Returns its metadata, a dict of the comment entries as strings,
+# and a generator of rows, each a dict from column name to float (None if not logged).
+def stream_records(path):
+    metadata = dict()
+    columns = []
+    with open(path, 'r', newline='') as f:
+        for line in f:
+            if not line.startswith('# '):
+                columns = next(csv.reader([line]))
+                break
+            name, value = line[2:].rstrip('\n').split(': ', 1)
+            metadata[name] = value
+
+    def rows():
+        with open(path, 'r', newline='') as f:
+            # Skip the metadata up to and including the header
+            for line in f:
+                if not line.startswith('# '):
+                    break
+            for values in csv.reader(f):
+                yield {name: float(value) if value else None for name, value in zip(columns, values)}
+
+    return metadata, rows()
+
+
+# Loads a records file as columns. Returns its metadata and a dict from column name
+# to a float array with one value per generation (nan if not logged).
+def load_records(path):
+    metadata, rows = stream_records(path)
+    columns = dict()
+    for row in rows:
+        for name, value in row.items():
+            columns.setdefault(name, []).append(np.nan if value is None else value)
+    return metadata, {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
@@ -0,0 +1,80 @@
+
+# tests/test_experiment_runner.py
+
+import random, pytest, os, sys, inspect, re
+from pathlib import Path
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from experiment_runner import *
+
+# The repository's configs, with populations and samples shrunk so that runs take seconds
+def small_config(path, tmp_path, drop=()):
+    text = Path(path).read_text()
+    for name, value in (('mu', 6), ('num_children', 4), ('k', 2), ('sample_size', 2)):
+        text = re.sub(rf'^{name} = .*$', f'{name} = {value}', text, flags=re.M)
+    for name in drop:
+        text = re.sub(rf'^{name} = .*\n', '', text, flags=re.M)
+    small = tmp_path / 'config.txt'
+    small.write_text(text)
+    return small
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['experiment_runner.py'] + [str(arg) for arg in args])
+    main()
+
+class TestExperimentRunner:
+    def test_gp_command(self, tmp_path, monkeypatch):
+        # The documented 2b command runs end to end, and resumes without redoing runs
+        config = small_config('configs/2b/green_config.txt', tmp_path)
+        out = tmp_path / 'store'
+        run_main(monkeypatch, config, '--runs', 2, '--evaluations', 16, '--out', out)
+        assert len((out / 'best_per_run.txt').read_text().split()) == 2
+        for name in ('best_solution', 'best_log', 'histogram', 'base_histogram'):
+            assert (out / f'{name}.txt').exists()
+        log = ResultStore(out).read_log(0)
+        assert [line for line in log if line.startswith('Evaluations')][-1] == 'Evaluations: 18'
+
+        best = (out / 'best_per_run.txt').read_text()
+        run_main(monkeypatch, config, '--runs', 2, '--evaluations', 16, '--out', out)
+        assert (out / 'best_per_run.txt').read_text() == best
+
+    def test_gp_records(self, tmp_path, monkeypatch):
+        # With --records, a gp run keeps per-generation records instead of a text log
+        config = small_config('configs/2b/green_config.txt', tmp_path)
+        out = tmp_path / 'store'
+        run_main(monkeypatch, config, '--runs', 1, '--evaluations', 16, '--out', out, '--records')
+        assert ResultStore(out).read_log(0) == []
+        metadata, columns = ResultStore(out).read_records(0)
+        assert metadata['mu'] == '6'
+        assert list(columns['Evaluations']) == [6, 10, 14, 18]
+        assert list(columns['Post-survival population size'][1:]) == [6] * 3
+        assert list(columns['Number of recombinations'][1:] + columns['Number of mutations'][1:]) == [4] * 3
+        assert (columns['Local mean tree size'] >= 1).all()
+        with pytest.raises(AssertionError, match='text logs'):
+            run_experiment('coevolution', small_config('configs/2c/green_config.txt', tmp_path), 1, 40,
+                           tmp_path / 'coevolution', records=True)
+
+    def test_coevolution_command(self, tmp_path, monkeypatch):
+        # The 2c config runs through one MatchScheduler per run, within the game budget
+        config = small_config('configs/2c/green_config.txt', tmp_path)
+        out = tmp_path / 'store'
+        run_main(monkeypatch, config, '--kind', 'coevolution', '--runs', 1, '--evaluations', 40, '--out', out)
+        for name in ('best_solution', 'best_ghost', 'best_log', 'pac_histogram', 'ghost_histogram'):
+            assert (out / f'{name}.txt').exists()
+        log = ResultStore(out).read_log(0)
+        # 12 games for the initial populations, then 20 per generation of 6 + 4 controllers each
+        assert [line for line in log if line.startswith('Pac-Man Evaluations')] == \
+            ['Pac-Man Evaluations: 12', 'Pac-Man Evaluations: 32', 'Pac-Man Evaluations: 52']
+        assert 'Ghost Post-survival population size: 6' in log
+        played, reused = (int(line.split(': ')[1]) for line in log if line.startswith('Games'))
+        assert played + reused == 52
+
+    def test_missing_entries(self, tmp_path):
+        # Configs without every entry a run reads are rejected up front, naming the entries
+        config = small_config('configs/2b/green_config.txt', tmp_path, drop=('prob_of_full_method',))
+        with pytest.raises(AssertionError, match=r'\[problem\] prob_of_full_method'):
+            run_experiment('gp', config, 1, 16, tmp_path / 'store')
+        config = small_config('configs/2c/green_config.txt', tmp_path, drop=('sample_size',))
+        with pytest.raises(AssertionError, match=r'\[fitness_kwargs\] sample_size'):
+            run_experiment('coevolution', config, 1, 40, tmp_path / 'store')
@@ -0,0 +1,57 @@
+
+# tests/test_fitness.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from fitness import *
+from tree_genotype import TreeGenotype
+from snake_eyes import read_config
+
+config = read_config('configs/2c/green_config.txt', globals(), locals())
+# Without RAND, batched and per-state games draw the same random numbers
+for problem in ('pac_problem', 'ghost_problem'):
+    config[problem]['nonterminals'] = ('+', '-', '*', '/', '+')
+seed = 0
+num_controllers = 6
+
+def controllers(problem):
+    random.seed(seed)
+    return TreeGenotype.initialization(num_controllers, **config[problem])
+
+def tree(serialization):
+    controller = TreeGenotype()
+    controller.deserialize(serialization)
+    return controller
+
+def play(pac, ghost, **kwargs):
+    random.seed(seed)
+    return play_GPac(pac, ghost, **config['game'], **kwargs)[0]
+
+# A Pac-Man that heads for pills, and ghosts that chase it, flee from it, or wander
+pill_eater = tree('-\n|0.0\n|P\n')
+chasers = [tree('-\n|0.0\n|M\n'), tree('M\n'), tree('P\n'), tree('G\n'), tree('W\n')]
+
+class TestPlayGPac:
+    @pytest.mark.parametrize('batched', [False, True])
+    def test_ghost_controller_plays(self, batched):
+        # With a fixed seed and Pac-Man, different ghost trees give different games
+        # (maze distances keep chasing ghosts from getting stuck behind walls)
+        scores = [play(pill_eater, ghost, batched=batched, maze=True) for ghost in chasers]
+        assert len(set(scores)) > 1
+        # Chasing ghosts catch Pac-Man sooner than fleeing ones
+        assert scores[0] < scores[1]
+
+    def test_batched_matches_per_state(self):
+        # Both scoring paths pick the same actions for both players
+        pacs, ghosts = controllers('pac_problem'), controllers('ghost_problem')
+        for pac, ghost in zip(pacs[:3], ghosts[:3]):
+            assert play(pac, ghost, batched=True) == play(pac, ghost)
+
+    @pytest.mark.parametrize('batched', [False, True])
+    def test_random_pac(self, batched):
+        # Either controller may be random
+        ghost = controllers('ghost_problem')[0]
+        assert isinstance(play(None, ghost, batched=batched), (int, float))
+        assert isinstance(play(None, None, batched=batched), (int, float))
@@ -0,0 +1,38 @@
+
+# tests/test_game_log.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from gpac import GameLog
+
+def text_log(width, height, turns):
+    lines = [str(width), str(height), 'w 0 1', 'p 2 3']
+    for turn in range(turns):
+        lines.extend([f'm {turn % width} {turn % height}', f'0 {width - 1} {height - 1}', f't {turns - turn} {turn / 3}'])
+    return lines
+
+class TestGameLog:
+    def test_round_trip(self):
+        # Parsing a text log and writing it back gives the same lines
+        lines = text_log(20, 10, 100)
+        log = GameLog.from_text(lines)
+        assert log.records.typecode == 'h'
+        assert log.to_text() == lines
+        assert len(log) == len(lines)
+        assert log[-1] == lines[-1]
+
+    def test_long_game(self):
+        # Games too long for int16 records are logged with wider ones
+        lines = text_log(20, 10, 2**15 + 10)
+        log = GameLog.from_text(lines)
+        assert log.records.typecode == 'q'
+        assert log.to_text() == lines
+
+    def test_large_map(self):
+        # So are maps too large for int16 coordinates
+        lines = text_log(2**15 + 1, 10, 5)
+        log = GameLog.from_text(lines)
+        assert log.records.typecode == 'q'
+        assert log.to_text() == lines
@@ -0,0 +1,72 @@
+
+# tests/test_gpac_population_evaluation.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from gpac_population_evaluation import *
+from fitness_cache import FitnessCache
+from tree_genotype import TreeGenotype
+from snake_eyes import read_config
+
+config = read_config('configs/2c/green_config.txt', globals(), locals())
+game = config['game']
+popsize = 6
+
+def population():
+    random.seed(0)
+    return TreeGenotype.initialization(popsize, **config['pac_problem'])
+
+class TestBasePopulationEvaluation:
+    def test_cache_without_seed(self):
+        # Without a fixed seed, the cache gives the fitnesses of uncached games
+        cached, uncached = population(), population()
+        random.seed(2)
+        base_population_evaluation(cached, 0.1, 'green', cache=FitnessCache(), **game)
+        random.seed(2)
+        base_population_evaluation(uncached, 0.1, 'green', **game)
+        assert [individual.fitness for individual in cached] == [individual.fitness for individual in uncached]
+
+    def test_game_seeds(self):
+        # Games are seeded per genotype and generation: repeats in a generation hit the cache,
+        # while other genotypes and later generations play other games
+        cache = FitnessCache()
+        later, pop = population(), population()
+        repeat = TreeGenotype()
+        repeat.deserialize(pop[0].serialize())
+        base_population_evaluation(pop + [repeat], 0.1, 'green', cache=cache, **game)
+        assert cache.misses == popsize and cache.hits == 1
+        assert repeat.base_fitness == pop[0].base_fitness
+        assert len({game_seed(0, individual) for individual in pop}) == popsize
+        assert game_seed(0, pop[0]) != game_seed(1, pop[0])
+        base_population_evaluation(later, 0.1, 'green', cache=cache, **game)
+        assert cache.misses == 2 * popsize
+
+    def test_cache_holds_scores(self):
+        # Cached outputs hold no logs; the best individuals replay theirs
+        cache = FitnessCache()
+        pop = population()
+        base_population_evaluation(pop, 0.1, 'green', cache=cache, seed=1, **game)
+        assert all(set(output) == {'score'} for output in cache.entries.values())
+        max_fit = max(individual.fitness for individual in pop)
+        for individual in pop:
+            assert (individual.log is not None) == (individual.fitness == max_fit or
+                    individual.base_fitness == max(other.base_fitness for other in pop))
+
+    def test_cache_hits(self):
+        # A fixed seed makes repeated genotypes hit the cache, with the same fitnesses
+        cache = FitnessCache()
+        first, second = population(), population()
+        base_population_evaluation(first, 0.1, 'green', cache=cache, seed=1, **game)
+        misses = cache.misses
+        base_population_evaluation(second, 0.1, 'green', cache=cache, seed=1, **game)
+        assert cache.misses == misses
+        assert [individual.fitness for individual in first] == [individual.fitness for individual in second]
+
+    def test_uncached_matches_cached(self):
+        # The cache does not change fitnesses
+        cached, uncached = population(), population()
+        base_population_evaluation(cached, 0.1, 'green', cache=FitnessCache(), seed=1, **game)
+        base_population_evaluation(uncached, 0.1, 'green', seed=1, **game)
+        assert [individual.fitness for individual in cached] == [individual.fitness for individual in uncached]
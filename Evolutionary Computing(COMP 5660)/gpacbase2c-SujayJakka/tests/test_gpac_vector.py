@@ -0,0 +1,38 @@
+
+# tests/test_gpac_vector.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from gpac_vector import *
+from fitness import parse_map
+
+num_games = 3
+
+# Small rule sets covering each pill spawn, each fruit spawn and several players,
+# on the default cross-shaped map (None) or the repository's map
+rule_sets = [
+    {'game_map': None},
+    {'game_map': None, 'pill_spawn': 'waves', 'pill_density': 1/3, 'fruit_prob': 1/10},
+    {'game_map': None, 'pill_spawn': 'grid', 'fruit_spawn': 'corners_eaten', 'fruit_prob': 1/10},
+    {'game_map': None, 'pill_spawn': 'linear', 'fruit_spawn': 'corners_spawned', 'fruit_prob': 1/10},
+    {'game_map': None, 'pill_spawn': 'manhattan', 'num_pacs': 3, 'num_ghosts': 5},
+    {'game_map': 'map.txt', 'pill_spawn': 'waves', 'fruit_spawn': 'corners_spawned', 'fruit_prob': 1/75,
+     'time_multiplier': 1, 'num_pacs': 2},
+]
+
+class TestVectorGPacGame:
+    @pytest.mark.parametrize('kwargs', rule_sets)
+    def test_replays_logged_games(self, kwargs):
+        # Replaying the actions of logged games gives the same positions, pills, fruit and scores each turn
+        kwargs = dict(kwargs)
+        game_map = parse_map(kwargs.pop('game_map'))
+        assert replay_logged_games(game_map, num_games, seed=1, **kwargs) > 0
+
+    def test_restores_random_state(self):
+        # Playing the logged games leaves the caller's random state as it was
+        random.seed(2)
+        state = random.getstate()
+        replay_logged_games(parse_map(None), 1)
+        assert random.getstate() == state
@@ -0,0 +1,64 @@
+
+# tests/test_island_model.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from island_model import *
+
+class Individual():
+    def __init__(self, fitness):
+        self.fitness = fitness
+
+class Population():
+    def __init__(self, population):
+        self.population = population
+
+# Run function whose island i holds individuals with fitnesses 100 * i to 100 * i + 9
+def migrating_run(num_evaluations, config, migration):
+    ea = Population([Individual(100 * migration.island + i) for i in range(10)])
+    for _ in range(config['generations']):
+        migration(ea)
+    return sorted(individual.fitness for individual in ea.population)
+
+class TestIslandModel:
+    def test_targets(self):
+        # Every migration round, each island sends to and receives from exactly one other island
+        for topology in TOPOLOGIES:
+            for num_islands in range(2, 8):
+                for round in range(1, 20):
+                    targets = [Migration(island, num_islands, 1, 1, topology, None, 7).target(round)
+                               for island in range(num_islands)]
+                    assert sorted(targets) == list(range(num_islands))
+                    assert all(target != island for island, target in enumerate(targets))
+
+    def test_ring_migration(self):
+        # Best individuals replace the worst of the next island, once per interval
+        outputs = run_islands(migrating_run, 100, {'generations': 4}, 3, 2, 2)
+        assert outputs[0] == [4, 5, 6, 7, 8, 9, 208, 208, 209, 209]
+        assert outputs[1] == [102, 103, 104, 105, 106, 107, 108, 109, 208, 209]
+        assert outputs[2] == [108, 109, 202, 203, 204, 205, 206, 207, 208, 209]
+
+    def test_island_budget(self):
+        # Islands run whole generations and together stay within the budget
+        assert island_budget(100000, 4, 1000, 1000) == 25000
+        assert island_budget(100000, 3, 1000, 1000) == 33000
+        assert island_budget(10500, 4, 100, 300) == 2500
+        for _ in range(200):
+            num_evaluations, num_islands = random.randint(1000, 100000), random.randint(1, 8)
+            mu, num_children = random.randint(1, 100), random.randint(1, 100)
+            budget = island_budget(num_evaluations, num_islands, mu, num_children)
+            assert (budget - mu) % num_children == 0
+            assert num_islands * budget <= num_evaluations < num_islands * (budget + num_children)
+        with pytest.raises(AssertionError):
+            island_budget(1000, 4, 300, 10)
+
+    def test_merge_logs(self):
+        # Counts are summed, bests maximized, means averaged, and the rest kept
+        logs = [['mu: 5', 'parent selection: truncation', 'Evaluations: 5', 'Local best: 3', 'Local mean: 1.5'],
+                ['mu: 5', 'parent selection: truncation', 'Evaluations: 5', 'Local best: 7', 'Local mean: 2.5']]
+        assert merge_logs(logs) == ['mu: 10', 'parent selection: truncation', 'Evaluations: 10',
+                                    'Local best: 7', 'Local mean: 2.0']
+        with pytest.raises(AssertionError):
+            merge_logs([['mu: 5'], ['num_children: 5']])
@@ -0,0 +1,106 @@
+
+# tests/test_maze_distances.py
+
+import random, pytest, os, sys, inspect
+from collections import deque
+from math import inf
+import numpy as np
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from maze_distances import *
+from fitness import parse_map
+
+iterations = 20
+
+def random_map(width, height, wall_density):
+    # True marks a wall, as in a parsed map
+    return tuple(tuple(random.random() < wall_density for _ in range(height)) for _ in range(width))
+
+def open_cells(game_map):
+    return [(x, y) for x in range(len(game_map)) for y in range(len(game_map[0])) if not game_map[x][y]]
+
+def bfs(game_map, source):
+    # Distances from source to every reachable open cell, one queue at a time
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in NEIGHBORS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < len(game_map) and 0 <= ny < len(game_map[0]) and not game_map[nx][ny] \
+                    and (nx, ny) not in distances:
+                distances[(nx, ny)] = distances[(x, y)] + 1
+                queue.append((nx, ny))
+    return distances
+
+def maps():
+    random.seed(0)
+    yield parse_map('map.txt')
+    for _ in range(iterations):
+        yield random_map(random.randint(1, 15), random.randint(1, 15), random.uniform(0, 0.5))
+
+class TestMazeDistances:
+    def test_matches_bfs(self):
+        # Every pair of open cells is as far apart as a plain BFS finds, or inf if unreachable
+        for game_map in maps():
+            maze = MazeDistances(game_map)
+            cells = open_cells(game_map)
+            assert len(maze.cells) == len(cells)
+            for source in cells:
+                reached = bfs(game_map, source)
+                for target in cells:
+                    assert maze.distance(source, target) == reached.get(target, inf)
+
+    def test_queries(self):
+        # nearest and between agree with distance
+        for game_map in maps():
+            maze = MazeDistances(game_map)
+            cells = open_cells(game_map)
+            if not cells:
+                continue
+            sources = random.choices(cells, k=5)
+            targets = random.choices(cells, k=7)
+            between = maze.between(sources, targets)
+            for i, source in enumerate(sources):
+                assert maze.nearest(source, targets) == min(maze.distance(source, target) for target in targets)
+                assert list(between[i]) == [maze.distance(source, target) for target in targets]
+            assert maze.nearest(sources[0], []) == inf
+
+    def test_walls(self):
+        # Walls are not cells
+        game_map = parse_map('map.txt')
+        maze = MazeDistances(game_map)
+        wall = next((x, y) for x in range(len(game_map)) for y in range(len(game_map[0])) if game_map[x][y])
+        with pytest.raises(AssertionError):
+            maze.cell(wall)
+
+class TestPillField:
+    def test_matches_recompute(self):
+        # Eating pills one at a time keeps the field equal to one computed from scratch
+        for game_map in maps():
+            maze = MazeDistances(game_map)
+            cells = open_cells(game_map)
+            pills = frozenset(random.sample(cells, len(cells) // 3))
+            field = PillField(maze, pills)
+            while pills:
+                pills = pills - frozenset(random.sample(sorted(pills), random.randint(1, min(3, len(pills)))))
+                field.update(pills)
+                expected = PillField(maze, pills)
+                assert np.array_equal(field.field, expected.field)
+                assert np.array_equal(field.grid, expected.grid)
+                for cell in cells:
+                    assert field[cell] == maze.nearest(cell, list(pills))
+
+    def test_new_pills(self):
+        # Pills that reappear can change the field anywhere, so it is recomputed
+        game_map = parse_map('map.txt')
+        maze = MazeDistances(game_map)
+        cells = open_cells(game_map)
+        field = PillField(maze, frozenset(cells[:10]))
+        field.update(frozenset(cells[:5]))
+        pills = frozenset(cells[5:50])
+        field.update(pills)
+        assert np.array_equal(field.grid, PillField(maze, pills).grid)
+        field.update(frozenset())
+        assert (field.grid == inf).all()
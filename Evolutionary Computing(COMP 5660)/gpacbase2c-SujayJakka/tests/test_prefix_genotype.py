@@ -0,0 +1,87 @@
+
+# tests/test_prefix_genotype.py
+
+import random, pytest, os, sys, inspect
+import numpy as np
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from prefix_genotype import *
+from tree_genotype import TreeGenotype
+from snake_eyes import read_config
+
+config = read_config('configs/2c/green_config.txt', globals(), locals())
+problem = config['pac_problem']
+recombination_kwargs = config['pac_recombination_kwargs']
+mutation_kwargs = config['pac_mutation_kwargs']
+depth_limit = problem['depth_limit']
+popsize = 50
+iterations = 3000
+
+def rebuilt(genes):
+    # The same tree, built from scratch from its serialization
+    individual, copy = PrefixTreeGenotype(), PrefixTreeGenotype()
+    individual.genes = genes
+    copy.deserialize(individual.serialize())
+    return copy.genes
+
+def assert_same_tree(genes, other):
+    for name in ('opcodes', 'constants', 'subtree_ends', 'depths', 'heights'):
+        assert np.array_equal(getattr(genes, name), getattr(other, name)), name
+    assert genes.size == other.size and genes.height == other.height
+
+class TestPrefixTreeGenotype:
+    def test_initialization_parity(self):
+        # The same seed gives the same trees as TreeGenotype
+        for seed in range(5):
+            random.seed(seed)
+            trees = TreeGenotype.initialization(popsize, **problem)
+            random.seed(seed)
+            prefix_trees = PrefixTreeGenotype.initialization(popsize, **problem)
+            assert [tree.serialize() for tree in trees] == [tree.serialize() for tree in prefix_trees]
+            for tree, prefix_tree in zip(trees, prefix_trees):
+                assert tree.genes.size == prefix_tree.genes.size
+                assert tree.genes.height == prefix_tree.genes.height
+
+    def test_serialization_round_trip(self):
+        # Deserializing a serialization gives back the same tree, readable by TreeGenotype too
+        random.seed(0)
+        for individual in PrefixTreeGenotype.initialization(popsize, **problem):
+            copy = PrefixTreeGenotype()
+            copy.deserialize(individual.serialize())
+            assert_same_tree(copy.genes, individual.genes)
+            tree = TreeGenotype()
+            tree.deserialize(individual.serialize())
+            assert tree.serialize() == individual.serialize()
+
+    def test_splice_consistency(self):
+        # Crossover and mutation keep every array consistent with the tree they describe,
+        # and never exceed the depth limit
+        random.seed(0)
+        population = PrefixTreeGenotype.initialization(popsize, **problem)
+        for _ in range(iterations):
+            p1, p2 = random.sample(population, 2)
+            child = p1.recombine(p2, **recombination_kwargs)
+            child = child.mutate(**mutation_kwargs)
+            assert_same_tree(child.genes, rebuilt(child.genes))
+            assert child.genes.height <= depth_limit
+            assert max(child.genes.depths) <= depth_limit
+            population[random.randrange(popsize)] = child
+
+    def test_variation_leaves_parents(self):
+        # Children never change their parents' arrays
+        random.seed(0)
+        population = PrefixTreeGenotype.initialization(popsize, **problem)
+        serializations = [individual.serialize() for individual in population]
+        for _ in range(iterations // 10):
+            p1, p2 = random.sample(population, 2)
+            p1.recombine(p2, **recombination_kwargs).mutate(**mutation_kwargs)
+        assert [individual.serialize() for individual in population] == serializations
+
+    def test_from_prefix_checks_shape(self):
+        # Prefix arrays must hold exactly one binary tree
+        plus, g = OPCODES['+'], OPCODES['G']
+        with pytest.raises(AssertionError):
+            PrefixTree.from_prefix([plus, g], [0.0, 0.0], [0, 1])
+        with pytest.raises(AssertionError):
+            PrefixTree.from_prefix([g, g], [0.0, 0.0], [0, 0])
@@ -0,0 +1,85 @@
+
+# tests/test_tree_genotype.py
+
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from tree_genotype import *
+from snake_eyes import read_config
+
+config = read_config('configs/2c/green_config.txt', globals(), locals())
+problem = config['pac_problem']
+recombination_kwargs = config['pac_recombination_kwargs']
+mutation_kwargs = config['pac_mutation_kwargs']
+depth_limit = problem['depth_limit']
+popsize = 50
+iterations = 1000
+
+def preorder(node, depth=0):
+    # (node, depth) pairs in preorder, by walking the whole tree
+    if node is None:
+        return []
+    return [(node, depth)] + preorder(node.left, depth + 1) + preorder(node.right, depth + 1)
+
+def random_pop():
+    random.seed(0)
+    return TreeGenotype.initialization(popsize, **problem)
+
+class TestFindNode:
+    def test_matches_preorder(self):
+        # The node at each index is the node a preorder walk reaches there, at the same depth
+        for individual in random_pop():
+            for index, (node, depth) in enumerate(preorder(individual.genes)):
+                found, path = find_node(individual.genes, index)
+                assert found is node
+                assert len(path) == depth
+
+    def test_path(self):
+        # Each step of the path leads to the next ancestor, ending at the node
+        for individual in random_pop():
+            for index in range(individual.genes.size):
+                node, path = find_node(individual.genes, index)
+                children = [ancestor.left if is_left_child else ancestor.right for ancestor, is_left_child in path]
+                assert [ancestor for ancestor, _ in path[1:]] == children[:-1]
+                assert not path or (path[0][0] is individual.genes and children[-1] is node)
+
+class TestReplaceNode:
+    def test_replaces_only_the_node(self):
+        # The new tree is the old one with the subtree swapped in; other subtrees are shared
+        population = random_pop()
+        for individual in population:
+            index = random.randrange(individual.genes.size)
+            node, path = find_node(individual.genes, index)
+            subtree = random.choice(population).genes
+            root = replace_node(path, subtree)
+            assert find_node(root, index)[0] is subtree
+            assert root.size == individual.genes.size - node.size + subtree.size
+            before = preorder(individual.genes)
+            after = preorder(root)
+            assert [n.primitive for n, _ in after[:index]] == [n.primitive for n, _ in before[:index]]
+            assert [n for n, _ in after[index + subtree.size:]] == [n for n, _ in before[index + node.size:]]
+
+    def test_heights(self):
+        # Sizes and heights of the copied ancestors are recomputed
+        population = random_pop()
+        for individual in population:
+            node, path = find_node(individual.genes, random.randrange(individual.genes.size))
+            root = replace_node(path, random.choice(population).genes)
+            for n, depth in preorder(root):
+                nodes = preorder(n)
+                assert n.size == len(nodes)
+                assert n.height == max(d for _, d in nodes)
+
+class TestVariation:
+    def test_parents_unchanged(self):
+        # Children share subtrees with their parents but never change them
+        population = random_pop()
+        serializations = [individual.serialize() for individual in population]
+        sizes = [(individual.genes.size, individual.genes.height) for individual in population]
+        for _ in range(iterations):
+            p1, p2 = random.sample(population, 2)
+            child = p1.recombine(p2, **recombination_kwargs).mutate(**mutation_kwargs)
+            assert child.genes.height <= depth_limit
+        assert [individual.serialize() for individual in population] == serializations
+        assert [(individual.genes.size, individual.genes.height) for individual in population] == sizes
@@ -2,31 +2,27 @@
 # tree_genotype.py
 
 import random
-from copy import deepcopy
 from fitness import manhattan
-from collections import deque
 
 # Node Class that is used to make up the objects for TreeGenotype()
+# Nodes are never modified once made, so individuals can share subtrees:
+# recombination and mutation only copy the path from the root down to the
+# replaced subtree (see replace_node). Height and size come from the children.
 class Node():
-    def __init__(self, primitive, parent):
+    def __init__(self, primitive, left=None, right=None):
         self.primitive = primitive
-        self.left = None
-        self.right = None
+        self.left = left
+        self.right = right
         # Added Fields
-        self.parent = parent
-        self.height = None
-        self.size = None
+        if left is None:
+            self.height = 0
+            self.size = 1
+        else:
+            self.height = 1 + max(left.height, right.height)
+            self.size = 1 + left.size + right.size
 
-# Function to update node fields after recombination and mutation
-def update_node_fields(node):
-    if not node:
-        return
 
-    node.size = 1 + node.left.size + node.right.size
-    node.height = 1 + max(node.left.height, node.right.height)
-    update_node_fields(node.parent)
-        
-def full_method(curr_depth, parent, **kwargs):
+def full_method(curr_depth, **kwargs):
 
     # Will create a terminal node if it reaches depth limit
     # Will create either a G, P, F, W, or Constant Node in the case of Pac-Man
@@ -36,31 +32,22 @@ def full_method(curr_depth, parent, **kwargs):
         length_of_terminals = len(kwargs["terminals"])
         terminal_type = random.randint(0, length_of_terminals - 1)
         if terminal_type != length_of_terminals - 1:
-            terminal_node = Node(kwargs["terminals"][terminal_type], parent)
-            terminal_node.height = 0
-            terminal_node.size = 1
-            return terminal_node
+            return Node(kwargs["terminals"][terminal_type])
         else:
             constant_range = kwargs["constant_range"]
-            terminal_node = Node(random.uniform(constant_range[0], constant_range[1]), parent)
-            terminal_node.height = 0
-            terminal_node.size = 1
-            return terminal_node
+            return Node(random.uniform(constant_range[0], constant_range[1]))
     # If not at depth limit will create another nonterminal node
     # The possible nonterminal nodes that it can create are +, -, *, /, or RAND
     else:
         nonterminal_type = random.randint(0, 4)
-        nonterminal_node = Node(kwargs["nonterminals"][nonterminal_type], parent)
-        nonterminal_node.left = full_method(curr_depth + 1, nonterminal_node, **kwargs)
-        nonterminal_node.right = full_method(curr_depth + 1, nonterminal_node, **kwargs)
-        nonterminal_node.height = 1 + max(nonterminal_node.left.height, nonterminal_node.right.height)
-        nonterminal_node.size = 1 + nonterminal_node.left.size + nonterminal_node.right.size
-        return nonterminal_node
+        left = full_method(curr_depth + 1, **kwargs)
+        right = full_method(curr_depth + 1, **kwargs)
+        return Node(kwargs["nonterminals"][nonterminal_type], left, right)
 
 # Same as the full method except we are able to create a terminal node even when we are not at the depth limit
 # There is a 50/50 chance of creating a terminal or nonterminal node at any depth except for the depth limit,
 # where we are forced to choose a terminal node
-def grow_method(curr_depth, parent, **kwargs):
+def grow_method(curr_depth, **kwargs):
     continue_depth = random.randint(0, 1)
 
     # Will create a terminal node if it reaches depth limit or if we randomly select 0
@@ -71,53 +58,47 @@ def grow_method(curr_depth, parent, **kwargs):
         length_of_terminals = len(kwargs["terminals"])
         terminal_type = random.randint(0, length_of_terminals - 1)
         if terminal_type != length_of_terminals - 1:
-            terminal_node = Node(kwargs["terminals"][terminal_type], parent)
-            terminal_node.height = 0
-            terminal_node.size = 1
-            return terminal_node
+            return Node(kwargs["terminals"][terminal_type])
         else:
             constant_range = kwargs["constant_range"]
-            terminal_node = Node(random.uniform(constant_range[0], constant_range[1]), parent)
-            terminal_node.height = 0
-            terminal_node.size = 1
-            return terminal_node
+            return Node(random.uniform(constant_range[0], constant_range[1]))
     # If not at depth limit will create another nonterminal node
     # The possible nonterminal nodes that it can create are +, -, *, /, or RAND
     else:
         nonterminal_type = random.randint(0, 4)
-        nonterminal_node = Node(kwargs["nonterminals"][nonterminal_type], parent)
-        nonterminal_node.left = grow_method(curr_depth + 1, nonterminal_node, **kwargs)
-        nonterminal_node.right = grow_method(curr_depth + 1, nonterminal_node, **kwargs)
-        nonterminal_node.height = 1 + max(nonterminal_node.left.height, nonterminal_node.right.height)
-        nonterminal_node.size = 1 + nonterminal_node.left.size + nonterminal_node.right.size
-        return nonterminal_node
-
-# BFS on the TreeGenotype of a parent.
-# Will return a dictionary with an integer as the key representing
-# when a node was encountered in the BFS, and the value of the dictionary is a tuple
-# of the corresponding node and depth of the node.
-# E.g. number -> (node, depth)
-def bfs(node):
-
-    bfs_dict = {}
-    queue = deque()
-    queue.append(node)
-    node_count = 0
-    depth = 0
-
-    while queue:
-        for _ in range(len(queue)):
-            popped_node = queue.pop()
-            node_count += 1
-            bfs_dict[node_count] = (popped_node, depth)
-            
-            if popped_node.left:
-                queue.append(popped_node.left)
-                queue.append(popped_node.right)
-                
-        depth += 1
-
-    return bfs_dict
+        left = grow_method(curr_depth + 1, **kwargs)
+        right = grow_method(curr_depth + 1, **kwargs)
+        return Node(kwargs["nonterminals"][nonterminal_type], left, right)
+
+# Finds the node at a preorder index of the tree (the root being 0) by descending
+# with subtree sizes, in O(height) rather than visiting every node.
+# Returns the node and the path to it, a list of (ancestor, is_left_child) pairs
+# from the root, so the depth of the node is len(path). Depth is found in O(height)
+# along with the node, not stored on it: subtrees are shared between trees (see
+# replace_node), where the same node can sit at different depths.
+def find_node(root, index):
+    node = root
+    path = []
+    while index:
+        index -= 1
+        if index < node.left.size:
+            path.append((node, True))
+            node = node.left
+        else:
+            index -= node.left.size
+            path.append((node, False))
+            node = node.right
+    return node, path
+
+# Returns a new root where the node at the end of path is replaced by subtree.
+# Only the ancestors on the path are copied; all other subtrees are shared.
+def replace_node(path, subtree):
+    for ancestor, is_left_child in reversed(path):
+        if is_left_child:
+            subtree = Node(ancestor.primitive, subtree, ancestor.right)
+        else:
+            subtree = Node(ancestor.primitive, ancestor.left, subtree)
+    return subtree
 
 class TreeGenotype():
     def __init__(self):
@@ -126,6 +107,15 @@ class TreeGenotype():
         # Added Fields
         self.base_fitness = None
         self.log = None
+        # (genes, compiled functions) pair cached by fitness.compiled_controller
+        self.compiled = None
+
+
+    # Compiled functions can't be pickled, so they are left out and rebuilt on first use
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['compiled'] = None
+        return state
 
 
     @classmethod
@@ -145,9 +135,9 @@ class TreeGenotype():
             rand_depth_limit = random.randint(1, depth_limit)
             
             if prob_of_full_method <= kwargs["prob_of_full_method"]:
-                individual.genes = full_method(0, None, depth_limit=rand_depth_limit, **kwargs)
+                individual.genes = full_method(0, depth_limit=rand_depth_limit, **kwargs)
             else:
-                individual.genes = grow_method(0, None, depth_limit=rand_depth_limit, **kwargs)
+                individual.genes = grow_method(0, depth_limit=rand_depth_limit, **kwargs)
 
         return population
 
@@ -188,32 +178,22 @@ class TreeGenotype():
         # We pop the last element as each serialization has an unneccessary new line character at the end
         lines.pop()
 
-        # TODO: Create the root node yourself here based on lines[0]
-        root = Node(to_float_to_string(lines[0]), None)
-
-        parent_stack = [(root, 0)]
-        for line in lines[1:]:
-            my_depth = line.count('|')
-            my_primitive = line.strip('|')
-            parent, parent_depth = parent_stack.pop()
-            right_child = False
-            while parent_stack and parent_depth >= my_depth:
-                parent, parent_depth = parent_stack.pop()
-                right_child = True
+        # Nodes are built bottom-up, as they can't be changed once made.
+        # A node has children exactly when the next line is one level deeper.
+        entries = [(line.count('|'), to_float_to_string(line.strip('|'))) for line in lines]
+        position = 0
 
-            # TODO: Create a node using the above variables as appropriate.
-            node = Node(to_float_to_string(my_primitive), None)
+        def build():
+            nonlocal position
+            depth, primitive = entries[position]
+            position += 1
+            if position < len(entries) and entries[position][0] == depth + 1:
+                left = build()
+                right = build()
+                return Node(primitive, left, right)
+            return Node(primitive)
 
-            if not right_child:
-                parent.left = node
-            else:
-                parent.right = node
-            
-            parent_stack.extend([(parent, parent_depth), \
-                                 (node, my_depth)])
-
-        # TODO: Use the data structure you've created to assign self.genes.
-        self.genes = root
+        self.genes = build()
 
     def recombine(self, mate, depth_limit, **kwargs):
         child = self.__class__()
@@ -223,48 +203,24 @@ class TreeGenotype():
         #          We recommend using deepcopy, but also recommend
         #          that you deepcopy the minimal amount possible.
 
-        parent_1_genes_clone = deepcopy(self.genes)
-        parent_2_genes_clone = deepcopy(mate.genes)
-
-        # Dictionary of mapping, integer_of_when_node_encountered -> (node, depth)
-        parent_1_dict = bfs(parent_1_genes_clone)
-        parent_2_dict = bfs(parent_2_genes_clone)
-
-        num_nodes_parent_1 = parent_1_genes_clone.size
-        num_nodes_parent_2 = parent_2_genes_clone.size
+        # Nothing is deepcopied: the child shares both parents' subtrees,
+        # and only the path to the crossover point in parent 1 is copied.
+        num_nodes_parent_1 = self.genes.size
+        num_nodes_parent_2 = mate.genes.size
 
         while True:
 
             # Uniform Randomly choose a subtree to remove from parent 1's genes
-            root_subtree_p1, root_subtree_p1_depth = parent_1_dict[random.randint(1, num_nodes_parent_1)]
+            root_subtree_p1, path_p1 = find_node(self.genes, random.randint(1, num_nodes_parent_1) - 1)
 
             # Uniform Randomly choose a subtree from parent 2's genes to recombine with parent 1's genes
-            root_subtree_p2 = parent_2_dict[random.randint(1, num_nodes_parent_2)][0]
+            root_subtree_p2 = find_node(mate.genes, random.randint(1, num_nodes_parent_2) - 1)[0]
 
             # Check to see if the depth of the root of the subtree chosen from parent 1
             # plus the height from the root of the subtree chosen from parent 2 is less than
             # or equal to depth_limit.
-            if root_subtree_p1_depth + root_subtree_p2.height <= depth_limit:
-
-                # If the subtree chosen from parent 1 is the whole tree then simply assign
-                # the genes of the child to the subtree chosen from parent 2.
-                if root_subtree_p1_depth == 0:
-                    child.genes = root_subtree_p2
-                    child.genes.parent = None
-                elif root_subtree_p1 is root_subtree_p1.parent.left:
-                    # Update Parent and Child Relationships
-                    root_subtree_p1.parent.left = root_subtree_p2
-                    root_subtree_p2.parent = root_subtree_p1.parent
-                    
-                    update_node_fields(root_subtree_p2.parent)
-                    child.genes = parent_1_genes_clone
-                else:
-                    # Update Parent and Child Relationships
-                    root_subtree_p1.parent.right = root_subtree_p2
-                    root_subtree_p2.parent = root_subtree_p1.parent
-                    
-                    update_node_fields(root_subtree_p2.parent)
-                    child.genes = parent_1_genes_clone
+            if len(path_p1) + root_subtree_p2.height <= depth_limit:
+                child.genes = replace_node(path_p1, root_subtree_p2)
                 break
 
         return child
@@ -272,10 +228,9 @@ class TreeGenotype():
 
     def mutate(self, depth_limit, **kwargs):
         mutant = self.__class__()
-        mutant.genes = deepcopy(self.genes)
+        mutant.genes = self.genes
 
         # 2b TODO: Mutate mutant.genes to produce a modified tree.
-        mutant_dict = bfs(mutant.genes)
         num_nodes_mutant = mutant.genes.size
 
         # If there is only one node in the TreeGenotype then return, as you do not want to change the whole true
@@ -286,29 +241,18 @@ class TreeGenotype():
             # Uniform Randomly choose a subtree to remove from the mutant's genes
             # Check to see if the chosen subtree is not also the whole tree
             while True:
-                root_subtree_mutant, root_subtree_mutant_depth = mutant_dict[random.randint(1, num_nodes_mutant)]
-                if root_subtree_mutant_depth != 0:
+                root_subtree_mutant, path_mutant = find_node(mutant.genes, random.randint(1, num_nodes_mutant) - 1)
+                if path_mutant:
                     break
                     
             # Grow a new tree using the Grow Method
-            new_subtree = grow_method(0, None, depth_limit=depth_limit, **kwargs)
+            new_subtree = grow_method(0, depth_limit=depth_limit, **kwargs)
     
             # Check to see if the depth of the root of the subtree chosen from the mutant
             # plus the height from the root of the new subtree chosen is less than
             # or equal to depth_limit.
-            if root_subtree_mutant_depth + new_subtree.height <= depth_limit:
-                if root_subtree_mutant is root_subtree_mutant.parent.left:
-                    # Update Parent and Child Relationships
-                    root_subtree_mutant.parent.left = new_subtree
-                    new_subtree.parent = root_subtree_mutant.parent
-                    
-                    update_node_fields(new_subtree.parent)
-                else:
-                    # Update Parent and Child Relationships
-                    root_subtree_mutant.parent.right = new_subtree
-                    new_subtree.parent = root_subtree_mutant.parent
-                    
-                    update_node_fields(new_subtree.parent)
+            if len(path_mutant) + new_subtree.height <= depth_limit:
+                mutant.genes = replace_node(path_mutant, new_subtree)
                 break
 
         return mutant
@@ -3,13 +3,24 @@
 
 import statistics
 import random
+from fitness_cache import FitnessCache
+from run_records import RunRecorder
+
+# Columns of each stats method in run records, in the order they are logged
+BASE_STATS = ('Local best', 'Local mean')
+PENALIZED_STATS = ('Local best penalized fitness', 'Local mean penalized fitness', 'Local best base fitness',
+                   'Local mean base fitness', 'Number of valid solutions')
+MULTIOBJECTIVE_STATS = ('Local best length', 'Local mean length', 'Local best width', 'Local mean width',
+                        'Individuals in the Pareto front', 'Local Pareto front mean length',
+                        'Local Pareto front mean width', 'Local Pareto front hypervolume')
 
 class BaseEvolutionPopulation():
     def __init__(self, individual_class, mu, num_children,
                  mutation_rate, parent_selection, survival_selection,
                  problem=dict(), parent_selection_kwargs=dict(),
                  recombination_kwargs=dict(), mutation_kwargs=dict(),
-                 survival_selection_kwargs=dict(), **kwargs):
+                 survival_selection_kwargs=dict(), fitness_cache=None,
+                 record_path=None, text_log=True, **kwargs):
         self.mu = mu
         self.num_children = num_children
         self.mutation_rate = mutation_rate
@@ -20,21 +31,30 @@ class BaseEvolutionPopulation():
         self.mutation_kwargs = mutation_kwargs
         self.survival_selection_kwargs = survival_selection_kwargs
 
+        # Opt-in fitness memoization, configured by a [fitness_cache] section
+        # e.g., maxsize = 100_000; pass cache=ea.fitness_cache to population evaluation
+        self.fitness_cache = None if fitness_cache is None else FitnessCache(**fitness_cache)
+
+        # Log entries go to self.log as 'name: value' strings and, given a record_path,
+        # to a per-generation records file (see run_records.py). With text_log=False,
+        # only the records are kept, and self.log stays empty.
         self.log = []
-        self.log.append(f'mu: {self.mu}')
-        self.log.append(f'num_children: {self.num_children}')
-        self.log.append(f'mutation rate: {self.mutation_rate}')
-        self.log.append(f'parent selection: {self.parent_selection.__name__ }')
-        self.log.append(f'parent selection kwargs: {self.parent_selection_kwargs}')
-        self.log.append(f'survival selection: {self.survival_selection.__name__ }')
-        self.log.append(f'survival selection kwargs: {self.survival_selection_kwargs}')
-        self.log.append(f'recombination kwargs: {self.recombination_kwargs}')
-        self.log.append(f'mutation kwargs: {self.mutation_kwargs}')
+        self.text_log = text_log
+        self.recorder = None if record_path is None else RunRecorder(record_path)
+        self.log_entry('mu', self.mu)
+        self.log_entry('num_children', self.num_children)
+        self.log_entry('mutation rate', self.mutation_rate)
+        self.log_entry('parent selection', self.parent_selection.__name__ )
+        self.log_entry('parent selection kwargs', self.parent_selection_kwargs)
+        self.log_entry('survival selection', self.survival_selection.__name__ )
+        self.log_entry('survival selection kwargs', self.survival_selection_kwargs)
+        self.log_entry('recombination kwargs', self.recombination_kwargs)
+        self.log_entry('mutation kwargs', self.mutation_kwargs)
 
         self.population = individual_class.initialization(self.mu, **problem, **kwargs)
         self.evaluations = 0
 
-        self.log.append(f'Initial population size: {len(self.population)}')
+        self.log_entry('Initial population size', len(self.population))
 
 
     def generate_children(self):
@@ -71,40 +91,71 @@ class BaseEvolutionPopulation():
                 children[i] = children[i].mutate(**self.mutation_kwargs)
                 mutated_child_count += 1
 
-        self.log.append(f'Number of children: {len(children)}')
-        self.log.append(f'Number of mutations: {mutated_child_count}')
+        # The children now hold the Occupancies they derive from (see linear_genotype.py),
+        # so the population drops its own rather than keeping one per individual
+        for individual in self.population:
+            if getattr(individual, 'occupancy', None) is not None:
+                individual.occupancy = None
+
+        self.log_entry('Number of children', len(children))
+        self.log_entry('Number of mutations', mutated_child_count)
 
         return children
 
 
     def survival(self):
-        self.log.append(f'Pre-survival population size: {len(self.population)}')
+        self.log_entry('Pre-survival population size', len(self.population))
         self.population = self.survival_selection(self.population, self.mu, **self.survival_selection_kwargs)
-        self.log.append(f'Post-survival population size: {len(self.population)}')
+        self.log_entry('Post-survival population size', len(self.population))
+
+
+    def log_entry(self, name, value):
+        if self.text_log:
+            self.log.append(f'{name}: {value}')
+        if self.recorder is not None:
+            self.recorder.add(name, value)
+
+
+    # Ends a generation's records; stats are the names of the entries logged by a stats method
+    def end_generation(self, stats):
+        if self.recorder is not None:
+            self.recorder.end_generation(stats)
+
+
+    def log_cache_stats(self):
+        if self.fitness_cache is not None:
+            self.log_entry('Fitness cache hits', self.fitness_cache.hits)
+            self.log_entry('Fitness cache misses', self.fitness_cache.misses)
 
 
     def log_base_stats(self):
-        self.log.append(f'Evaluations: {self.evaluations}')
-        self.log.append(f'Local best: {max(map(lambda x:x.fitness, self.population))}')
-        self.log.append(f'Local mean: {statistics.mean(map(lambda x:x.fitness, self.population))}')
+        self.log_entry('Evaluations', self.evaluations)
+        self.log_cache_stats()
+        self.log_entry('Local best', max(map(lambda x:x.fitness, self.population)))
+        self.log_entry('Local mean', statistics.mean(map(lambda x:x.fitness, self.population)))
+        self.end_generation(BASE_STATS)
 
 
     def log_penalized_stats(self):
-        self.log.append(f'Evaluations: {self.evaluations}')
-        self.log.append(f'Local best penalized fitness: {max(map(lambda x:x.fitness, self.population))}')
-        self.log.append(f'Local mean penalized fitness: {statistics.mean(map(lambda x:x.fitness, self.population))}')
-        self.log.append(f'Local best base fitness: {max(map(lambda x:x.base_fitness, self.population))}')
-        self.log.append(f'Local mean base fitness: {statistics.mean(map(lambda x:x.base_fitness, self.population))}')
-        self.log.append(f'Number of valid solutions: {[x.violations for x in self.population].count(0)}')
+        self.log_entry('Evaluations', self.evaluations)
+        self.log_cache_stats()
+        self.log_entry('Local best penalized fitness', max(map(lambda x:x.fitness, self.population)))
+        self.log_entry('Local mean penalized fitness', statistics.mean(map(lambda x:x.fitness, self.population)))
+        self.log_entry('Local best base fitness', max(map(lambda x:x.base_fitness, self.population)))
+        self.log_entry('Local mean base fitness', statistics.mean(map(lambda x:x.base_fitness, self.population)))
+        self.log_entry('Number of valid solutions', [x.violations for x in self.population].count(0))
+        self.end_generation(PENALIZED_STATS)
 
 
     def log_multiobjective_stats(self, pareto_front, hypervolume):
-        self.log.append(f'Evaluations: {self.evaluations}')
-        self.log.append(f'Local best length: {max(map(lambda x:x.objectives[0], self.population))}')
-        self.log.append(f'Local mean length: {statistics.mean(map(lambda x:x.objectives[0], self.population))}')
-        self.log.append(f'Local best width: {max(map(lambda x:x.objectives[1], self.population))}')
-        self.log.append(f'Local mean width: {statistics.mean(map(lambda x:x.objectives[1], self.population))}')
-        self.log.append(f'Individuals in the Pareto front: {len(pareto_front)}')
-        self.log.append(f'Local Pareto front mean length: {statistics.mean(map(lambda x:x.objectives[0], pareto_front))}')
-        self.log.append(f'Local Pareto front mean width: {statistics.mean(map(lambda x:x.objectives[1], pareto_front))}')
-        self.log.append(f'Local Pareto front hypervolume: {hypervolume}')
+        self.log_entry('Evaluations', self.evaluations)
+        self.log_cache_stats()
+        self.log_entry('Local best length', max(map(lambda x:x.objectives[0], self.population)))
+        self.log_entry('Local mean length', statistics.mean(map(lambda x:x.objectives[0], self.population)))
+        self.log_entry('Local best width', max(map(lambda x:x.objectives[1], self.population)))
+        self.log_entry('Local mean width', statistics.mean(map(lambda x:x.objectives[1], self.population)))
+        self.log_entry('Individuals in the Pareto front', len(pareto_front))
+        self.log_entry('Local Pareto front mean length', statistics.mean(map(lambda x:x.objectives[0], pareto_front)))
+        self.log_entry('Local Pareto front mean width', statistics.mean(map(lambda x:x.objectives[1], pareto_front)))
+        self.log_entry('Local Pareto front hypervolume', hypervolume)
+        self.end_generation(MULTIOBJECTIVE_STATS)
@@ -0,0 +1,253 @@
+
+# benchmarks.py
+#
+# Benchmarks of the hot paths of a cutting stock run: placement, the fitness functions,
+# nondomination sorting, hypervolumes, variation and selection. Inputs are drawn with a
+# fixed seed at the sizes of a config's EA (by default the 1d config, mu = num_children
+# = 1000), and every repetition re-seeds the random generators, so each run of the
+# suite times exactly the same work.
+#
+# Each benchmark reports its best time per call over --repeats timed batches, the peak
+# memory allocated by one call (tracemalloc) and, where a call evaluates solutions,
+# evaluations per second.
+# Results are compared with a baseline JSON file, and any benchmark more than --tolerance
+# slower or hungrier than its baseline is reported as a regression (exit status 1).
+# Baselines depend on the machine, so record one (--save) on the machine you run on.
+#
+# Examples:
+#   python benchmarks.py --save
+#   python benchmarks.py
+#   python benchmarks.py --only nondomination_sort calculate_hypervolume --profile
+
+import argparse
+import cProfile
+import json
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from pathlib import Path
+from snake_eyes import read_config
+from linear_genotype import LinearGenotype
+from cutting_stock.implementation import place_all
+from cutting_stock.array_implementation import get_engine
+from cutting_stock.fitness_functions import *
+from stock_population_evaluation import *
+from multiobjective import *
+from selection import *
+
+DEFAULT_CONFIG = 'configs/1d/green_crowding_config.txt'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+SEED = 0
+MIN_BATCH_SECONDS = 0.05
+# Slowdowns of less than this many seconds per call are timing noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 1e-4
+
+
+class Individual():
+    def __init__(self, objectives=None, fitness=None):
+        self.objectives = objectives
+        self.fitness = fitness
+
+
+# Each benchmark takes the config and the shared inputs, and returns the function to
+# time and the number of evaluations one call performs (None if it evaluates nothing)
+
+def place_all_benchmark(config, inputs):
+    shapes, bounds = config['problem']['shapes'], config['problem']['bounds']
+    return lambda: [place_all(genes, shapes, bounds) for genes in inputs['genes']], len(inputs['genes'])
+
+
+def engine_place_all_benchmark(config, inputs):
+    engine = get_engine(config['problem']['shapes'], config['problem']['bounds'])
+    return lambda: [engine.place_all(genes) for genes in inputs['genes']], len(inputs['genes'])
+
+
+def fitness_benchmark(fitness_function):
+    def benchmark(config, inputs):
+        return lambda: [fitness_function(genes, **config['problem']) for genes in inputs['genes']], len(inputs['genes'])
+    return benchmark
+
+
+def batched_fitness_benchmark(config, inputs):
+    genes = stack_genes(inputs['population'])
+    return lambda: batched_multiobjective_fitness_function(genes, **config['problem']), len(genes)
+
+
+def nondomination_sort_benchmark(config, inputs):
+    return lambda: nondomination_sort(inputs['objectives']), None
+
+
+def assign_fitnesses_benchmark(config, inputs):
+    return lambda: assign_fitnesses(inputs['objectives'], **config['fitness_kwargs']), None
+
+
+def calculate_hypervolume_benchmark(config, inputs):
+    return lambda: calculate_hypervolume(inputs['front']), None
+
+
+def recombine_mutate_benchmark(config, inputs):
+    population = inputs['population']
+    def variation():
+        for i in range(0, len(population) - 1, 2):
+            population[i].recombine(population[i + 1], **config['recombination_kwargs']).mutate(**config['mutation_kwargs'])
+    return variation, None
+
+
+def parent_selection_benchmark(config, inputs):
+    ea = config['ea']
+    return lambda: ea['parent_selection'](inputs['individuals'][:ea['mu']], 2 * ea['num_children'],
+                                          **config['parent_selection_kwargs']), None
+
+
+def survival_selection_benchmark(config, inputs):
+    ea = config['ea']
+    return lambda: ea['survival_selection'](inputs['individuals'], ea['mu'], **config['survival_selection_kwargs']), None
+
+
+BENCHMARKS = {
+    'place_all': place_all_benchmark,
+    'PlacementEngine.place_all': engine_place_all_benchmark,
+    'base_fitness_function': fitness_benchmark(base_fitness_function),
+    'unconstrained_fitness_function': fitness_benchmark(unconstrained_fitness_function),
+    'multiobjective_fitness_function': fitness_benchmark(multiobjective_fitness_function),
+    'batched_multiobjective_fitness_function': batched_fitness_benchmark,
+    'nondomination_sort': nondomination_sort_benchmark,
+    'assign_fitnesses': assign_fitnesses_benchmark,
+    'calculate_hypervolume': calculate_hypervolume_benchmark,
+    'LinearGenotype.recombine/mutate': recombine_mutate_benchmark,
+    'parent_selection': parent_selection_benchmark,
+    'survival_selection': survival_selection_benchmark
+}
+
+
+# Inputs shared by the benchmarks: a population of mu + num_children random solutions and
+# its genes, and as many individuals with objectives spread over the stock's length and
+# width, as in a run's later generations (nearly all random solutions are invalid), with
+# their Pareto front and fitnesses for the selection operators
+def make_inputs(config):
+    random.seed(SEED)
+    np.random.seed(SEED)
+    ea = config['ea']
+    population = LinearGenotype.initialization(ea['mu'] + ea['num_children'], **config['problem'])
+    (x_min, x_max), (y_min, y_max) = config['problem']['bounds']
+    objectives = [Individual([random.randint(0, x_max - x_min), random.randint(0, y_max - y_min)])
+                  for _ in population]
+    assign_fitnesses(objectives, **config['fitness_kwargs'])
+    return {
+        'population': population,
+        'genes': [individual.genes for individual in population[:ea['num_children']]],
+        'objectives': objectives,
+        'front': [individual for individual in objectives if individual.level == 1],
+        'individuals': [Individual(fitness=individual.fitness) for individual in objectives]
+    }
+
+
+# Best time per call over repeats batches of calls of function, and the peak memory
+# one call allocates. Batches hold enough calls to last at least MIN_BATCH_SECONDS,
+# so that fast functions are not timed at the resolution of the clock.
+def measure(function, repeats):
+    start = time.perf_counter()
+    function()
+    number = max(1, int(MIN_BATCH_SECONDS / max(time.perf_counter() - start, 1e-9)))
+    times = []
+    for _ in range(repeats):
+        random.seed(SEED)
+        np.random.seed(SEED)
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+
+    random.seed(SEED)
+    np.random.seed(SEED)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmarks(config, names, repeats, profile=False):
+    inputs = make_inputs(config)
+    results = dict()
+    for name in names:
+        function, evaluations = BENCHMARKS[name](config, inputs)
+        # One untimed call warms caches (e.g., placement engines) shared with a real run
+        random.seed(SEED)
+        function()
+        seconds, peak = measure(function, repeats)
+        results[name] = {'seconds': seconds, 'peak_bytes': peak,
+                         'evaluations_per_second': None if evaluations is None else evaluations / seconds}
+        if profile:
+            profiler = cProfile.Profile()
+            random.seed(SEED)
+            profiler.runcall(function)
+            print(f'Profile of {name}:')
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    return results
+
+
+# Names of the benchmarks in results whose time or peak memory exceeds the baseline's by
+# more than tolerance (a fraction). Benchmarks missing from the baseline are skipped.
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        seconds = baseline[name]['seconds']
+        if result['seconds'] > max(seconds * (1 + tolerance), seconds + MIN_REGRESSION_SECONDS) \
+                or result['peak_bytes'] > baseline[name]['peak_bytes'] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f'{"benchmark":>40} {"time (ms)":>10} {"baseline":>10} {"peak (MB)":>10} {"evals/s":>10}')
+    for name, result in results.items():
+        reference = f'{1000 * baseline[name]["seconds"]:>10.3f}' if name in baseline else f'{"-":>10}'
+        rate = result['evaluations_per_second']
+        rate = f'{rate:>10.0f}' if rate is not None else f'{"-":>10}'
+        print(f'{name:>40} {1000 * result["seconds"]:>10.3f} {reference} {result["peak_bytes"] / 2**20:>10.2f} {rate}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the cutting stock hot paths')
+    parser.add_argument('--config', default=DEFAULT_CONFIG, help='config whose EA sizes are benchmarked')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file to compare with')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--repeats', type=int, default=5, help='timed batches of calls per benchmark')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--profile', action='store_true', help='print a cProfile of each benchmark')
+    args = parser.parse_args()
+
+    config = read_config(args.config, globals(), locals())
+    results = run_benchmarks(config, args.only or list(BENCHMARKS), args.repeats, args.profile)
+
+    baseline_path = Path(args.baseline)
+    baseline = dict()
+    if baseline_path.exists():
+        stored = json.loads(baseline_path.read_text())
+        if stored['config'] == args.config:
+            baseline = stored['results']
+        else:
+            print(f'Ignoring {baseline_path}, which was recorded with {stored["config"]}')
+    print_results(results, baseline)
+    if args.save:
+        # Benchmarks not run this time keep their previous baseline
+        baseline.update(results)
+        baseline_path.write_text(json.dumps({'config': args.config, 'results': baseline}, indent=2))
+        print(f'Saved baseline to {baseline_path}')
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f'Regression: {name} is more than {100 * args.tolerance:.0f}% slower or larger than its baseline')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
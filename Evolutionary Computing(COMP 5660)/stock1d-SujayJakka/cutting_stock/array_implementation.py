@@ -0,0 +1,228 @@
+"""
+cutting_stock/array_implementation.py
+
+Array-backed counterpart to cutting_stock/implementation.py.
+
+The functions in implementation.py rotate every shape in Python and merge the
+results cell by cell into a dict of lists. That is easy to follow, but it is
+the entire cost of every fitness evaluation. This module precomputes all four
+rotations of every shape once as integer arrays, then maps a solution to a flat
+array of occupied cells and rasterizes it into an occupancy-count grid. Every
+quantity the fitness functions need is an array reduction over those two
+structures, and every result is identical to its dict-based counterpart.
+"""
+
+import numpy as np
+from functools import cache
+import cutting_stock.implementation as impl
+
+
+"""Returns the (cached) placement engine for a problem.
+
+Shapes and bounds come straight from the config, so they are converted to
+hashable tuples before the lookup. Converting them costs about as much as
+evaluating a solution, and every call during a run passes the very same config
+objects, so the most recent lookup is remembered by identity.
+
+@param shapes: indexable collection of shapes
+@param bounds: bounds of the problem
+@return: PlacementEngine for these shapes and bounds
+"""
+def get_engine(shapes, bounds):
+    global _last_lookup
+    if _last_lookup[0] is shapes and _last_lookup[1] is bounds:
+        return _last_lookup[2]
+    engine = _cached_engine(tuple(tuple(tuple(cell) for cell in shape) for shape in shapes),
+                            tuple(tuple(bound) for bound in bounds))
+    _last_lookup = (shapes, bounds, engine)
+    return engine
+
+
+_last_lookup = (None, None, None)
+
+
+@cache
+def _cached_engine(shapes, bounds):
+    return PlacementEngine(shapes, bounds)
+
+
+"""Precomputed rotation tables and grid geometry for one problem.
+
+@param shapes: indexable collection of shapes
+@param bounds: bounds of the problem
+"""
+class PlacementEngine():
+    def __init__(self, shapes, bounds):
+        assert len(bounds) == 2, "Placement engine only supports 2-dimensional problems"
+        self.bounds = bounds
+        self.num_shapes = len(shapes)
+
+        # place_shape returns a set, so a cell repeated within a shape is only placed once
+        unique_shapes = [sorted(set(tuple(cell) for cell in shape)) for shape in shapes]
+        self.shape_ids = np.concatenate([np.full(len(shape), i, dtype=np.int64)
+                                         for i, shape in enumerate(unique_shapes)])
+        cells = np.array([cell for shape in unique_shapes for cell in shape], dtype=np.int64)
+
+        # Same rotations as impl.place_shape, indexed as rotations[r, cell]
+        x, y = cells[:, 0], cells[:, 1]
+        self.rotations = np.stack([np.stack([x, y], axis=-1),
+                                   np.stack([y, -x], axis=-1),
+                                   np.stack([-x, -y], axis=-1),
+                                   np.stack([-y, x], axis=-1)])
+        self.cell_index = np.arange(len(cells))
+
+        # Translations are always in-bounds, so padding the bounds by the largest
+        # offset (plus one for neighbor lookups) guarantees every cell fits in the grid
+        self.padding = int(np.abs(cells).max()) + 1
+        self.origin = np.array([bounds[0][0] - self.padding, bounds[1][0] - self.padding])
+        self.grid_shape = (bounds[0][1] - bounds[0][0] + 2 * self.padding,
+                           bounds[1][1] - bounds[1][0] + 2 * self.padding)
+
+
+    """Applies a solution to the problem, i.e., the phenotype mapping.
+
+    Unlike impl.place_all, this returns every placed cell rather than a dict;
+    cell i belongs to shape self.shape_ids[i].
+
+    @param solution: indexable collection of placements defining shape positions
+    @return: int array of shape (num_cells, 2) containing placed cell coordinates
+    """
+    def place_all(self, solution):
+        solution = np.asarray(solution, dtype=np.int64)
+        assert solution.shape == (self.num_shapes, 3), "Solution must have the same length as shapes"
+        return self.place_population(solution[np.newaxis])[0]
+
+
+    """Applies every solution in a population at once.
+
+    @param solutions: array-like of shape (pop, num_shapes, 3), e.g., every individual's genes stacked
+    @return: int array of shape (pop, num_cells, 2) containing placed cell coordinates
+    """
+    def place_population(self, solutions):
+        solutions = np.asarray(solutions, dtype=np.int64)
+        assert solutions.ndim == 3 and solutions.shape[1:] == (self.num_shapes, 3),\
+            "Solutions must have the same length as shapes"
+        assert np.all((solutions[..., 2] >= 0) & (solutions[..., 2] <= 3)), "Rotation must be 0, 1, 2, or 3"
+        assert self.translations_in_bounds(solutions), "Translation is out of bounds"
+
+        placements = solutions[:, self.shape_ids]
+        return self.rotations[placements[..., 2], self.cell_index] + placements[..., :2]
+
+
+    """Checks that every translation in a solution falls within the problem bounds.
+
+    @param solution: array of placements, with placements along the last axis
+    @return: whether all translations are in-bounds
+    """
+    def translations_in_bounds(self, solution):
+        return bool(np.all((self.bounds[0][0] <= solution[..., 0]) & (solution[..., 0] < self.bounds[0][1]) &
+                           (self.bounds[1][0] <= solution[..., 1]) & (solution[..., 1] < self.bounds[1][1])))
+
+
+    """Rasterizes placed cells into a grid counting the shapes occupying each cell.
+
+    @param cells: array of cells as output by place_all()
+    @return: int array of shape self.grid_shape
+    """
+    def occupancy(self, cells):
+        return np.bincount(self._flat_indices(cells),
+                           minlength=self.grid_shape[0] * self.grid_shape[1]).reshape(self.grid_shape)
+
+
+    def _flat_indices(self, cells):
+        local = cells - self.origin
+        return local[..., 0] * self.grid_shape[1] + local[..., 1]
+
+
+    # All reductions below accept either a single solution's cells, shape (num_cells, 2),
+    # returning an int, or a population's cells, shape (pop, num_cells, 2), returning an int array.
+
+
+    """Calculates the extent of occupied cells along an axis.
+
+    @param cells: array of cells as output by place_all() or place_population()
+    @param y: if True, counts extent along the y-axis, else along the x-axis
+    @return: extent of occupied cells along the given axis
+    """
+    def get_extent(self, cells, y=False):
+        values = cells[..., int(bool(y))]
+        return _unwrap(1 + values.max(axis=-1) - values.min(axis=-1))
+
+
+    """Counts the number of overlap violations.
+
+    Every placed cell beyond the first in an occupied grid cell is one violation,
+    so this is the number of placed cells minus the number of distinct cells.
+
+    @param cells: array of cells as output by place_all() or place_population()
+    @return: number of overlap violations
+    """
+    def count_overlaps(self, cells):
+        flat = np.sort(self._flat_indices(cells), axis=-1)
+        distinct = 1 + np.count_nonzero(np.diff(flat, axis=-1), axis=-1)
+        return _unwrap(cells.shape[-2] - distinct)
+
+
+    """Counts the number of out-of-bounds violations.
+
+    For cells occupied by multiple shapes, each shape counts as a separate violation.
+
+    @param cells: array of cells as output by place_all() or place_population()
+    @return: the number of out-of-bounds cells
+    """
+    def count_out_of_bounds(self, cells):
+        x, y = cells[..., 0], cells[..., 1]
+        outside = (x < self.bounds[0][0]) | (x >= self.bounds[0][1]) |\
+                  (y < self.bounds[1][0]) | (y >= self.bounds[1][1])
+        return _unwrap(np.count_nonzero(outside, axis=-1))
+
+
+    """Counts edges between occupied cells that are shared with a different shape.
+
+    Matches impl.count_shared_edges: for each occupied cell and its +x and +y neighbors,
+    an edge counts if the neighbor holds any shape the cell does not. Each grid cell
+    stores the set of its shapes as a bitmask, so that check is (neighbor & ~cell) != 0.
+    Populations are rasterized in chunks to bound the size of the mask grids.
+
+    @param cells: array of cells as output by place_all() or place_population()
+    @return: number of shared edges
+    """
+    def count_shared_edges(self, cells):
+        if cells.ndim == 2:
+            return _unwrap(self.count_shared_edges(cells[np.newaxis])[0])
+
+        if self.num_shapes > 64:
+            # Bitmasks no longer fit in a machine word; use the reference implementation
+            counts = np.zeros(len(cells), dtype=np.int64)
+            for i, solution_cells in enumerate(cells):
+                occupied = dict()
+                for cell, shape in zip(map(tuple, solution_cells.tolist()), self.shape_ids.tolist()):
+                    occupied.setdefault(cell, []).append(shape)
+                counts[i] = impl.count_shared_edges(occupied)
+            return counts
+
+        grid_size = self.grid_shape[0] * self.grid_shape[1]
+        chunk = max(1, MAX_CHUNK_CELLS // grid_size)
+        bits = np.left_shift(np.uint64(1), self.shape_ids.astype(np.uint64))
+        counts = np.zeros(len(cells), dtype=np.int64)
+        for start in range(0, len(cells), chunk):
+            flat = self._flat_indices(cells[start:start + chunk])
+            flat += (np.arange(len(flat)) * grid_size)[:, np.newaxis]
+            masks = np.zeros(len(flat) * grid_size, dtype=np.uint64)
+            np.bitwise_or.at(masks, flat.ravel(), np.broadcast_to(bits, flat.shape).ravel())
+            masks = masks.reshape(len(flat), *self.grid_shape)
+
+            for here, there in ((masks[:, :-1, :], masks[:, 1:, :]), (masks[:, :, :-1], masks[:, :, 1:])):
+                counts[start:start + chunk] += np.count_nonzero((here != 0) & ((there & ~here) != 0), axis=(1, 2))
+        return counts
+
+
+# Upper bound on grid cells rasterized at once when counting shared edges for a population
+MAX_CHUNK_CELLS = 1 << 22
+
+
+def _unwrap(values):
+    # Plain ints for a single solution, arrays for a population
+    if np.ndim(values) == 0:
+        return int(values)
+    return values
@@ -2,7 +2,9 @@
 # cutting_stock/fitness_functions.py
 
 import cutting_stock.implementation as impl
+from cutting_stock.array_implementation import get_engine
 from functools import partial
+import numpy as np
 
 '''Base fitness function for Assignments 1a and 1b.
 
@@ -21,9 +23,10 @@ Returns a dictionary containing the solution's fitness.
 @return: dict containing values explained above
 '''
 def base_fitness_function(solution, shapes, bounds, failure_fitness, minimize_area, **kwargs):
-    cells = impl.place_all(solution, shapes, bounds)
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_all(solution)
 
-    if impl.count_overlaps(cells) or impl.count_out_of_bounds(cells, bounds):
+    if engine.count_overlaps(cells) or engine.count_out_of_bounds(cells):
         # Violations are not allowed, and all solutions with any violations are equally bad.
         fitness = failure_fitness
 
@@ -31,11 +34,11 @@ def base_fitness_function(solution, shapes, bounds, failure_fitness, minimize_ar
         if not minimize_area:
             # Fitness is the total length minus the used length
             available = bounds[0][1] - bounds[0][0]
-            fitness = available - impl.get_extent(cells, False)
+            fitness = available - engine.get_extent(cells, False)
         else:
             # Fitness is the total area minus the used area
             available_area = (bounds[0][1] - bounds[0][0]) * (bounds[1][1] - bounds[1][0])
-            used_area = impl.get_extent(cells, False) * impl.get_extent(cells, True)
+            used_area = engine.get_extent(cells, False) * engine.get_extent(cells, True)
             fitness = available_area - used_area
 
     return {
@@ -63,21 +66,22 @@ It serves as a quantification of how badly a solution violated the constraints.
 @return: dict containing values explained above
 '''
 def unconstrained_fitness_function(solution, shapes, bounds, failure_fitness, minimize_area, **kwargs):
-    cells = impl.place_all(solution, shapes, bounds)
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_all(solution)
 
     # Unconstrained fitness ignores all violations
     if not minimize_area:
         # Fitness is the total length minus the used length
         available = bounds[0][1] - bounds[0][0]
-        unconstrained_fitness = available - impl.get_extent(cells, False)
+        unconstrained_fitness = available - engine.get_extent(cells, False)
     else:
         # Fitness is the total area minus the used area
         available_area = (bounds[0][1] - bounds[0][0]) * (bounds[1][1] - bounds[1][0])
-        used_area = impl.get_extent(cells, False) * impl.get_extent(cells, True)
+        used_area = engine.get_extent(cells, False) * engine.get_extent(cells, True)
         unconstrained_fitness = available_area - used_area
 
     # Count all violations
-    violations = impl.count_overlaps(cells) + impl.count_out_of_bounds(cells, bounds)
+    violations = engine.count_overlaps(cells) + engine.count_out_of_bounds(cells)
 
     if violations:
         # All solutions with any violations have equally bad base fitness.
@@ -105,9 +109,10 @@ but returns two fitness values: one minimizing length, the other minimizing widt
 @return: dict containing values explained above
 '''
 def multiobjective_fitness_function(solution, shapes, bounds, failure_fitness, shared_edges=None, **kwargs):
-    cells = impl.place_all(solution, shapes, bounds)
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_all(solution)
 
-    invalid = impl.count_overlaps(cells) or impl.count_out_of_bounds(cells, bounds)
+    invalid = engine.count_overlaps(cells) or engine.count_out_of_bounds(cells)
 
     if invalid:
         # All solutions with any violations are equally bad.
@@ -116,8 +121,8 @@ def multiobjective_fitness_function(solution, shapes, bounds, failure_fitness, s
     else:
         length_available = bounds[0][1] - bounds[0][0]
         width_available = bounds[1][1] - bounds[1][0]
-        length = length_available - impl.get_extent(cells, False)
-        width = width_available - impl.get_extent(cells, True)
+        length = length_available - engine.get_extent(cells, False)
+        width = width_available - engine.get_extent(cells, True)
 
     to_return = {
         'length': length,
@@ -128,6 +133,178 @@ def multiobjective_fitness_function(solution, shapes, bounds, failure_fitness, s
         if invalid:
             to_return['edges'] = failure_fitness
         else:
-            to_return['edges'] = -impl.count_shared_edges(cells)
+            to_return['edges'] = -engine.count_shared_edges(cells)
 
     return to_return
+
+
+'''Batched counterpart of base_fitness_function.
+
+Evaluates every solution in a population with a handful of array passes.
+Results are identical to calling base_fitness_function on each solution.
+
+@param solutions: array-like of shape (pop, len(shapes), 3), e.g., every individual's genes stacked
+@param shapes: indexable collection of shapes
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param minimize_area: if True, fitness is calculated using the solution's bounding box area
+@return: dict containing a list of values per key, one value per solution
+'''
+def batched_base_fitness_function(solutions, shapes, bounds, failure_fitness, minimize_area, **kwargs):
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_population(solutions)
+
+    invalid = (engine.count_overlaps(cells) > 0) | (engine.count_out_of_bounds(cells) > 0)
+    fitness = np.where(invalid, failure_fitness, _unconstrained_fitness(engine, cells, bounds, minimize_area))
+
+    return {
+        'fitness': fitness.tolist()
+    }
+
+
+'''Batched counterpart of unconstrained_fitness_function.
+
+@param solutions: array-like of shape (pop, len(shapes), 3), e.g., every individual's genes stacked
+@param shapes: indexable collection of shapes
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param minimize_area: if True, fitness is calculated using the solution's bounding box area
+@return: dict containing a list of values per key, one value per solution
+'''
+def batched_unconstrained_fitness_function(solutions, shapes, bounds, failure_fitness, minimize_area, **kwargs):
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_population(solutions)
+
+    unconstrained_fitness = _unconstrained_fitness(engine, cells, bounds, minimize_area)
+    violations = engine.count_overlaps(cells) + engine.count_out_of_bounds(cells)
+    base_fitness = np.where(violations > 0, failure_fitness, unconstrained_fitness)
+
+    return {
+        'base fitness': base_fitness.tolist(),
+        'unconstrained fitness': unconstrained_fitness.tolist(),
+        'violations': violations.tolist()
+    }
+
+
+'''Batched counterpart of multiobjective_fitness_function.
+
+Shared edges are only counted for valid solutions, as invalid ones get failure_fitness regardless.
+
+@param solutions: array-like of shape (pop, len(shapes), 3), e.g., every individual's genes stacked
+@param shapes: indexable collection of shapes
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param shared_edges: if True, adds a third objective (explained in the notebook/document)
+@return: dict containing a list of values per key, one value per solution
+'''
+def batched_multiobjective_fitness_function(solutions, shapes, bounds, failure_fitness, shared_edges=None, **kwargs):
+    engine = get_engine(shapes, bounds)
+    cells = engine.place_population(solutions)
+
+    invalid = (engine.count_overlaps(cells) > 0) | (engine.count_out_of_bounds(cells) > 0)
+    length_available = bounds[0][1] - bounds[0][0]
+    width_available = bounds[1][1] - bounds[1][0]
+    length = np.where(invalid, failure_fitness, length_available - engine.get_extent(cells, False))
+    width = np.where(invalid, failure_fitness, width_available - engine.get_extent(cells, True))
+
+    to_return = {
+        'length': length.tolist(),
+        'width': width.tolist()
+    }
+
+    if shared_edges:
+        edges = np.full(len(cells), failure_fitness)
+        edges[~invalid] = -engine.count_shared_edges(cells[~invalid])
+        to_return['edges'] = edges.tolist()
+
+    return to_return
+
+
+'''Incremental counterpart of base_fitness_function.
+
+Takes the solution's Occupancy (see cutting_stock/occupancy.py) rather than the solution itself.
+Results are identical to calling base_fitness_function on the solution.
+
+@param occupancy: Occupancy of the solution
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param minimize_area: if True, fitness is calculated using the solution's bounding box area
+@return: dict containing values explained above
+'''
+def occupancy_base_fitness_function(occupancy, bounds, failure_fitness, minimize_area, **kwargs):
+    if occupancy.count_overlaps() or occupancy.count_out_of_bounds():
+        fitness = failure_fitness
+    else:
+        fitness = _occupancy_unconstrained_fitness(occupancy, bounds, minimize_area)
+
+    return {
+        'fitness': fitness
+    }
+
+
+'''Incremental counterpart of unconstrained_fitness_function.
+
+@param occupancy: Occupancy of the solution
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param minimize_area: if True, fitness is calculated using the solution's bounding box area
+@return: dict containing values explained above
+'''
+def occupancy_unconstrained_fitness_function(occupancy, bounds, failure_fitness, minimize_area, **kwargs):
+    unconstrained_fitness = _occupancy_unconstrained_fitness(occupancy, bounds, minimize_area)
+    violations = occupancy.count_overlaps() + occupancy.count_out_of_bounds()
+
+    return {
+        'base fitness': failure_fitness if violations else unconstrained_fitness,
+        'unconstrained fitness': unconstrained_fitness,
+        'violations': violations
+    }
+
+
+'''Incremental counterpart of multiobjective_fitness_function.
+
+@param occupancy: Occupancy of the solution
+@param bounds: bounds of the problem
+@param failure_fitness: fitness to assign to solutions that violate constraints
+@param shared_edges: if True, adds a third objective (explained in the notebook/document)
+@return: dict containing values explained above
+'''
+def occupancy_multiobjective_fitness_function(occupancy, bounds, failure_fitness, shared_edges=None, **kwargs):
+    invalid = occupancy.count_overlaps() or occupancy.count_out_of_bounds()
+
+    if invalid:
+        length = failure_fitness
+        width = failure_fitness
+    else:
+        length = bounds[0][1] - bounds[0][0] - occupancy.get_extent(False)
+        width = bounds[1][1] - bounds[1][0] - occupancy.get_extent(True)
+
+    to_return = {
+        'length': length,
+        'width': width
+    }
+
+    if shared_edges:
+        to_return['edges'] = failure_fitness if invalid else -occupancy.count_shared_edges()
+
+    return to_return
+
+
+def _occupancy_unconstrained_fitness(occupancy, bounds, minimize_area):
+    if not minimize_area:
+        return bounds[0][1] - bounds[0][0] - occupancy.get_extent(False)
+    else:
+        available_area = (bounds[0][1] - bounds[0][0]) * (bounds[1][1] - bounds[1][0])
+        return available_area - occupancy.get_extent(False) * occupancy.get_extent(True)
+
+
+# Fitness ignoring all violations, shared by the batched fitness functions
+def _unconstrained_fitness(engine, cells, bounds, minimize_area):
+    if not minimize_area:
+        # Fitness is the total length minus the used length
+        available = bounds[0][1] - bounds[0][0]
+        return available - engine.get_extent(cells, False)
+    else:
+        # Fitness is the total area minus the used area
+        available_area = (bounds[0][1] - bounds[0][0]) * (bounds[1][1] - bounds[1][0])
+        return available_area - engine.get_extent(cells, False) * engine.get_extent(cells, True)
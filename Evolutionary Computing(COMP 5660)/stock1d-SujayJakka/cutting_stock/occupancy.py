@@ -0,0 +1,243 @@
+"""
+cutting_stock/occupancy.py
+
+Persistent occupancy structure for incremental fitness evaluation.
+
+Mutation usually moves only a few shapes, and a recombined child shares most
+placements with its first parent, yet a from-scratch evaluation maps every
+shape again. An Occupancy records which shapes occupy each cell of a solution,
+plus each shape's bounding box and out-of-bounds count. Deriving a child's
+Occupancy from its parent's removes and re-adds only the shapes whose
+placements changed, updating violations, extent and shared edges as it goes.
+The parent's Occupancy is never modified, so it stays valid for its other children.
+
+Every value matches cutting_stock/implementation.py exactly.
+"""
+
+from functools import cache
+from cutting_stock.array_implementation import get_engine
+
+
+"""Returns the Occupancy of a solution, derived from parent when possible.
+
+@param solution: indexable collection of placements defining shape positions
+@param shapes: indexable collection of shapes, of the same length as solution
+@param bounds: bounds of the problem
+@param parent: Occupancy of a similar solution to the same problem, e.g., a parent's, or None
+@return: Occupancy of solution
+"""
+def get_occupancy(solution, shapes, bounds, parent=None):
+    tables = _cached_tables(get_engine(shapes, bounds))
+    if parent is not None and parent.tables is tables:
+        return parent.derive(solution)
+    return Occupancy(tables, solution)
+
+
+@cache
+def _cached_tables(engine):
+    return OccupancyTables(engine)
+
+
+"""Per-shape, per-rotation cell offsets in the flattened grid of a PlacementEngine.
+
+@param engine: PlacementEngine of the problem
+"""
+class OccupancyTables():
+    def __init__(self, engine):
+        self.bounds = engine.bounds
+        self.num_shapes = engine.num_shapes
+        self.num_cells = len(engine.shape_ids)
+        self.stride = engine.grid_shape[1]
+
+        # A cell's flat index is (x - origin x) * stride + (y - origin y),
+        # so its +x neighbor is at index + stride and its +y neighbor at index + 1
+        self.origin_index = int(engine.origin[0]) * self.stride + int(engine.origin[1])
+
+        self.offsets = []
+        self.flat_offsets = []
+        self.boxes = []
+        shape_ids = engine.shape_ids.tolist()
+        for rotation in engine.rotations.tolist():
+            offsets = [[] for _ in range(self.num_shapes)]
+            for shape, offset in zip(shape_ids, rotation):
+                offsets[shape].append(tuple(offset))
+            self.offsets.append(offsets)
+            self.flat_offsets.append([[dx * self.stride + dy for dx, dy in shape] for shape in offsets])
+            self.boxes.append([(min(dx for dx, _ in shape), max(dx for dx, _ in shape),
+                                min(dy for _, dy in shape), max(dy for _, dy in shape)) for shape in offsets])
+
+
+    # Tables are never modified, so copies of an individual share them and can still derive from each other
+    def __deepcopy__(self, memo):
+        return self
+
+
+"""Cells, bounding boxes and out-of-bounds counts of one placed solution.
+
+Cells are kept as a dict from flat grid index to a bitmask of the shapes occupying
+the cell. Shared edges are counted the first time they are needed and then kept
+up to date by derive, so problems without that objective never pay for them.
+
+@param tables: OccupancyTables of the problem
+@param solution: indexable collection of placements defining shape positions
+"""
+class Occupancy():
+    def __init__(self, tables, solution=None):
+        self.tables = tables
+        self.solution = []
+        self.masks = dict()
+        self.boxes = [None] * tables.num_shapes
+        self.out_of_bounds = [0] * tables.num_shapes
+        self.edges = None
+
+        if solution is not None:
+            solution = _as_placements(solution, tables)
+            for i, placement in enumerate(solution):
+                self.solution.append(placement)
+                self._add(i)
+
+
+    """Returns the Occupancy of a new solution, leaving this one unchanged.
+
+    Shapes whose placements differ are removed and re-added. If most shapes moved,
+    building from scratch is cheaper, and that is done instead.
+
+    @param solution: indexable collection of placements defining shape positions
+    @return: Occupancy of solution
+    """
+    def derive(self, solution):
+        solution = _as_placements(solution, self.tables)
+        moved = [i for i in range(self.tables.num_shapes) if solution[i] != self.solution[i]]
+        if 2 * len(moved) > self.tables.num_shapes:
+            return Occupancy(self.tables, solution)
+
+        child = Occupancy.__new__(Occupancy)
+        child.tables = self.tables
+        child.solution = list(self.solution)
+        child.masks = self.masks.copy()
+        child.boxes = list(self.boxes)
+        child.out_of_bounds = list(self.out_of_bounds)
+        child.edges = self.edges
+        if not moved:
+            return child
+
+        if child.edges is not None:
+            # Only edges touching a cell of a moved shape can change
+            touched = set()
+            for i in moved:
+                touched.update(child._cells(i, self.solution[i]))
+                touched.update(child._cells(i, solution[i]))
+            pairs = child._edge_pairs(touched)
+            child.edges -= child._count_edges(pairs)
+
+        for i in moved:
+            child._remove(i)
+            child.solution[i] = solution[i]
+            child._add(i)
+
+        if child.edges is not None:
+            child.edges += child._count_edges(pairs)
+        return child
+
+
+    def _cells(self, i, placement):
+        x, y, r = placement
+        base = x * self.tables.stride + y - self.tables.origin_index
+        return [base + offset for offset in self.tables.flat_offsets[r][i]]
+
+
+    def _add(self, i):
+        x, y, r = self.solution[i]
+        bit = 1 << i
+        masks = self.masks
+        for cell in self._cells(i, self.solution[i]):
+            masks[cell] = masks.get(cell, 0) | bit
+
+        min_dx, max_dx, min_dy, max_dy = self.tables.boxes[r][i]
+        self.boxes[i] = (x + min_dx, x + max_dx, y + min_dy, y + max_dy)
+
+        (x_low, x_high), (y_low, y_high) = self.tables.bounds
+        if x_low <= x + min_dx and x + max_dx < x_high and y_low <= y + min_dy and y + max_dy < y_high:
+            self.out_of_bounds[i] = 0
+        else:
+            self.out_of_bounds[i] = sum(not (x_low <= x + dx < x_high and y_low <= y + dy < y_high)
+                                        for dx, dy in self.tables.offsets[r][i])
+
+
+    def _remove(self, i):
+        bit = 1 << i
+        masks = self.masks
+        for cell in self._cells(i, self.solution[i]):
+            mask = masks[cell] & ~bit
+            if mask:
+                masks[cell] = mask
+            else:
+                del masks[cell]
+
+
+    def _edge_pairs(self, cells):
+        stride = self.tables.stride
+        pairs = set()
+        for cell in cells:
+            pairs.update(((cell, cell + stride), (cell, cell + 1), (cell - stride, cell), (cell - 1, cell)))
+        return pairs
+
+
+    # An edge counts if both cells are occupied and the second holds a shape the first does not
+    def _count_edges(self, pairs):
+        masks = self.masks
+        count = 0
+        for here, there in pairs:
+            if here in masks and there in masks and masks[there] & ~masks[here]:
+                count += 1
+        return count
+
+
+    """Counts the number of overlap violations, as in impl.count_overlaps.
+
+    @return: number of overlap violations
+    """
+    def count_overlaps(self):
+        return self.tables.num_cells - len(self.masks)
+
+
+    """Counts the number of out-of-bounds violations, as in impl.count_out_of_bounds.
+
+    @return: the number of out-of-bounds cells
+    """
+    def count_out_of_bounds(self):
+        return sum(self.out_of_bounds)
+
+
+    """Calculates the extent of occupied cells along an axis, as in impl.get_extent.
+
+    @param y: if True, counts extent along the y-axis, else along the x-axis
+    @return: extent of occupied cells along the given axis
+    """
+    def get_extent(self, y=False):
+        low, high = (2, 3) if y else (0, 1)
+        return 1 + max(box[high] for box in self.boxes) - min(box[low] for box in self.boxes)
+
+
+    """Counts edges between occupied cells that are shared with a different shape,
+    as in impl.count_shared_edges.
+
+    @return: number of shared edges
+    """
+    def count_shared_edges(self):
+        if self.edges is None:
+            stride = self.tables.stride
+            self.edges = self._count_edges([pair for cell in self.masks
+                                            for pair in ((cell, cell + stride), (cell, cell + 1))])
+        return self.edges
+
+
+# Normalizes a solution to a list of placement tuples, with the same checks as impl.place_all
+def _as_placements(solution, tables):
+    assert len(solution) == tables.num_shapes, "Solution must have the same length as shapes"
+    placements = [tuple(placement) for placement in solution]
+    (x_low, x_high), (y_low, y_high) = tables.bounds
+    for x, y, r in placements:
+        assert x_low <= x < x_high and y_low <= y < y_high, "Translation is out of bounds"
+        assert r in (0, 1, 2, 3), "Rotation must be 0, 1, 2, or 3"
+    return placements
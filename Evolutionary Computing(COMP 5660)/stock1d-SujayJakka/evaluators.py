@@ -0,0 +1,158 @@
+
+# evaluators.py
+
+import math
+import random
+import multiprocessing
+import concurrent.futures
+
+# Pluggable fitness evaluation backends for population evaluation functions.
+#
+# An evaluator is built once per run with the problem kwargs (shapes and bounds,
+# game settings and map, ...). Parallel backends hand those to each worker process
+# exactly once, in the pool initializer, so they stay resident for the whole run.
+# Each generation only ships serialized genotypes, in chunks, and receives one
+# fitness dict per individual back, in population order.
+#
+# Fitness functions are called as fitness_function(individual, **problem), where
+# individual has been rebuilt from its serialization. They must be picklable,
+# i.e., module-level functions or functools.partial objects wrapping them.
+#
+# By default (seeded=True), the parent process draws one seed per individual from the
+# global random module and each evaluation reseeds with its own seed before running.
+# Stochastic fitness functions (such as GPac games) then produce the same results
+# under a fixed seed regardless of backend, worker count or chunk size; unseeded
+# pool workers would draw from random states reseeded from OS entropy after fork.
+# Callers may instead pass their own seeds, one per individual, to evaluate.
+# Only deterministic fitness functions may use seeded=False, which leaves the
+# caller's random stream untouched.
+
+
+# Creates an evaluator for individual_class genotypes on the given backend:
+# 'serial', 'multiprocessing' or 'futures'.
+def make_evaluator(individual_class, backend='serial', processes=None,
+                   chunksize=None, seeded=True, **problem):
+    backends = {
+        'serial': SerialEvaluator,
+        'multiprocessing': MultiprocessingEvaluator,
+        'futures': FuturesEvaluator
+    }
+    assert backend.casefold() in backends, f'Unknown evaluation backend {backend}; expected one of {set(backends)}'
+    return backends[backend.casefold()](individual_class, processes=processes,
+                                        chunksize=chunksize, seeded=seeded, **problem)
+
+
+class SerialEvaluator():
+    def __init__(self, individual_class, processes=None, chunksize=None, seeded=True, **problem):
+        self.individual_class = individual_class
+        self.processes = processes or 1
+        self.chunksize = chunksize
+        self.seeded = seeded
+        self.problem = problem
+
+
+    # Evaluates a population, returning a list of fitness dicts in population order.
+    # Any kwargs already held as resident problem state are not shipped again.
+    def evaluate(self, population, fitness_function, seeds=None, **kwargs):
+        if not population:
+            return []
+        extra_kwargs = {key: val for key, val in kwargs.items() if key not in self.problem}
+        if seeds is not None:
+            assert len(seeds) == len(population), 'Expected one seed per individual'
+        elif self.seeded:
+            seeds = [random.getrandbits(64) for _ in range(len(population))]
+        else:
+            seeds = [None] * len(population)
+
+        jobs = [(fitness_function, extra_kwargs, chunk) for chunk in
+                self.make_chunks([(individual.serialize(), seed) for individual, seed in zip(population, seeds)])]
+
+        outputs = []
+        for chunk_outputs in self.map_chunks(jobs):
+            outputs.extend(chunk_outputs)
+        return outputs
+
+
+    def make_chunks(self, items):
+        chunksize = self.chunksize or max(1, math.ceil(len(items) / (4 * self.processes)))
+        return [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+
+    def map_chunks(self, jobs):
+        # Evaluate in this process, without disturbing the caller's random state
+        state = random.getstate()
+        try:
+            return [_run_chunk(self.individual_class, self.problem, *job) for job in jobs]
+        finally:
+            random.setstate(state)
+
+
+    def close(self):
+        pass
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MultiprocessingEvaluator(SerialEvaluator):
+    def __init__(self, individual_class, processes=None, chunksize=None, seeded=True, **problem):
+        super().__init__(individual_class, processes, chunksize, seeded, **problem)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                         initargs=(individual_class, problem))
+
+
+    def map_chunks(self, jobs):
+        return self.pool.starmap(_evaluate_chunk, jobs)
+
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+class FuturesEvaluator(SerialEvaluator):
+    def __init__(self, individual_class, processes=None, chunksize=None, seeded=True, **problem):
+        super().__init__(individual_class, processes, chunksize, seeded, **problem)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                                               initargs=(individual_class, problem))
+
+
+    def map_chunks(self, jobs):
+        return self.executor.map(_evaluate_chunk, *zip(*jobs))
+
+
+    def close(self):
+        self.executor.shutdown()
+
+
+# Problem state resident in each worker process, set once by the pool initializer
+_worker_individual_class = None
+_worker_problem = None
+
+
+def _init_worker(individual_class, problem):
+    global _worker_individual_class, _worker_problem
+    _worker_individual_class = individual_class
+    _worker_problem = problem
+
+
+def _evaluate_chunk(fitness_function, extra_kwargs, chunk):
+    return _run_chunk(_worker_individual_class, _worker_problem, fitness_function, extra_kwargs, chunk)
+
+
+def _run_chunk(individual_class, problem, fitness_function, extra_kwargs, chunk):
+    outputs = []
+    for serialization, seed in chunk:
+        individual = individual_class()
+        individual.deserialize(serialization)
+        if seed is not None:
+            random.seed(seed)
+        outputs.append(fitness_function(individual, **problem, **extra_kwargs))
+    return outputs
@@ -0,0 +1,312 @@
+
+# experiment_runner.py
+#
+# Command-line driver for multi-run cutting stock experiments.
+# Runs are fanned out across processes and each run's log, best solution(s)
+# and histogram data are written to a ResultStore as soon as the run finishes.
+# Re-running the same command skips every run that already completed,
+# so an interrupted experiment resumes where it left off.
+#
+# Example:
+#   python experiment_runner.py configs/1c/green_config.txt --kind constraint --runs 30 --evaluations 100000
+#
+# With --records, runs keep per-generation records (records.csv, see run_records.py)
+# instead of a text log, and are analyzed from them.
+#
+# With --islands K, each run is an island-model run (see island_model.py) over K processes,
+# exchanging migrants every --migration-interval generations; runs are then done one at a time.
+#   python experiment_runner.py configs/1c/green_config.txt --kind constraint --evaluations 100000 --islands 4
+#
+# With --backend multiprocessing or futures, each run evaluates its populations on an
+# evaluator (see evaluators.py) with --processes workers; runs are then done one at a time.
+#   python experiment_runner.py configs/1d/green_crowding_config.txt --kind multiobjective --evaluations 100000 \
+#       --backend multiprocessing --processes 8
+
+import argparse
+import contextlib
+import multiprocessing
+import random
+import statistics
+from pathlib import Path
+from snake_eyes import read_config
+from linear_genotype import LinearGenotype
+from base_evolution import BaseEvolutionPopulation
+from stock_population_evaluation import *
+from multiobjective import *
+from selection import *
+from histogram import *
+from log_analyzer import *
+from result_store import ResultStore
+from evaluators import make_evaluator
+from island_model import run_islands, island_budget, merge_logs, TOPOLOGIES
+
+
+# Assignment 1b: single objective, invalid solutions get failure fitness.
+def base_run(num_evaluations, config, record_path=None, migration=None, evaluator=None):
+    hist = HistogramMaker(**config['problem'])
+
+    ea = BaseEvolutionPopulation(**config['ea'], **config, record_path=record_path, text_log=record_path is None)
+    base_population_evaluation(ea.population, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+    ea.evaluations = len(ea.population)
+    for individual in ea.population:
+        hist.add(individual.fitness)
+    best_solution = max(ea.population, key=lambda individual: individual.fitness)
+    ea.log_base_stats()
+
+    while ea.evaluations < num_evaluations:
+        children = ea.generate_children()
+        base_population_evaluation(children, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+        ea.evaluations += len(children)
+        for child in children:
+            hist.add(child.fitness)
+        best_solution = max([best_solution] + children, key=lambda individual: individual.fitness)
+        ea.population += children
+        ea.survival()
+        ea.log_base_stats()
+        if migration is not None:
+            migration(ea)
+
+    if record_path is None:
+        analyze_base_log(ea.log, num_evaluations)
+    else:
+        analyze_records(record_path, num_evaluations)
+    texts = {
+        'best_solution': best_solution.serialize(),
+        'best_fitness': str(best_solution.fitness)
+    }
+    return ea.log, texts, {'histogram': hist}
+
+
+# Assignment 1c: penalized fitness for constraint violations.
+def constraint_run(num_evaluations, config, record_path=None, migration=None, evaluator=None):
+    hist = PenaltyHistogramMaker()
+    base_hist = HistogramMaker(**config['problem'])
+    violation_hist = InvalidityHistogramMaker()
+
+    def record(individuals):
+        for individual in individuals:
+            hist.add(individual.fitness)
+            base_hist.add(individual.base_fitness)
+            violation_hist.add(individual.violations)
+
+    ea = BaseEvolutionPopulation(**config['ea'], **config, record_path=record_path, text_log=record_path is None)
+    unconstrained_population_evaluation(ea.population, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+    ea.evaluations = len(ea.population)
+    record(ea.population)
+    best_solution = max(ea.population, key=lambda individual: individual.base_fitness)
+    ea.log_penalized_stats()
+
+    while ea.evaluations < num_evaluations:
+        children = ea.generate_children()
+        unconstrained_population_evaluation(children, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+        ea.evaluations += len(children)
+        record(children)
+        best_solution = max([best_solution] + children, key=lambda individual: individual.base_fitness)
+        ea.population += children
+        ea.survival()
+        ea.log_penalized_stats()
+        if migration is not None:
+            migration(ea)
+
+    if record_path is None:
+        analyze_constraint_satisfaction_log(ea.log, num_evaluations)
+    else:
+        analyze_records(record_path, num_evaluations)
+    texts = {
+        'best_solution': best_solution.serialize(),
+        'best_fitness': str(best_solution.base_fitness)
+    }
+    histograms = {
+        'histogram': hist,
+        'base_histogram': base_hist,
+        'violation_histogram': violation_hist
+    }
+    return ea.log, texts, histograms
+
+
+# Assignment 1d: length and width objectives, fitness from nondomination levels.
+def multiobjective_run(num_evaluations, config, record_path=None, evaluator=None):
+    ea = BaseEvolutionPopulation(**config['ea'], **config, record_path=record_path, text_log=record_path is None)
+    multiobjective_population_evaluation(ea.population, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+    ea.evaluations = len(ea.population)
+    assign_fitnesses(ea.population, **config['fitness_kwargs'])
+    pareto_front = [individual for individual in ea.population if individual.level == 1]
+    ea.log_multiobjective_stats(pareto_front, calculate_hypervolume(pareto_front))
+
+    while ea.evaluations < num_evaluations:
+        children = ea.generate_children()
+        multiobjective_population_evaluation(children, cache=ea.fitness_cache, evaluator=evaluator, **config['problem'])
+        ea.evaluations += len(children)
+        ea.population += children
+        assign_fitnesses(ea.population, **config['fitness_kwargs'])
+        ea.survival()
+        assign_fitnesses(ea.population, **config['fitness_kwargs'])
+        pareto_front = [individual for individual in ea.population if individual.level == 1]
+        hypervolume = calculate_hypervolume(pareto_front)
+        ea.log_multiobjective_stats(pareto_front, hypervolume)
+
+    if record_path is None:
+        analyze_multiobjective_log(ea.log, num_evaluations)
+    else:
+        analyze_records(record_path, num_evaluations)
+    texts = {
+        # One serialized solution per line, followed by its objectives
+        'pareto_front': ''.join(f'{individual.serialize()}\t{individual.objectives}\n'
+                                for individual in pareto_front),
+        'best_fitness': str(calculate_hypervolume(pareto_front))
+    }
+    return ea.log, texts, dict()
+
+
+RUN_KINDS = {
+    'base': base_run,
+    'constraint': constraint_run,
+    'multiobjective': multiobjective_run
+}
+
+
+# Histogram artifacts written by each kind of run, merged across runs by summarize
+RUN_HISTOGRAMS = {
+    'base': {'histogram': HistogramMaker},
+    'constraint': {
+        'histogram': PenaltyHistogramMaker,
+        'base_histogram': HistogramMaker,
+        'violation_histogram': InvalidityHistogramMaker
+    },
+    'multiobjective': dict()
+}
+
+
+# Single-objective runs can be island-model runs; nondomination levels of different islands don't compare
+ISLAND_KINDS = ('base', 'constraint')
+
+
+# Island-model run: the budget is split over num_islands processes, and their logs are merged
+# into one, their best solutions compared and their histograms merged
+def island_run(kind, num_evaluations, config, seed, num_islands, interval, num_migrants, topology='ring'):
+    assert kind in ISLAND_KINDS, f'Island-model runs support {ISLAND_KINDS} runs'
+    island_evaluations = island_budget(num_evaluations, num_islands, config['ea']['mu'], config['ea']['num_children'])
+    outputs = run_islands(RUN_KINDS[kind], island_evaluations, config, num_islands, interval, num_migrants, topology, seed)
+    log = [f'islands: {num_islands}', f'migration interval: {interval}', f'migrants: {num_migrants}',
+           f'topology: {topology}'] + merge_logs([log for log, _, _ in outputs])
+    texts = max((texts for _, texts, _ in outputs), key=lambda texts: float(texts['best_fitness']))
+    histograms = {name: hist_class.merge([island_histograms[name] for _, _, island_histograms in outputs])
+                  for name, hist_class in RUN_HISTOGRAMS[kind].items()}
+    return log, texts, histograms
+
+
+# Evaluator of a run's populations on backend with processes workers (see evaluators.py),
+# or a null context if populations are evaluated in the run's own process
+def run_evaluator(config, backend=None, processes=None):
+    if backend is None:
+        return contextlib.nullcontext()
+    # Cutting stock fitness is deterministic, so evaluations don't need seeds of their own
+    return make_evaluator(config['ea']['individual_class'], backend, processes, seeded=False, **config['problem'])
+
+
+# Runs one independent run and writes it to the store. Each run reads its own
+# config and seeds itself from its index, so results don't depend on scheduling.
+# islands holds island_run's num_islands, interval, num_migrants and topology, if any.
+# backend and processes, if any, choose the evaluator of the run's populations.
+def run_and_store(kind, config_path, run, num_evaluations, store_root, seed, records=False, islands=None,
+                  backend=None, processes=None):
+    random.seed(seed + run)
+    config = read_config(str(config_path), globals(), locals())
+    store = ResultStore(store_root)
+    record_path = store.records_path(run) if records else None
+    if islands is not None:
+        assert not records, 'Island-model runs keep text logs'
+        assert backend is None, 'Island-model runs evaluate in their island processes'
+        log, texts, histograms = island_run(kind, num_evaluations, config, seed + run, **islands)
+    else:
+        with run_evaluator(config, backend, processes) as evaluator:
+            log, texts, histograms = RUN_KINDS[kind](num_evaluations, config, record_path, evaluator=evaluator)
+    store.write_run(run, log, texts, histograms)
+    return run
+
+
+def _run_and_store(args):
+    return run_and_store(*args)
+
+
+def run_experiment(kind, config_path, num_runs, num_evaluations, store_root, processes=None, seed=0, records=False,
+                   islands=None, backend=None):
+    store = ResultStore(store_root)
+    store.discard_partial_runs()
+    store.save_config(config_path)
+
+    pending = store.pending_runs(num_runs)
+    skipped = num_runs - len(pending)
+    if skipped:
+        print(f'Skipping {skipped} completed run(s) in {store.root}')
+
+    # With a parallel backend, processes are the evaluator's workers rather than runs
+    parallel_backend = backend is not None and backend != 'serial'
+    jobs = [(kind, config_path, run, num_evaluations, store_root, seed, records, islands, backend,
+             processes if parallel_backend else None) for run in pending]
+    if islands is not None or parallel_backend:
+        # Islands and evaluator workers are processes of their own, which pool workers can't start
+        for job in jobs:
+            run = _run_and_store(job)
+            print(f'Run {run} finished and saved to {store.run_dir(run)}')
+    elif jobs:
+        with multiprocessing.Pool(processes) as pool:
+            for run in pool.imap_unordered(_run_and_store, jobs):
+                print(f'Run {run} finished and saved to {store.run_dir(run)}')
+
+    summarize(kind, store, num_runs)
+    return store
+
+
+# Merges per-run histograms and writes best_per_run.txt for all completed runs
+def summarize(kind, store, num_runs):
+    runs = [run for run in range(num_runs) if store.is_complete(run)]
+    best_per_run = [float(store.read_text(run, 'best_fitness')) for run in runs]
+    with open(store.root / 'best_per_run.txt', 'w') as f:
+        for result in best_per_run:
+            f.write(str(result) + '\n')
+    if not runs:
+        return
+
+    problem = read_config(str(store.root / 'config.txt'), globals(), locals())['problem']
+    for name, hist_class in RUN_HISTOGRAMS[kind].items():
+        hists = [store.read_histogram(run, name, hist_class(**problem)) for run in runs]
+        hist_class.merge(hists).save_to_file(store.root / f'{name}.txt')
+
+    print(f'{len(runs)}/{num_runs} runs complete; mean best: {statistics.mean(best_per_run)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a multi-run cutting stock experiment with a resumable result store.')
+    parser.add_argument('config', type=Path, help='path to the experiment config')
+    parser.add_argument('--kind', choices=sorted(RUN_KINDS), required=True,
+                        help='base (1b), constraint (1c) or multiobjective (1d)')
+    parser.add_argument('--runs', type=int, default=30, help='number of independent runs')
+    parser.add_argument('--evaluations', type=int, required=True, help='fitness evaluations per run')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: all cores), running runs or, with a parallel --backend, '
+                             'evaluating populations')
+    parser.add_argument('--backend', choices=('serial', 'multiprocessing', 'futures'), default=None,
+                        help='evaluate populations through an evaluator on this backend (see evaluators.py)')
+    parser.add_argument('--seed', type=int, default=0, help='run i is seeded with seed + i')
+    parser.add_argument('--records', action='store_true',
+                        help='keep per-generation records (records.csv) instead of text logs')
+    parser.add_argument('--islands', type=int, default=None, help='island-model runs over this many processes')
+    parser.add_argument('--migration-interval', type=int, default=5, help='generations between migrations')
+    parser.add_argument('--migrants', type=int, default=1, help='individuals each island sends per migration')
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='ring', help='where islands send their migrants')
+    parser.add_argument('--out', type=Path, default=None,
+                        help='result store directory (default: results/<config dir>/<config name>)')
+    args = parser.parse_args()
+
+    store_root = args.out or Path('results') / args.config.parent.name / args.config.stem
+    islands = None
+    if args.islands is not None:
+        islands = {'num_islands': args.islands, 'interval': args.migration_interval,
+                   'num_migrants': args.migrants, 'topology': args.topology}
+    run_experiment(args.kind, args.config, args.runs, args.evaluations, store_root, args.processes, args.seed,
+                   args.records, islands, args.backend)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+
+# fitness_cache.py
+
+import hashlib
+from collections import OrderedDict
+
+# Opt-in LRU memo of fitness function outputs, keyed on genotype.
+#
+# Survivors, and children identical to a parent or to an earlier individual,
+# are looked up instead of re-evaluated. Keys are a digest of the genotype:
+# the genes of a LinearGenotype, or the serialization of a TreeGenotype.
+# A cache holds outputs of a single fitness function on a single problem;
+# make a new cache for each run.
+#
+# Stochastic fitness functions (GPac games) must pass the seed each individual
+# is evaluated with. The seed becomes part of the key, so a cached result is only
+# reused for the exact game that produced it.
+class FitnessCache():
+    def __init__(self, maxsize=100_000):
+        assert maxsize > 0, 'Fitness cache size must be positive'
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def key(self, individual, seed=None):
+        if isinstance(individual.genes, (list, tuple)):
+            # Linear genes may hold tuples or lists; both describe the same genotype
+            genotype = repr(tuple(tuple(gene) for gene in individual.genes))
+        else:
+            genotype = individual.serialize()
+        digest = hashlib.blake2b(genotype.encode(), digest_size=16).digest()
+        return digest if seed is None else (digest, seed)
+
+
+    # Returns the cached output for key, or None, counting a hit or a miss
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+
+    def put(self, key, output):
+        self.entries[key] = output
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+    # Returns fitness outputs for a population in population order. Individuals that
+    # miss the cache are evaluated in one call, evaluate_misses(individuals, seeds),
+    # which must return their outputs in order. A genotype occurring more than once
+    # in the population is evaluated once; its repeats count as hits.
+    def evaluate(self, population, evaluate_misses, seeds=None):
+        if seeds is None:
+            seeds = [None] * len(population)
+        keys = [self.key(individual, seed) for individual, seed in zip(population, seeds)]
+
+        outputs = dict()
+        misses = dict()
+        for individual, seed, key in zip(population, seeds, keys):
+            if key in outputs or key in misses:
+                self.hits += 1
+                continue
+            output = self.get(key)
+            if output is None:
+                misses[key] = (individual, seed)
+            else:
+                outputs[key] = output
+
+        if misses:
+            individuals, miss_seeds = zip(*misses.values())
+            for key, output in zip(misses, evaluate_misses(list(individuals), list(miss_seeds))):
+                self.put(key, output)
+                outputs[key] = output
+
+        return [outputs[key] for key in keys]
+
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.entries)
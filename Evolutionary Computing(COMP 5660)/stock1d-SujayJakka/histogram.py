@@ -21,7 +21,7 @@ class BaseHistogramMaker:
     LOAD_REGEX = re.compile(r'(.*):(.*)')
     def load_from_file(self, file):
         with open(file, 'r') as f:
-            matches = LOAD_REGEX.findall(f.read())
+            matches = self.LOAD_REGEX.findall(f.read())
         for m in matches:
             self.data[int(m[0])] = int(m[1])
 
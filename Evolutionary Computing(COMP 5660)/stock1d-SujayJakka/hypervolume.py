@@ -0,0 +1,269 @@
+
+# hypervolume.py
+
+import math
+import time
+import random
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+import numpy as np
+
+# Hypervolume of a set of points, i.e., the volume dominated by the points and
+# bounded below by a reference point, where larger objectives are better.
+#
+# Exact algorithms are dimension sweeps:
+#   - 2 objectives: sort once and sum the staircase, O(n log n)
+#   - 3 objectives: sweep the third objective downwards, inserting each point into a
+#     2-D staircase whose area is updated incrementally, O(n log n) plus list shifts
+# For 4 or more objectives, monte_carlo_hypervolume estimates the volume from
+# uniform samples, within a sample budget and/or a time limit.
+#
+# Points on or below the reference point in any objective dominate no volume.
+# Results are exact for integer objectives and match multiobjective.wfg_hypervolume
+# for points at or above the reference point. WFG instead takes the absolute difference
+# to the reference point, so a point below it counts as the box on the far side:
+# [[-10, -10]] with reference point (-1, -1) is 81 there and 0 here. The 1d configs set
+# failure_fitness to the reference point's -1, where both give 0.
+
+
+# Exact hypervolume for 1 to 3 objectives
+def exact_hypervolume(points, reference_point):
+    points = _relative_points(points, reference_point)
+    if not points:
+        return 0
+    dimensions = len(reference_point)
+    assert dimensions <= 3, 'Exact hypervolume supports at most 3 objectives; use monte_carlo_hypervolume'
+    if dimensions == 1:
+        return max(p[0] for p in points)
+    if dimensions == 2:
+        return _sweep_2d(points)
+    return _sweep_3d(points)
+
+
+# Hypervolume estimated from uniformly sampled points in the box between the reference
+# point and the per-objective maxima. Sampling stops after samples points, or once
+# time_limit seconds have passed, whichever comes first; at least one chunk is always sampled.
+def monte_carlo_hypervolume(points, reference_point, samples=100_000, time_limit=None, seed=None):
+    points = _relative_points(points, reference_point)
+    if not points:
+        return 0
+    points = np.array(points, dtype=np.float64)
+    upper = points.max(axis=0)
+    box_volume = float(np.prod(upper))
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, MAX_SAMPLE_COMPARISONS // points.size)
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    drawn = dominated = 0
+    while drawn < samples:
+        size = min(chunk, samples - drawn)
+        sample = rng.random((size, points.shape[1])) * upper
+        dominated += int(np.count_nonzero(np.any(np.all(points[np.newaxis] >= sample[:, np.newaxis], axis=2), axis=1)))
+        drawn += size
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    return box_volume * dominated / drawn
+
+
+# Upper bound on point-sample comparisons per Monte Carlo chunk
+MAX_SAMPLE_COMPARISONS = 1 << 22
+
+
+# Hypervolume of a front that changes by a few points at a time.
+#
+# With 2 objectives, the non-dominated points are kept as a Staircase: adding a point
+# only touches the points it dominates, and removing one only re-examines the points
+# it alone dominated. With 3 objectives, adding or removing a point changes the volume
+# by its exclusive contribution: its own box minus the hypervolume of the limit set
+# (every other point clipped to it).
+class HypervolumeTracker():
+    def __init__(self, reference_point, points=()):
+        assert len(reference_point) <= 3, 'Incremental hypervolume supports at most 3 objectives'
+        self.reference_point = tuple(reference_point)
+        self.points = Counter()
+        self.volume = 0
+        if len(self.reference_point) == 2:
+            self.staircase = Staircase()
+            self.sorted_points = []
+        for point in points:
+            self.add(point)
+
+
+    # Volume dominated only by point, relative to every other tracked point
+    def contribution(self, point):
+        point = tuple(point)
+        box = math.prod(max(0, p - r) for p, r in zip(point, self.reference_point))
+        if box == 0:
+            return 0
+        limit_set = [tuple(min(p, o) for p, o in zip(point, other)) for other in self.points if other != point]
+        return box - exact_hypervolume(limit_set, self.reference_point)
+
+
+    def add(self, point):
+        point = tuple(point)
+        self.points[point] += 1
+        if self.points[point] > 1:
+            return
+        if len(self.reference_point) == 2:
+            relative = _relative_points([point], self.reference_point)
+            if relative:
+                insort(self.sorted_points, relative[0])
+                self.staircase.add(*relative[0])
+                self.volume = self.staircase.area
+        else:
+            self.volume += self.contribution(point)
+
+
+    def remove(self, point):
+        point = tuple(point)
+        assert self.points[point], f'Point {point} is not tracked'
+        self.points[point] -= 1
+        if self.points[point]:
+            return
+        del self.points[point]
+        if len(self.reference_point) == 2:
+            relative = _relative_points([point], self.reference_point)
+            if relative:
+                del self.sorted_points[bisect_left(self.sorted_points, relative[0])]
+                self.staircase.remove(*relative[0], self.sorted_points)
+                self.volume = self.staircase.area
+        else:
+            self.volume -= self.contribution(point)
+
+
+    # Replaces the tracked points with a new front, only adding and removing the difference
+    def update(self, points):
+        new = Counter(tuple(point) for point in points)
+        for point, count in (self.points - new).items():
+            for _ in range(count):
+                self.remove(point)
+        for point, count in (new - self.points).items():
+            for _ in range(count):
+                self.add(point)
+        return self.volume
+
+
+# Translates points so the reference point is the origin, dropping duplicates and
+# points that dominate no volume, i.e., those not above the reference point in every objective
+def _relative_points(points, reference_point):
+    relative = {tuple(p - r for p, r in zip(point, reference_point)) for point in points}
+    return [point for point in relative if all(value > 0 for value in point)]
+
+
+def _sweep_2d(points):
+    volume = 0
+    best_y = 0
+    for x, y in sorted(points, reverse=True):
+        if y > best_y:
+            volume += x * (y - best_y)
+            best_y = y
+    return volume
+
+
+def _sweep_3d(points):
+    staircase = Staircase()
+    volume = 0
+    points = sorted(points, key=lambda p: p[2], reverse=True)
+    for i, (x, y, z) in enumerate(points):
+        staircase.add(x, y)
+        next_z = points[i + 1][2] if i + 1 < len(points) else 0
+        volume += staircase.area * (z - next_z)
+    return volume
+
+
+# Non-dominated 2-D points with the area they dominate above the origin, kept sorted by
+# increasing x (and so decreasing y). Points are added in O(log n) plus the list shifts,
+# and the area is updated from the segment the new point covers.
+class Staircase():
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+        self.area = 0
+
+
+    def add(self, x, y):
+        xs, ys = self.xs, self.ys
+        k = bisect_left(xs, x)
+        if k < len(xs) and ys[k] >= y:
+            # Dominated by (or equal to) a point at or right of x
+            return
+
+        # Points left of x with no greater y are now dominated; they are contiguous, ending at k
+        j = k
+        while j > 0 and ys[j - 1] <= y:
+            j -= 1
+
+        # Below height y and left of x, the new point covers everything not already covered:
+        # each dominated point's column, then the column up to x, which was covered to ys[k]
+        left = xs[j - 1] if j > 0 else 0
+        for m in range(j, k):
+            self.area += (xs[m] - left) * (y - ys[m])
+            left = xs[m]
+        self.area += (x - left) * (y - (ys[k] if k < len(xs) else 0))
+
+        end = k + 1 if k < len(xs) and xs[k] == x else k
+        xs[j:end] = [x]
+        ys[j:end] = [y]
+
+
+    # Removes a point if it is on the staircase. points holds every other point, sorted;
+    # those that only the removed point dominated are added back.
+    def remove(self, x, y, points):
+        xs, ys = self.xs, self.ys
+        i = bisect_left(xs, x)
+        if i == len(xs) or xs[i] != x or ys[i] != y:
+            return
+
+        left = xs[i - 1] if i > 0 else 0
+        below = ys[i + 1] if i + 1 < len(xs) else 0
+        self.area -= (x - left) * (y - below)
+        del xs[i]
+        del ys[i]
+
+        for candidate_x, candidate_y in points[bisect_right(points, (left, math.inf)):bisect_right(points, (x, math.inf))]:
+            if candidate_y > below:
+                self.add(candidate_x, candidate_y)
+
+
+# Compares against multiobjective.calculate_hypervolume's recursive WFG on random fronts
+if __name__ == '__main__':
+    from multiobjective import wfg_hypervolume
+
+    def random_front(n, dimensions):
+        # Points on a sphere are mutually non-dominated
+        front = []
+        for _ in range(n):
+            direction = [abs(random.gauss(0, 1)) for _ in range(dimensions)]
+            norm = math.sqrt(sum(d * d for d in direction))
+            front.append([round(1000 * d / norm) for d in direction])
+        return front
+
+    random.seed(0)
+    reference_point = [-1, -1, -1, -1]
+    print(f'{"objectives":>10} {"points":>6} {"wfg (s)":>10} {"new (s)":>10} {"speedup":>8}  result')
+    for dimensions, sizes in ((2, (10, 50, 200, 1000)), (3, (10, 30, 60, 100)), (4, (10, 40, 80))):
+        reference = reference_point[:dimensions]
+        for n in sizes:
+            front = random_front(n, dimensions)
+            start = time.perf_counter()
+            expected = wfg_hypervolume(front, reference, True)
+            wfg_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if dimensions <= 3:
+                result = exact_hypervolume(front, reference)
+                check = 'exact' if result == expected else f'MISMATCH {result} != {expected}'
+            else:
+                result = monte_carlo_hypervolume(front, reference, samples=200_000, seed=0)
+                check = f'estimate off by {100 * abs(result - expected) / expected:.2f}%'
+            new_time = time.perf_counter() - start
+            print(f'{dimensions:>10} {n:>6} {wfg_time:>10.4f} {new_time:>10.4f} {wfg_time / new_time:>8.1f}x  {check}')
+
+    front = random_front(200, 2)
+    tracker = HypervolumeTracker(reference_point[:2], front)
+    start = time.perf_counter()
+    for _ in range(100):
+        front[random.randrange(len(front))] = random_front(1, 2)[0]
+        tracker.update(front)
+    print(f'Incremental 2-D update of a 200-point front by one point: {(time.perf_counter() - start) / 100:.5f}s',
+          'exact' if tracker.volume == exact_hypervolume(front, reference_point[:2]) else 'MISMATCH')
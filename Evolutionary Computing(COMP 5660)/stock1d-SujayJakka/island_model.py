@@ -0,0 +1,145 @@
+
+# island_model.py
+
+import multiprocessing
+import queue
+import random
+import statistics
+
+# Island-model runs: num_islands sub-populations evolve in separate processes, each
+# running an ordinary single-population run function of experiment_runner on its share
+# of the evaluation budget (see island_budget). After every interval generations, each
+# island sends copies of its num_migrants best individuals to another island, where
+# they replace the worst. Migrants keep their fitness, so migration costs no evaluations.
+#
+# Topologies:
+#   - ring: island i always sends to island i + 1 (mod num_islands)
+#   - random: islands are put in a new random cycle at each migration, drawn from the
+#     run's seed, so every island receives exactly one group of migrants
+#
+# Each island keeps the usual log; merge_logs combines them into the log of a single
+# population of num_islands * mu individuals, which the log analyzers accept as is.
+
+TOPOLOGIES = ('ring', 'random')
+
+
+# Called by a run function after each generation's stats are logged
+class Migration():
+    def __init__(self, island, num_islands, interval, num_migrants, topology, inboxes, seed):
+        assert topology in TOPOLOGIES, f'Topology must be one of {TOPOLOGIES}'
+        assert interval > 0, 'Migration interval must be positive'
+        self.island = island
+        self.num_islands = num_islands
+        self.interval = interval
+        self.num_migrants = num_migrants
+        self.topology = topology
+        self.inboxes = inboxes
+        self.seed = seed
+        self.generation = 0
+
+
+    # Island that receives this island's migrants in a migration round
+    def target(self, round):
+        if self.topology == 'ring':
+            return (self.island + 1) % self.num_islands
+        cycle = list(range(self.num_islands))
+        random.Random(f'{self.seed}-{round}').shuffle(cycle)
+        return cycle[(cycle.index(self.island) + 1) % self.num_islands]
+
+
+    def __call__(self, ea):
+        self.generation += 1
+        if self.generation % self.interval or self.num_islands == 1:
+            return
+        fitness = lambda individual: individual.fitness
+        emigrants = sorted(ea.population, key=fitness)[len(ea.population) - self.num_migrants:]
+        self.inboxes[self.target(self.generation // self.interval)].put(emigrants)
+
+        immigrants = self.inboxes[self.island].get()
+        ea.population.sort(key=fitness)
+        ea.population[:len(immigrants)] = immigrants
+
+
+# Evaluation budget of each of num_islands islands of mu + num_children individuals, so that
+# together they never exceed num_evaluations: every island runs the same number of whole
+# generations (which keeps migrations in step), as many as the budget allows.
+def island_budget(num_evaluations, num_islands, mu, num_children):
+    generations = (num_evaluations // num_islands - mu) // num_children
+    assert generations >= 0, 'The evaluation budget does not cover the initial populations of the islands'
+    return mu + generations * num_children
+
+
+def _run_island(run_function, num_evaluations, config, migration, seed, results):
+    random.seed(seed)
+    results.put((migration.island, run_function(num_evaluations, config, migration=migration)))
+
+
+# Runs run_function(island_evaluations, config, migration=...) on each island and returns
+# each island's output in island order. Island i is seeded with seed * num_islands + i.
+# Every island must run the same number of generations (see island_budget), so migrations
+# line up; if any island fails, the others are stopped.
+def run_islands(run_function, island_evaluations, config, num_islands, interval, num_migrants,
+                topology='ring', seed=0):
+    inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+    results = multiprocessing.Queue()
+    processes = []
+    for island in range(num_islands):
+        migration = Migration(island, num_islands, interval, num_migrants, topology, inboxes, seed)
+        processes.append(multiprocessing.Process(target=_run_island, args=(
+            run_function, island_evaluations, config, migration, seed * num_islands + island, results)))
+    for process in processes:
+        process.start()
+
+    outputs = [None] * num_islands
+    received = 0
+    while received < num_islands:
+        try:
+            island, output = results.get(timeout=1)
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in processes):
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError('An island process failed')
+            continue
+        outputs[island] = output
+        received += 1
+
+    for process in processes:
+        process.join()
+    return outputs
+
+
+# Entries summed over islands; best entries take the maximum, mean entries the mean
+# (islands are the same size), and anything else is taken from the first island
+SUMMED_ENTRIES = {
+    'mu', 'num_children', 'Initial population size', 'Evaluations', 'Number of children',
+    'Number of recombinations', 'Number of mutations', 'Pre-survival population size', 'Post-survival population size',
+    'Fitness cache hits', 'Fitness cache misses', 'Number of valid solutions'
+}
+
+
+def _number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+# Combines the islands' logs, entry by entry, into the log of their union
+def merge_logs(logs):
+    assert all(len(log) == len(logs[0]) for log in logs), 'Islands logged different numbers of entries'
+    merged = []
+    for entries in zip(*logs):
+        entries = [entry.split(': ', 1) for entry in entries]
+        name = entries[0][0]
+        assert all(entry[0] == name for entry in entries), f'Islands logged {name} at different times'
+        values = [value for _, value in entries]
+        if name in SUMMED_ENTRIES:
+            merged.append(f'{name}: {sum(map(_number, values))}')
+        elif name.startswith('Local best'):
+            merged.append(f'{name}: {max(map(_number, values))}')
+        elif name.startswith('Local mean'):
+            merged.append(f'{name}: {statistics.mean(map(_number, values))}')
+        else:
+            merged.append(f'{name}: {values[0]}')
+    return merged
@@ -10,6 +10,12 @@ class LinearGenotype():
     def __init__(self):
         self.fitness = None
         self.genes = None
+        # Occupancy of the genes (see cutting_stock/occupancy.py) when evaluated incrementally.
+        # Children start with their parent's, so evaluation only re-places the shapes that changed.
+        # Each one takes about 40 KB on configs/1c, so generate_children drops the population's
+        # once the children hold theirs; only the latest children keep one, and a parent without
+        # one gives its child a full placement instead.
+        self.occupancy = None
 
 
     def random_initialization(self, shapes, bounds, **kwargs):
@@ -52,6 +58,7 @@ class LinearGenotype():
 
     def recombine(self, mate, method, **kwargs):
         child = LinearGenotype()
+        child.occupancy = self.occupancy
 
         # TODO: Recombine genes of self with mate and
         #       assign to child's genes member variable
@@ -90,6 +97,7 @@ class LinearGenotype():
     def mutate(self, bounds, bonus=None, **kwargs):
         mutant = LinearGenotype()
         mutant.genes = deepcopy(self.genes)
+        mutant.occupancy = self.occupancy
 
         # Create Bound Variables
         x_min = bounds[0][0]
@@ -2,6 +2,7 @@
 # log_analyzer.py
 
 from statistics import mean
+from run_records import stream_records
 
 
 def universal_analysis(log, evals):
@@ -111,3 +112,80 @@ def analyze_multiobjective_log(log, evals):
                   'You may ignore this if you deliberately chose a very non-elitist configuration and can justify your choice.')
             break
 
+
+
+# Checks a run's records file (see run_records.py) for the same problems as
+# universal_analysis and the analyze_*_log function of its kind, in one pass over
+# the rows, so records of any length are analyzed without loading them into memory.
+def analyze_records(path, evals):
+    metadata, rows = stream_records(path)
+    mu = int(metadata['mu'])
+    num_children = int(metadata['num_children'])
+    drop_warning = '{} dropped significantly over time at least once. ' +\
+                   'This *may* indicate a bug (especially if using truncation), or poor configuration. '+\
+                   'You may ignore this if you deliberately chose a very non-elitist configuration and can justify your choice.'
+
+    # Problems are reported once each, in the order universal_analysis reports them
+    found = dict.fromkeys(['evaluations', 'children', 'pre_size', 'post_size', 'missing', 'drop', 'hypervolume'], False)
+    previous_evaluations = None
+    num_generations = 0
+    single_front = True
+    tracked = None
+    best_so_far = None
+
+    for row in rows:
+        evaluations = row['Evaluations']
+        if previous_evaluations is None:
+            if evaluations != mu:
+                print('Initial evaluation count is incorrect.')
+        elif evaluations - previous_evaluations != num_children:
+            found['evaluations'] = True
+        previous_evaluations = evaluations
+
+        if row['Number of children'] is not None:
+            num_generations += 1
+            found['children'] |= row['Number of children'] != num_children
+            found['pre_size'] |= row['Pre-survival population size'] != mu + num_children
+            found['post_size'] |= row['Post-survival population size'] != mu
+
+        # The statistic tracked for drops, and what its metrics are called, depend on the kind of run
+        if tracked is None:
+            if 'Local mean' in row:
+                tracked = 'Local mean', 'Mean population fitness', 'fitness metrics'
+            elif 'Local mean penalized fitness' in row:
+                tracked = 'Local mean penalized fitness', 'Mean population penalized fitness', 'fitness metrics'
+            else:
+                tracked = 'Local Pareto front hypervolume', 'Local Pareto front hypervolume', 'objective scores'
+        stats = [name for name in row if name.startswith('Local') or name.startswith('Individuals')]
+        found['missing'] |= any(row[name] is None for name in stats)
+        if 'Individuals in the Pareto front' in row:
+            single_front &= row['Individuals in the Pareto front'] == 1
+
+        value = row[tracked[0]]
+        if value is None:
+            continue
+        if best_so_far is None or value > best_so_far:
+            best_so_far = value
+        elif best_so_far != 0 and value / best_so_far < 0.75:
+            found['drop'] = True
+
+    if found['evaluations']:
+        print('A generation increased the evaluation count by an incorrect amount. ' +\
+              'This could be a false positive caused by updating the evaluation count after survival selection.')
+    if previous_evaluations is None or previous_evaluations < evals or previous_evaluations >= evals + num_children:
+        print('Final evaluation count seems incorrect.')
+    if found['children']:
+        print('Number of children seems incorrect.')
+    if found['pre_size']:
+        print('Population size before survival selection seems incorrect.')
+    if found['post_size']:
+        print('Population size after survival selection seems incorrect.')
+    if num_generations == 1:
+        print('You only have one generation of children!')
+
+    if tracked is not None and tracked[0] == 'Local Pareto front hypervolume' and single_front:
+        print('Every generation\'s Pareto front only has one individual.')
+    if found['missing']:
+        print(f'Different amounts of data recorded for different {tracked[2]}.')
+    if found['drop']:
+        print(drop_warning.format(tracked[1]))
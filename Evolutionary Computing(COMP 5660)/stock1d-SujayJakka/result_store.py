@@ -0,0 +1,102 @@
+
+# result_store.py
+
+import os
+import shutil
+from pathlib import Path
+from run_records import load_records
+
+# On-disk store for the results of an experiment's independent runs.
+#
+# Layout:
+#   <root>/config.txt              copy of the experiment's config
+#   <root>/runs/<run>/log.txt      the run's EA log, one entry per line
+#   <root>/runs/<run>/records.csv  the run's per-generation records, if recorded (see run_records.py)
+#   <root>/runs/<run>/<name>.txt   any other artifacts (best solution, histograms, ...)
+#
+# A run is written into runs/<run>.partial and renamed to runs/<run> only once
+# every artifact is on disk. Because the rename is atomic, a run directory
+# exists if and only if that run completed; anything left as .partial after a
+# crash is discarded and the run is redone on restart. Records are appended to
+# runs/<run>.records.csv while the run is in progress and moved in with the rest.
+class ResultStore():
+    def __init__(self, root):
+        self.root = Path(root)
+        self.runs_dir = self.root / 'runs'
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+
+
+    def save_config(self, config_path):
+        shutil.copyfile(config_path, self.root / 'config.txt')
+
+
+    def run_dir(self, run):
+        return self.runs_dir / str(run)
+
+
+    def is_complete(self, run):
+        return self.run_dir(run).is_dir()
+
+
+    def completed_runs(self):
+        return sorted(int(child.name) for child in self.runs_dir.iterdir()
+                      if child.is_dir() and child.name.isdigit())
+
+
+    def pending_runs(self, num_runs):
+        return [run for run in range(num_runs) if not self.is_complete(run)]
+
+
+    # Where a run in progress writes its records, e.g., BaseEvolutionPopulation's record_path
+    def records_path(self, run):
+        return self.runs_dir / f'{run}.records.csv'
+
+
+    # Writes a finished run. log is a list of log entries; texts maps artifact names to strings;
+    # histograms maps artifact names to HistogramMaker objects, saved with save_to_file.
+    def write_run(self, run, log, texts=dict(), histograms=dict()):
+        partial = self.runs_dir / f'{run}.partial'
+        if partial.exists():
+            shutil.rmtree(partial)
+        partial.mkdir()
+
+        with open(partial / 'log.txt', 'w') as f:
+            f.write(''.join(line + '\n' for line in log))
+        for name, text in texts.items():
+            with open(partial / f'{name}.txt', 'w') as f:
+                f.write(text)
+        for name, hist in histograms.items():
+            hist.save_to_file(partial / f'{name}.txt')
+        if self.records_path(run).exists():
+            os.replace(self.records_path(run), partial / 'records.csv')
+
+        os.replace(partial, self.run_dir(run))
+
+
+    def read_log(self, run):
+        with open(self.run_dir(run) / 'log.txt', 'r') as f:
+            return f.read().splitlines()
+
+
+    # Returns the run's records as metadata and columns, as in run_records.load_records
+    def read_records(self, run):
+        return load_records(self.run_dir(run) / 'records.csv')
+
+
+    def read_text(self, run, name):
+        with open(self.run_dir(run) / f'{name}.txt', 'r') as f:
+            return f.read()
+
+
+    # Loads a histogram artifact into hist (a freshly constructed HistogramMaker) and returns it
+    def read_histogram(self, run, name, hist):
+        hist.load_from_file(self.run_dir(run) / f'{name}.txt')
+        return hist
+
+
+    # Removes runs left half-written by a crash
+    def discard_partial_runs(self):
+        for child in self.runs_dir.glob('*.partial'):
+            shutil.rmtree(child)
+        for child in self.runs_dir.glob('*.records.csv'):
+            child.unlink()
@@ -1,30 +1,81 @@
 
 # stock_population_evaluation.py
 
+import numpy as np
+from functools import partial
 from cutting_stock.fitness_functions import *
+from cutting_stock.occupancy import get_occupancy
+
+
+# Stacks the genes of a population into one (pop, n_shapes, 3) array for the batched fitness functions
+def stack_genes(population):
+    return np.array([linear_genotype.genes for linear_genotype in population], dtype=np.int64)
+
+
+# Evaluators (see evaluators.py) call fitness functions with whole individuals,
+# while the cutting stock fitness functions take genes
+def evaluate_genes(fitness_function, individual, **kwargs):
+    return fitness_function(individual.genes, **kwargs)
+
+
+# Updates an individual's Occupancy (see cutting_stock/occupancy.py) for its current genes.
+# Children carry their parent's Occupancy, so only the shapes that moved are re-placed.
+def update_occupancy(linear_genotype, shapes, bounds, **kwargs):
+    linear_genotype.occupancy = get_occupancy(linear_genotype.genes, shapes, bounds, linear_genotype.occupancy)
+    return linear_genotype.occupancy
+
+
+# Returns one fitness output dict per individual, in population order, from the
+# per-individual fitness_function, its batched or incremental equivalent, or an evaluator.
+# With a FitnessCache (see fitness_cache.py), only genotypes missing from the cache are evaluated.
+def evaluate_outputs(population, fitness_function, batched_fitness_function, occupancy_fitness_function,
+                     batched=False, evaluator=None, cache=None, incremental=False, **kwargs):
+    if cache is not None:
+        return cache.evaluate(population, lambda misses, seeds: evaluate_outputs(
+            misses, fitness_function, batched_fitness_function, occupancy_fitness_function,
+            batched, evaluator, incremental=incremental, **kwargs))
+
+    if evaluator is not None:
+        # Evaluate through a (possibly parallel) evaluator; results are identical to the loop below
+        return evaluator.evaluate(population, partial(evaluate_genes, fitness_function), **kwargs)
+
+    if batched:
+        # Evaluate the whole population at once; results are identical to the loop below
+        if not population:
+            return []
+        output = batched_fitness_function(stack_genes(population), **kwargs)
+        return [dict(zip(output, values)) for values in zip(*output.values())]
+
+    if incremental:
+        # Evaluate from each individual's Occupancy; results are identical to the loop below
+        return [occupancy_fitness_function(update_occupancy(linear_genotype, **kwargs), **kwargs)
+                for linear_genotype in population]
+
+    return [fitness_function(linear_genotype.genes, **kwargs) for linear_genotype in population]
+
 
 # 1b TODO: Evaluate the population and assign the fitness
 # member variable as described in the Assignment 1b notebook
-def base_population_evaluation(population, **kwargs):
+def base_population_evaluation(population, batched=False, evaluator=None, cache=None, incremental=False, **kwargs):
     # Use base_fitness_function, i.e.,
     # base_fitness_function(individual.genes, **kwargs)
-
-    for linear_genotype in population:
-        output = base_fitness_function(linear_genotype.genes, **kwargs)
+    outputs = evaluate_outputs(population, base_fitness_function, batched_base_fitness_function,
+                               occupancy_base_fitness_function, batched, evaluator, cache, incremental, **kwargs)
+    for linear_genotype, output in zip(population, outputs):
         linear_genotype.fitness = output["fitness"]
 
 
 # 1c TODO: Evaluate the population and assign the base_fitness, violations, and fitness
 # member variables as described in the constraint satisfaction portion of Assignment 1c
-def unconstrained_population_evaluation(population, penalty_coefficient, red=None, **kwargs):
+def unconstrained_population_evaluation(population, penalty_coefficient, red=None, batched=False,
+                                        evaluator=None, cache=None, incremental=False, **kwargs):
     # Use unconstrained_fitness_function, i.e.,
     # unconstrained_fitness_function(individual.genes, **kwargs)
     if not red:
         # GREEN deliverable logic goes here
-        for linear_genotype in population:
-            # Evaluate the solution
-            output = unconstrained_fitness_function(linear_genotype.genes, **kwargs)
-
+        outputs = evaluate_outputs(population, unconstrained_fitness_function, batched_unconstrained_fitness_function,
+                                   occupancy_unconstrained_fitness_function, batched, evaluator, cache, incremental, **kwargs)
+        for linear_genotype, output in zip(population, outputs):
             # Assign member variables based on the evaluation
             linear_genotype.base_fitness = output['base fitness']
             linear_genotype.violations = output['violations']
@@ -37,17 +88,17 @@ def unconstrained_population_evaluation(population, penalty_coefficient, red=Non
 
 # 1d TODO: Evaluate the population and assign the objectives
 # member variable as described in the multi-objective portion of Assignment 1d
-def multiobjective_population_evaluation(population, yellow=None, **kwargs):
+def multiobjective_population_evaluation(population, yellow=None, batched=False, evaluator=None, cache=None,
+                                         incremental=False, **kwargs):
     # Use multiobjective_fitness_function, i.e.,
     # multiobjective_fitness_function(individual.genes, **kwargs)
     if not yellow:
         # GREEN deliverable logic goes here
-        for linear_genotype in population:
-            output = multiobjective_fitness_function(linear_genotype.genes, **kwargs)
+        outputs = evaluate_outputs(population, multiobjective_fitness_function, batched_multiobjective_fitness_function,
+                                   occupancy_multiobjective_fitness_function, batched, evaluator, cache, incremental, **kwargs)
+        for linear_genotype, output in zip(population, outputs):
             linear_genotype.objectives = [output['length'], output['width']]
-        pass
 
     else:
         # YELLOW deliverable logic goes here
         pass
-
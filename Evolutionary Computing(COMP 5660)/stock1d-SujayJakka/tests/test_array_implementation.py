@@ -0,0 +1,115 @@
+
+# tests/test_array_implementation.py
+
+from test_utils import *
+import random, pytest, copy, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from snake_eyes import read_config
+import cutting_stock.implementation as impl
+from cutting_stock.array_implementation import get_engine
+from stock_population_evaluation import *
+
+config_paths = ['configs/1b/easy_green_config.txt',
+                'configs/1c/green_config.txt',
+                'configs/1d/green_crowding_config.txt']
+problems = [read_config(path, globals(), locals())['problem'] for path in config_paths]
+iterations = 200
+
+def clustered_pop(mu, shapes, bounds, **kwargs):
+    # Random solutions are rarely valid on the larger problems, so squeeze
+    # translations into a corner of the bounds to get plenty of overlaps,
+    # out-of-bounds cells and shared edges
+    pop = random_pop(mu, shapes=shapes, bounds=bounds)
+    for individual in pop:
+        individual.genes = [(bounds[0][0] + (x - bounds[0][0]) % 8,
+                             bounds[1][0] + (y - bounds[1][0]) % 8, r)
+                            for x, y, r in individual.genes]
+    return pop
+
+class TestPlacementEngine:
+    @pytest.mark.parametrize('problem', problems)
+    def test_matches_dict_implementation(self, problem):
+        # Every reduction matches the dict-based implementation exactly
+        shapes, bounds = problem['shapes'], problem['bounds']
+        engine = get_engine(shapes, bounds)
+        pop = random_pop(iterations, shapes=shapes, bounds=bounds) + clustered_pop(iterations, shapes, bounds)
+        for individual in pop:
+            cells = impl.place_all(individual.genes, shapes, bounds)
+            array_cells = engine.place_all(individual.genes)
+            assert engine.count_overlaps(array_cells) == impl.count_overlaps(cells)
+            assert engine.count_out_of_bounds(array_cells) == impl.count_out_of_bounds(cells, bounds)
+            assert engine.get_extent(array_cells, False) == impl.get_extent(cells, False)
+            assert engine.get_extent(array_cells, True) == impl.get_extent(cells, True)
+            assert engine.count_shared_edges(array_cells) == impl.count_shared_edges(cells)
+
+    @pytest.mark.parametrize('problem', problems)
+    def test_same_cells(self, problem):
+        # The placed cells are exactly the keys of place_all, with the same shapes in each
+        shapes, bounds = problem['shapes'], problem['bounds']
+        engine = get_engine(shapes, bounds)
+        for individual in clustered_pop(iterations, shapes, bounds):
+            cells = impl.place_all(individual.genes, shapes, bounds)
+            array_cells = engine.place_all(individual.genes)
+            occupied = dict()
+            for cell, shape in zip(map(tuple, array_cells.tolist()), engine.shape_ids.tolist()):
+                occupied.setdefault(cell, []).append(shape)
+            assert occupied.keys() == cells.keys()
+            for cell in cells:
+                assert sorted(occupied[cell]) == sorted(cells[cell])
+
+    def test_engine_is_cached(self):
+        # Equal problems share a single engine
+        shapes, bounds = problems[0]['shapes'], problems[0]['bounds']
+        assert get_engine(shapes, bounds) is get_engine([list(shape) for shape in shapes], list(bounds))
+
+    def test_translation_out_of_bounds(self):
+        # Out-of-bounds translations are rejected, as in place_all
+        shapes, bounds = problems[0]['shapes'], problems[0]['bounds']
+        solution = [(bounds[0][1], bounds[1][0], 0)] * len(shapes)
+        with pytest.raises(AssertionError):
+            get_engine(shapes, bounds).place_all(solution)
+
+class TestBatchedEvaluation:
+    @pytest.mark.parametrize('problem', problems)
+    def test_base(self, problem):
+        # Batched evaluation assigns the same fitness as the per-individual loop
+        pop = random_pop(iterations, **problem) + clustered_pop(iterations, **problem)
+        copies = copy.deepcopy(pop)
+        base_population_evaluation(pop, **problem)
+        base_population_evaluation(copies, batched=True, **problem)
+        for individual, batched in zip(pop, copies):
+            assert individual.fitness == batched.fitness
+
+    @pytest.mark.parametrize('problem', problems)
+    def test_unconstrained(self, problem):
+        # Batched evaluation assigns the same penalized fitness, base fitness and violations
+        pop = random_pop(iterations, **problem) + clustered_pop(iterations, **problem)
+        copies = copy.deepcopy(pop)
+        kwargs = {'penalty_coefficient': 1/128, **problem}
+        unconstrained_population_evaluation(pop, **kwargs)
+        unconstrained_population_evaluation(copies, batched=True, **kwargs)
+        for individual, batched in zip(pop, copies):
+            assert individual.fitness == batched.fitness
+            assert individual.base_fitness == batched.base_fitness
+            assert individual.violations == batched.violations
+
+    @pytest.mark.parametrize('problem', problems)
+    def test_multiobjective(self, problem):
+        # Batched evaluation assigns the same objectives, and the same shared edges
+        pop = random_pop(iterations, **problem) + clustered_pop(iterations, **problem)
+        copies = copy.deepcopy(pop)
+        multiobjective_population_evaluation(pop, **problem)
+        multiobjective_population_evaluation(copies, batched=True, **problem)
+        for individual, batched in zip(pop, copies):
+            assert individual.objectives == batched.objectives
+
+        output = batched_multiobjective_fitness_function(stack_genes(pop), shared_edges=True, **problem)
+        for i, individual in enumerate(pop):
+            expected = multiobjective_fitness_function(individual.genes, shared_edges=True, **problem)
+            assert expected['edges'] == output['edges'][i]
+
+    def test_empty_population(self):
+        # Batched evaluation of an empty population is a no-op
+        base_population_evaluation([], batched=True, **problems[0])
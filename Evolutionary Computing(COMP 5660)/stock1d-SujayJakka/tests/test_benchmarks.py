@@ -0,0 +1,41 @@
+
+# tests/test_benchmarks.py
+
+from test_utils import *
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from benchmarks import *
+
+config = read_config(DEFAULT_CONFIG, globals(), locals())
+config['ea']['mu'] = 100
+config['ea']['num_children'] = 100
+
+class TestBenchmarks:
+    def test_run_benchmarks(self):
+        # Every benchmark runs at small sizes, and evaluating benchmarks report their rate
+        results = run_benchmarks(config, list(BENCHMARKS), 1)
+        assert list(results) == list(BENCHMARKS)
+        for name, result in results.items():
+            assert result['seconds'] > 0
+            assert result['peak_bytes'] >= 0
+        assert results['place_all']['evaluations_per_second'] == pytest.approx(100 / results['place_all']['seconds'])
+        assert results['nondomination_sort']['evaluations_per_second'] is None
+
+    def test_same_inputs(self):
+        # Inputs are drawn from a fixed seed
+        first, second = make_inputs(config), make_inputs(config)
+        assert [individual.genes for individual in first['population']] == \
+               [individual.genes for individual in second['population']]
+        assert [individual.objectives for individual in first['objectives']] == \
+               [individual.objectives for individual in second['objectives']]
+
+    def test_find_regressions(self):
+        # Slowdowns and memory growth beyond the tolerance are regressions; noise is not
+        baseline = {'a': {'seconds': 1.0, 'peak_bytes': 100}, 'b': {'seconds': 1e-6, 'peak_bytes': 100},
+                    'c': {'seconds': 1.0, 'peak_bytes': 100}}
+        results = {'a': {'seconds': 1.6, 'peak_bytes': 100}, 'b': {'seconds': 1e-5, 'peak_bytes': 100},
+                   'c': {'seconds': 1.0, 'peak_bytes': 151}, 'd': {'seconds': 9.0, 'peak_bytes': 100}}
+        assert find_regressions(results, baseline, 0.5) == ['a', 'c']
+        assert find_regressions(results, baseline, 1.0) == []
@@ -0,0 +1,63 @@
+
+# tests/test_fitness_cache.py
+
+from test_utils import *
+import random, pytest, copy, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from snake_eyes import read_config
+from stock_population_evaluation import *
+from fitness_cache import FitnessCache
+
+config = read_config('configs/1c/green_config.txt', globals(), locals())
+problem = config['problem']
+iterations = 100
+
+class TestFitnessCache:
+    def test_same_fitness(self):
+        # Cached evaluation assigns the same fitness as uncached evaluation, for every path
+        pop = random_pop(iterations, **problem)
+        pop += copy.deepcopy(pop[:iterations // 2])
+        for kwargs in [dict(), {'batched': True}]:
+            uncached, cached = copy.deepcopy(pop), copy.deepcopy(pop)
+            unconstrained_population_evaluation(uncached, **problem, **kwargs)
+            unconstrained_population_evaluation(cached, cache=FitnessCache(), **problem, **kwargs)
+            for individual, cached_individual in zip(uncached, cached):
+                assert individual.fitness == cached_individual.fitness
+                assert individual.base_fitness == cached_individual.base_fitness
+                assert individual.violations == cached_individual.violations
+
+    def test_hits_and_misses(self):
+        # Each distinct genotype is evaluated once; repeats within and across calls are hits
+        pop = random_pop(iterations, **problem)
+        cache = FitnessCache()
+        calls = []
+        def evaluate_misses(individuals, seeds):
+            calls.append(len(individuals))
+            return [base_fitness_function(individual.genes, **problem) for individual in individuals]
+        cache.evaluate(pop + copy.deepcopy(pop[:10]), evaluate_misses)
+        assert (cache.hits, cache.misses) == (10, iterations)
+        cache.evaluate(copy.deepcopy(pop[:20]), evaluate_misses)
+        assert (cache.hits, cache.misses) == (30, iterations)
+        assert calls == [iterations]
+
+    def test_canonical_key(self):
+        # Genes stored as lists or tuples are the same genotype; seeds distinguish keys
+        individual = random_pop(1, **problem)[0]
+        as_lists = copy.deepcopy(individual)
+        as_lists.genes = [list(gene) for gene in individual.genes]
+        cache = FitnessCache()
+        assert cache.key(individual) == cache.key(as_lists)
+        assert cache.key(individual, seed=1) != cache.key(individual, seed=2)
+
+    def test_least_recently_used_eviction(self):
+        # The least recently used entry is evicted once the cache is full
+        cache = FitnessCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        assert len(cache) == 2
@@ -0,0 +1,70 @@
+
+# tests/test_hypervolume.py
+
+from test_utils import *
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from hypervolume import *
+from multiobjective import wfg_hypervolume
+
+iterations = 200
+
+def random_points(dimensions):
+    # Small value ranges give dominated points, duplicates and points on the reference point
+    n = random.randint(1, 30)
+    value_range = random.choice([3, 10, 100])
+    return [[random.randint(-1, value_range) for _ in range(dimensions)] for _ in range(n)]
+
+class TestExactHypervolume:
+    @pytest.mark.parametrize('dimensions', [1, 2, 3])
+    def test_matches_wfg(self, dimensions):
+        # Exact sweeps give exactly the WFG hypervolume
+        reference_point = [-1] * dimensions
+        for _ in range(iterations):
+            points = random_points(dimensions)
+            assert exact_hypervolume(points, reference_point) == wfg_hypervolume(points, reference_point, True)
+
+    def test_empty(self):
+        # No points (or none above the reference point) dominate no volume
+        assert exact_hypervolume([], [-1, -1]) == 0
+        assert exact_hypervolume([[-1, 5], [3, -1]], [-1, -1]) == 0
+
+    def test_below_reference(self):
+        # Points below the reference point dominate no volume, where WFG counts their
+        # distance to it; the two only agree for points at or above the reference point
+        assert exact_hypervolume([[-10, -10]], [-1, -1]) == 0
+        assert wfg_hypervolume([[-10, -10]], [-1, -1]) == 81
+        assert exact_hypervolume([[-10, 5], [3, 3]], [-1, -1]) == 16
+        assert wfg_hypervolume([[-10, 5], [3, 3]], [-1, -1], True) != 16
+
+class TestHypervolumeTracker:
+    @pytest.mark.parametrize('dimensions', [2, 3])
+    def test_updates(self, dimensions):
+        # After any sequence of small changes, the tracked volume is the exact volume
+        reference_point = [-1] * dimensions
+        points = random_points(dimensions)
+        tracker = HypervolumeTracker(reference_point, points)
+        for _ in range(iterations):
+            for _ in range(random.randint(1, 3)):
+                if points and random.random() < 0.5:
+                    points.pop(random.randrange(len(points)))
+                else:
+                    points.append(random.choice(random_points(dimensions)))
+            assert tracker.update(points) == exact_hypervolume(points, reference_point)
+
+class TestMonteCarloHypervolume:
+    def test_estimate(self):
+        # The estimate is close to the exact volume, and reproducible with a seed
+        points = [[random.randint(0, 100) for _ in range(4)] for _ in range(20)]
+        reference_point = [-1] * 4
+        expected = wfg_hypervolume(points, reference_point, True)
+        estimate = monte_carlo_hypervolume(points, reference_point, samples=200_000, seed=1)
+        assert abs(estimate - expected) / expected < 0.02
+        assert estimate == monte_carlo_hypervolume(points, reference_point, samples=200_000, seed=1)
+
+    def test_time_limit(self):
+        # A time limit stops sampling early
+        points = [[random.randint(0, 100) for _ in range(4)] for _ in range(20)]
+        assert monte_carlo_hypervolume(points, [-1] * 4, samples=10 ** 12, time_limit=0.1) > 0
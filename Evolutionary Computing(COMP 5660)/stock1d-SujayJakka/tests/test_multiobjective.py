@@ -0,0 +1,72 @@
+
+# tests/test_multiobjective.py
+
+from test_utils import *
+import random, pytest, copy, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from math import inf
+from multiobjective import *
+
+iterations = 300
+
+class Individual:
+    def __init__(self, objectives):
+        self.objectives = objectives
+
+def random_objectives(num_objectives):
+    # Small value ranges give plenty of ties and duplicate points
+    n = random.randint(1, 40)
+    value_range = random.choice([2, 5, 1000])
+    population = [Individual([random.randint(0, value_range) for _ in range(num_objectives)]) for _ in range(n)]
+    return population + copy.deepcopy(random.sample(population, min(5, n)))
+
+def reference_levels(population):
+    # Peel off the non-dominated individuals, one level at a time
+    levels = [None] * len(population)
+    remaining = set(range(len(population)))
+    level = 1
+    while remaining:
+        front = {i for i in remaining if not any(dominates(population[j], population[i]) for j in remaining)}
+        for i in front:
+            levels[i] = level
+        remaining -= front
+        level += 1
+    return levels
+
+def reference_crowding(population):
+    crowding = [0] * len(population)
+    for level in set(individual.level for individual in population):
+        members = [i for i in range(len(population)) if population[i].level == level]
+        for o in range(len(population[0].objectives)):
+            ordered = sorted(members, key=lambda i: population[i].objectives[o])
+            denom = population[ordered[-1]].objectives[o] - population[ordered[0]].objectives[o]
+            denom = denom if denom else inf
+            for k in range(1, len(ordered) - 1):
+                crowding[ordered[k]] += (population[ordered[k + 1]].objectives[o] - population[ordered[k - 1]].objectives[o]) / denom
+            crowding[ordered[0]] = crowding[ordered[-1]] = inf
+    return crowding
+
+class TestNondominationSort:
+    @pytest.mark.parametrize('num_objectives', [1, 2, 3, 4])
+    def test_levels(self, num_objectives):
+        # Levels match peeling non-dominated fronts with the dominates function
+        for _ in range(iterations):
+            population = random_objectives(num_objectives)
+            nondomination_sort(population)
+            assert [individual.level for individual in population] == reference_levels(population)
+
+    def test_empty_population(self):
+        # Sorting an empty population is a no-op
+        nondomination_sort([])
+
+class TestCrowdingDistances:
+    @pytest.mark.parametrize('num_objectives', [1, 2, 3, 4])
+    def test_crowding(self, num_objectives):
+        # Crowding distances match sorting each level per objective, including ties
+        for _ in range(iterations):
+            population = random_objectives(num_objectives)
+            nondomination_sort(population)
+            assign_crowding_distances(population)
+            assert [individual.crowding for individual in population] == reference_crowding(population)
@@ -0,0 +1,102 @@
+
+# tests/test_occupancy.py
+
+from test_utils import *
+import random, pytest, copy, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from snake_eyes import read_config
+import cutting_stock.implementation as impl
+from cutting_stock.occupancy import get_occupancy
+from stock_population_evaluation import *
+from base_evolution import BaseEvolutionPopulation
+from selection import *
+
+config_paths = ['configs/1b/easy_green_config.txt',
+                'configs/1c/green_config.txt',
+                'configs/1d/green_crowding_config.txt']
+problems = [read_config(path, globals(), locals())['problem'] for path in config_paths]
+mutation_kwargs = {'prob_creep_mutation': 0.1, 'mean_of_change_dist': 0,
+                   'std_of_change_dist': 3, 'prob_random_reset': 0.1}
+iterations = 500
+
+def squeeze(genes, bounds):
+    # Keep translations in a corner of the bounds for plenty of overlaps,
+    # out-of-bounds cells and shared edges
+    return [(bounds[0][0] + (x - bounds[0][0]) % 8, bounds[1][0] + (y - bounds[1][0]) % 8, r)
+            for x, y, r in genes]
+
+class TestOccupancy:
+    @pytest.mark.parametrize('problem', problems)
+    def test_derived_matches_implementation(self, problem):
+        # Along a chain of mutations, derived occupancies match the dict-based implementation exactly
+        shapes, bounds = problem['shapes'], problem['bounds']
+        individual = random_pop(1, shapes=shapes, bounds=bounds)[0]
+        individual.genes = squeeze(individual.genes, bounds)
+        occupancy = get_occupancy(individual.genes, shapes, bounds)
+        occupancy.count_shared_edges()
+        for _ in range(iterations):
+            child = individual.mutate(bounds, **mutation_kwargs)
+            child.genes = squeeze(child.genes, bounds)
+            child_occupancy = get_occupancy(child.genes, shapes, bounds, occupancy)
+            cells = impl.place_all(child.genes, shapes, bounds)
+            assert child_occupancy.count_overlaps() == impl.count_overlaps(cells)
+            assert child_occupancy.count_out_of_bounds() == impl.count_out_of_bounds(cells, bounds)
+            assert child_occupancy.get_extent(False) == impl.get_extent(cells, False)
+            assert child_occupancy.get_extent(True) == impl.get_extent(cells, True)
+            assert child_occupancy.count_shared_edges() == impl.count_shared_edges(cells)
+            if random.random() < 0.5:
+                individual, occupancy = child, child_occupancy
+
+    @pytest.mark.parametrize('problem', problems)
+    def test_parent_unmodified(self, problem):
+        # Deriving a child leaves the parent's occupancy as it was
+        shapes, bounds = problem['shapes'], problem['bounds']
+        individual = random_pop(1, shapes=shapes, bounds=bounds)[0]
+        occupancy = get_occupancy(individual.genes, shapes, bounds)
+        before = (occupancy.masks.copy(), list(occupancy.boxes), occupancy.count_shared_edges())
+        for _ in range(iterations // 10):
+            child = individual.mutate(bounds, **mutation_kwargs)
+            get_occupancy(child.genes, shapes, bounds, occupancy).count_shared_edges()
+        assert (occupancy.masks, occupancy.boxes, occupancy.count_shared_edges()) == before
+
+    @pytest.mark.parametrize('problem', problems)
+    def test_incremental_evaluation(self, problem):
+        # Incremental evaluation of mutated and recombined children matches full evaluation
+        parents = random_pop(iterations // 10, **problem)
+        kwargs = {'penalty_coefficient': 1/128, **problem}
+        unconstrained_population_evaluation(parents, incremental=True, **kwargs)
+        multiobjective_population_evaluation(parents, incremental=True, shared_edges=True, **problem)
+        children = [parent.mutate(**mutation_kwargs, **problem) for parent in parents]
+        children += [parent.recombine(mate, 'uniform', prob_selecting_parent_1_gene=0.9)
+                     for parent, mate in zip(parents, reversed(parents))]
+        copies = copy.deepcopy(children)
+        unconstrained_population_evaluation(children, incremental=True, **kwargs)
+        unconstrained_population_evaluation(copies, **kwargs)
+        for child, full in zip(children, copies):
+            assert (child.fitness, child.base_fitness, child.violations) == (full.fitness, full.base_fitness, full.violations)
+        multiobjective_population_evaluation(children, incremental=True, shared_edges=True, **problem)
+        multiobjective_population_evaluation(copies, shared_edges=True, **problem)
+        for child, full in zip(children, copies):
+            assert child.objectives == full.objectives
+
+    def test_population_releases_occupancy(self):
+        # Only the latest children keep an Occupancy, and evaluation still matches without one
+        config = read_config('configs/1c/green_config.txt', globals(), locals())
+        config['ea'].update(mu=20, num_children=10, mutation_rate=0.5)
+        config['recombination_kwargs']['prob_selecting_parent_1_gene'] = 0.9
+        config['mutation_kwargs'].update(mutation_kwargs)
+        ea = BaseEvolutionPopulation(**config['ea'], **config)
+        kwargs = {'penalty_coefficient': 1/128, **config['problem']}
+        unconstrained_population_evaluation(ea.population, incremental=True, **kwargs)
+        for _ in range(5):
+            children = ea.generate_children()
+            assert all(individual.occupancy is None for individual in ea.population)
+            copies = copy.deepcopy(children)
+            unconstrained_population_evaluation(children, incremental=True, **kwargs)
+            unconstrained_population_evaluation(copies, **kwargs)
+            assert [child.fitness for child in children] == [full.fitness for full in copies]
+            assert all(child.occupancy is not None for child in children)
+            ea.population += children
+            ea.survival()
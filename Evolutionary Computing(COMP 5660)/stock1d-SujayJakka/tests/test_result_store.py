@@ -0,0 +1,45 @@
+
+# tests/test_result_store.py
+
+from test_utils import *
+import random, pytest, os, sys, inspect
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from histogram import *
+from result_store import ResultStore
+
+class TestResultStore:
+    def test_write_and_read(self, tmp_path):
+        # A written run can be read back artifact by artifact
+        store = ResultStore(tmp_path)
+        hist = HistogramMaker(-1)
+        for fitness in [-1, 3, 3, 5, -1, -1]:
+            hist.add(fitness)
+        store.write_run(0, ['mu: 5', 'Evaluations: 5'], {'best_fitness': '5'}, {'histogram': hist})
+        assert store.is_complete(0)
+        assert store.read_log(0) == ['mu: 5', 'Evaluations: 5']
+        assert store.read_text(0, 'best_fitness') == '5'
+        loaded = store.read_histogram(0, 'histogram', HistogramMaker(-1))
+        assert loaded.data == hist.data
+        assert loaded.num_invalid == 3
+
+    def test_pending_runs(self, tmp_path):
+        # Completed runs are skipped, in any completion order
+        store = ResultStore(tmp_path)
+        for run in [3, 0, 1]:
+            store.write_run(run, [])
+        assert store.completed_runs() == [0, 1, 3]
+        assert store.pending_runs(5) == [2, 4]
+        assert ResultStore(tmp_path).pending_runs(5) == [2, 4]
+
+    def test_partial_runs_are_discarded(self, tmp_path):
+        # A run interrupted mid-write is not counted as complete and is cleaned up
+        store = ResultStore(tmp_path)
+        (store.runs_dir / '2.partial').mkdir()
+        (store.runs_dir / '2.partial' / 'log.txt').write_text('mu: 5\n')
+        assert not store.is_complete(2)
+        store.discard_partial_runs()
+        assert not (store.runs_dir / '2.partial').exists()
+        store.write_run(2, ['mu: 5'])
+        assert store.completed_runs() == [2]
@@ -0,0 +1,116 @@
+
+# tests/test_run_records.py
+
+from test_utils import *
+import random, pytest, os, sys, inspect
+import numpy as np
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+from snake_eyes import read_config
+from selection import *
+from log_analyzer import *
+from run_records import RunRecorder, stream_records, load_records
+from result_store import ResultStore
+import base_evolution as evo
+
+config = read_config('configs/1b/easy_green_config.txt', globals(), locals())
+config['ea']['mutation_rate'] = 0
+config['recombination_kwargs'] = {'method': 'one-point'}
+
+# Runs a small EA on random fitnesses, keeping both a text log and records
+def random_run(path, generations, mu=20, num_children=10):
+    config['ea']['mu'] = mu
+    config['ea']['num_children'] = num_children
+    ea = evo.BaseEvolutionPopulation(**config['ea'], **config, record_path=path)
+    random_fitness(ea.population)
+    ea.evaluations = mu
+    ea.log_base_stats()
+    for _ in range(generations):
+        children = ea.generate_children()
+        random_fitness(children)
+        ea.evaluations += len(children)
+        ea.population += children
+        ea.survival()
+        ea.log_base_stats()
+    return ea
+
+class TestRunRecords:
+    def test_records_match_text_log(self, tmp_path):
+        # Every numeric log entry is recorded in its generation's row
+        path = tmp_path / 'records.csv'
+        ea = random_run(path, 10)
+        metadata, columns = load_records(path)
+        assert metadata['mu'] == '20'
+        assert metadata['survival selection kwargs'] == str(ea.survival_selection_kwargs)
+        for name in ['Evaluations', 'Local best', 'Local mean', 'Number of children', 'Post-survival population size']:
+            logged = [float(entry.split(': ')[1]) for entry in ea.log if entry.split(': ')[0] == name]
+            recorded = columns[name][~np.isnan(columns[name])]
+            assert list(recorded) == logged
+        assert len(columns['Evaluations']) == 11
+        assert np.isnan(columns['Number of children'][0])
+
+    def test_records_without_text_log(self, tmp_path):
+        # With text_log=False, only the records are kept
+        config['ea']['mu'] = 5
+        config['ea']['num_children'] = 5
+        ea = evo.BaseEvolutionPopulation(**config['ea'], **config, record_path=tmp_path / 'records.csv', text_log=False)
+        random_fitness(ea.population)
+        ea.evaluations = 5
+        ea.log_base_stats()
+        assert ea.log == []
+        metadata, rows = stream_records(tmp_path / 'records.csv')
+        assert metadata['num_children'] == '5'
+        assert [row['Evaluations'] for row in rows] == [5]
+
+    def test_unknown_entry(self, tmp_path):
+        # Once the schema is written, entries outside it are rejected
+        recorder = RunRecorder(tmp_path / 'records.csv')
+        recorder.add('Evaluations', 5)
+        recorder.end_generation(['Local best'])
+        with pytest.raises(AssertionError):
+            recorder.add('Local worst', 0)
+
+class TestAnalyzeRecords:
+    def test_same_messages(self, tmp_path, capsys):
+        # The streaming analyzer reports what the text log analyzer reports
+        for generations, evals in [(10, 120), (10, 200), (1, 30)]:
+            path = tmp_path / 'records.csv'
+            ea = random_run(path, generations)
+            analyze_base_log(ea.log, evals)
+            expected = capsys.readouterr().out
+            analyze_records(path, evals)
+            assert capsys.readouterr().out == expected
+
+    def test_incorrect_counts(self, tmp_path, capsys):
+        # Wrong child counts and population sizes are caught
+        recorder = RunRecorder(tmp_path / 'records.csv')
+        log = []
+        for name, value in [('mu', 4), ('num_children', 2)]:
+            recorder.add(name, value)
+            log.append(f'{name}: {value}')
+        for generation in range(4):
+            entries = [('Evaluations', 4 + 2 * generation)]
+            if generation:
+                entries = [('Number of children', 3), ('Pre-survival population size', 7),
+                           ('Post-survival population size', 5)] + entries
+            entries += [('Local best', 10), ('Local mean', 10 - generation * 3)]
+            for name, value in entries:
+                recorder.add(name, value)
+                log.append(f'{name}: {value}')
+            recorder.end_generation(evo.BASE_STATS)
+        analyze_base_log(log, 10)
+        expected = capsys.readouterr().out
+        assert 'Number of children seems incorrect.' in expected
+        assert 'Mean population fitness dropped' in expected
+        analyze_records(tmp_path / 'records.csv', 10)
+        assert capsys.readouterr().out == expected
+
+    def test_store(self, tmp_path):
+        # Records written during a run are moved into the run's directory
+        store = ResultStore(tmp_path)
+        random_run(store.records_path(0), 3)
+        store.write_run(0, [])
+        metadata, columns = store.read_records(0)
+        assert list(columns['Evaluations']) == [20, 30, 40, 50]
+        assert not store.records_path(0).exists()
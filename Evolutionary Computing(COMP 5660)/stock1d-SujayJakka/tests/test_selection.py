@@ -3,6 +3,7 @@
 
 from test_utils import *
 import random, pytest, copy, os, sys, inspect
+import numpy as np
 currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
@@ -450,4 +451,72 @@ class TestTruncation:
             selection = truncation(pop, outsize,\
                                 **config['survival_selection_kwargs'])
             for i in range(popsize):
-                assert same_object(pop[i], copies[i])
\ No newline at end of file
+                assert same_object(pop[i], copies[i])
+
+class TestArraySelection:
+    def test_output_size(self):
+        # Returns the correct number of indices, all within the population
+        rng = np.random.default_rng(0)
+        for _ in range(iterations):
+            popsize = random.randrange(50, 500)
+            fitness = rng.normal(size=popsize)
+            outsize = random.randint(1, popsize - 5)
+            for selection in [uniform_random_selection_indices, k_tournament_with_replacement_indices,
+                              fitness_proportionate_selection_indices, stochastic_universal_sampling_indices,
+                              truncation_indices, k_tournament_without_replacement_indices]:
+                out = selection(fitness, outsize, k=5, rng=rng)
+                assert len(out) == outsize
+                assert out.min() >= 0 and out.max() < popsize
+
+    def test_tournament_winners(self):
+        # k = popsize tournaments always pick the best remaining individual
+        rng = np.random.default_rng(1)
+        for _ in range(iterations):
+            popsize = random.randrange(5, 50)
+            fitness = rng.permutation(popsize).astype(float)
+            assert set(k_tournament_with_replacement_indices(fitness, 10, popsize, rng=rng)) == {np.argmax(fitness)}
+            out = k_tournament_without_replacement_indices(fitness, 1, popsize, rng=rng)
+            assert fitness[out[0]] == popsize - 1
+
+    def test_without_replacement(self):
+        # Survival selection never selects an individual twice
+        rng = np.random.default_rng(2)
+        for _ in range(iterations):
+            popsize = random.randrange(50, 500)
+            fitness = rng.integers(0, 5, popsize).astype(float)
+            outsize = random.randint(1, popsize - 3)
+            for selection in [truncation_indices, k_tournament_without_replacement_indices]:
+                assert len(set(selection(fitness, outsize, k=3, rng=rng).tolist())) == outsize
+
+    def test_truncation_matches(self):
+        # Truncation selects the same individuals as the list-based version
+        for _ in range(iterations):
+            popsize = random.randrange(50, 500)
+            pop = random_pop(popsize, **config['problem'])
+            random_fitness(pop)
+            outsize = random.randint(1, popsize)
+            assert population_selection(truncation_indices)(pop, outsize) == truncation(pop, outsize)
+
+    def test_sus_spread(self):
+        # Each individual is selected floor or ceil of its expected number of times
+        rng = np.random.default_rng(3)
+        for _ in range(iterations):
+            popsize = random.randrange(50, 500)
+            fitness = rng.normal(size=popsize)
+            outsize = random.randint(1, popsize * 2)
+            counts = np.bincount(stochastic_universal_sampling_indices(fitness, outsize, rng=rng), minlength=popsize)
+            weights = fitness - fitness.min()
+            expected = weights / weights.sum() * outsize
+            assert np.all(counts >= np.floor(expected) - 1e-9) and np.all(counts <= np.ceil(expected) + 1e-9)
+
+    def test_population_selection(self):
+        # Wrapped operators select individuals of the population, keeping the operator's name
+        for _ in range(5):
+            popsize = random.randrange(50, 500)
+            pop = random_pop(popsize, **config['problem'])
+            random_fitness(pop)
+            selection = population_selection(k_tournament_with_replacement_indices)
+            assert selection.__name__ == 'k_tournament_with_replacement_indices'
+            out = selection(pop, popsize * 2, k=3)
+            assert len(out) == popsize * 2 and all(x in pop for x in out)
+            assert len(stochastic_universal_sampling(pop, popsize)) == popsize